@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Banc d'essai local du téléchargement segmenté (_segmented_download).
+# Sert un fichier aléatoire depuis un serveur HTTP bridé par connexion
+# (requêtes Range, coupures aléatoires optionnelles) puis le télécharge avec
+# 1..N connexions : durée, débit et contrôle d'intégrité (SHA-256).
+#
+#   python3 scripts/bench_segmented.py --size 32 --rate 1 --connections 1 2 4 8
+#   python3 scripts/bench_segmented.py --fail 0.2   # coupures en cours de réponse
+
+import os
+import re
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+import netdigger  # noqa: E402
+
+
+def make_handler(path, rate, fail):
+    size = path.stat().st_size
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def do_GET(self):
+            m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+            if m:
+                a = int(m.group(1))
+                b = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {a}-{b}/{size}")
+            else:
+                a, b = 0, size - 1
+                self.send_response(200)
+            self.send_header("Content-Length", str(b - a + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            cut = random.random() < fail and b - a > 65536
+            with open(path, "rb") as f:
+                f.seek(a)
+                left, sent, t0 = b - a + 1, 0, time.monotonic()
+                while left > 0:
+                    if cut and sent > (b - a) // 2:
+                        self.close_connection = True
+                        return
+                    chunk = f.read(min(16384, left))
+                    self.wfile.write(chunk)
+                    left -= len(chunk)
+                    sent += len(chunk)
+                    # Débit plafonné par connexion, comme un CDN qui bride chaque flux
+                    ahead = sent / rate - (time.monotonic() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Banc d'essai du téléchargement segmenté")
+    ap.add_argument("--size", type=float, default=16, help="taille du fichier servi (Mo)")
+    ap.add_argument("--rate", type=float, default=1, help="débit maximal par connexion (Mo/s)")
+    ap.add_argument("--fail", type=float, default=0.0, help="probabilité de coupure par réponse")
+    ap.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nd-bench-") as tmp:
+        src = Path(tmp) / "source.bin"
+        src.write_bytes(os.urandom(int(args.size * 1e6)))
+        expected = hashlib.sha256(src.read_bytes()).hexdigest()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(src, args.rate * 1e6, args.fail))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/source.bin"
+        print(f"[i] {args.size:g} Mo servis à {args.rate:g} Mo/s par connexion, coupures {args.fail:.0%}")
+
+        failed = False
+        for n in args.connections:
+            dest = Path(tmp) / f"dest-{n}.bin"
+            t0 = time.monotonic()
+            try:
+                got = netdigger._segmented_download(url, dest, connections=n)
+            except Exception as e:
+                print(f"{n:>3} connexion(s) : échec ({e})")
+                failed = True
+                continue
+            dt = time.monotonic() - t0
+            ok = hashlib.sha256(dest.read_bytes()).hexdigest() == expected
+            failed |= not ok
+            print(f"{n:>3} connexion(s) : {dt:6.2f} s  {got / dt / 1e6:6.2f} Mo/s  {'OK' if ok else 'CORROMPU'}")
+            dest.unlink()
+        server.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
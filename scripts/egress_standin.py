@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# Banc d'essai local des sorties réseau (Settings → Sorties réseau).
+# Lance deux serveurs sur la boucle locale :
+#  - une origine HTTP qui sert un dossier avec un débit propre à chaque adresse
+#    source (127.0.0.x) et répond 429 aux adresses bloquées, comme un CDN qui
+#    bride par IP ; /seen renvoie le nombre de requêtes reçues par adresse ;
+#  - un proxy GET/CONNECT minimal ; /seen sur le proxy renvoie ses compteurs.
+# Sous Linux tout 127.0.0.0/8 est routé sur lo ; sous macOS, créer d'abord
+# les alias (sudo ifconfig lo0 alias 127.0.0.2 up, etc.).
+#
+#   python3 scripts/egress_standin.py ~/Musique/tests --rate 127.0.0.2=2 --rate 127.0.0.4=0.2 --block 127.0.0.3
+#   → sorties : 127.0.0.2, 127.0.0.3, 127.0.0.4 et http://127.0.0.1:8899
+#   → URL : http://127.0.0.1:8768/<fichier>
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import select
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def _send_json(handler, data):
+    body = json.dumps(data, sort_keys=True).encode()
+    handler.send_response(200)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def make_origin(root, rates, default_rate, blocked):
+    seen, lock = {}, threading.Lock()
+
+    class Origin(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+        def do_GET(self, head=False):
+            ip = self.client_address[0]
+            with lock:
+                seen[ip] = seen.get(ip, 0) + 1
+            if self.path == "/seen":
+                with lock:
+                    return _send_json(self, seen)
+            if ip in blocked:
+                self.send_response(429, "Too Many Requests")
+                self.send_header("Retry-After", "60")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(root, self.path.lstrip("/").split("?")[0])
+            if not os.path.isfile(path):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            size = os.path.getsize(path)
+            m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+            if m:
+                a = int(m.group(1))
+                b = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {a}-{b}/{size}")
+            else:
+                a, b = 0, size - 1
+                self.send_response(200)
+            self.send_header("Content-Length", str(b - a + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Type", "application/octet-stream")
+            self.end_headers()
+            if head:
+                return
+            rate = rates.get(ip, default_rate)
+            with open(path, "rb") as f:
+                f.seek(a)
+                left, sent, t0 = b - a + 1, 0, time.monotonic()
+                while left > 0:
+                    chunk = f.read(min(16384, left))
+                    self.wfile.write(chunk)
+                    left -= len(chunk)
+                    sent += len(chunk)
+                    ahead = sent / rate - (time.monotonic() - t0)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return Origin
+
+
+def make_proxy():
+    counts, lock = {"GET": 0, "CONNECT": 0}, threading.Lock()
+
+    class Proxy(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def _count(self, method):
+            with lock:
+                counts[method] += 1
+
+        def do_HEAD(self):
+            self.do_GET(method="HEAD")
+
+        def do_GET(self, method="GET"):
+            u = urlsplit(self.path)
+            if not u.netloc:
+                with lock:
+                    return _send_json(self, counts)
+            self._count("GET")
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in ("proxy-connection", "connection")}
+            conn = http.client.HTTPConnection(u.netloc, timeout=30)
+            try:
+                conn.request(method, u.path + (f"?{u.query}" if u.query else ""), headers=headers)
+                r = conn.getresponse()
+                self.send_response(r.status, r.reason)
+                for k, v in r.getheaders():
+                    if k.lower() not in ("connection", "transfer-encoding"):
+                        self.send_header(k, v)
+                self.end_headers()
+                while method == "GET":
+                    data = r.read(1 << 16)
+                    if not data:
+                        break
+                    self.wfile.write(data)
+            except OSError:
+                self.close_connection = True
+            finally:
+                conn.close()
+
+        def do_CONNECT(self):
+            self._count("CONNECT")
+            host, _, port = self.path.rpartition(":")
+            try:
+                up = socket.create_connection((host, int(port)), timeout=30)
+            except OSError:
+                self.send_response(502)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200, "Connection established")
+            self.end_headers()
+            socks = [self.connection, up]
+            try:
+                while True:
+                    ready, _, _ = select.select(socks, [], [], 30)
+                    if not ready:
+                        break
+                    for s in ready:
+                        data = s.recv(1 << 16)
+                        if not data:
+                            return
+                        (up if s is self.connection else self.connection).sendall(data)
+            finally:
+                up.close()
+                self.close_connection = True
+
+    return Proxy
+
+
+def _rate(spec):
+    ip, _, mbps = spec.partition("=")
+    return ip, float(mbps) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Origine bridée par adresse source + proxy GET/CONNECT locaux")
+    ap.add_argument("root", help="dossier servi par l'origine")
+    ap.add_argument("--port", type=int, default=8768, help="port de l'origine")
+    ap.add_argument("--proxy-port", type=int, default=8899, help="port du proxy (0 = pas de proxy)")
+    ap.add_argument("--rate", type=_rate, action="append", default=[], metavar="IP=Mo/s",
+                    help="débit par connexion pour une adresse source")
+    ap.add_argument("--default-rate", type=float, default=1, help="débit des autres adresses (Mo/s)")
+    ap.add_argument("--block", action="append", default=[], metavar="IP", help="adresse source qui reçoit 429")
+    args = ap.parse_args()
+
+    servers = [ThreadingHTTPServer(("127.0.0.1", args.port),
+                                   make_origin(args.root, dict(args.rate), args.default_rate * 1e6, set(args.block)))]
+    print(f"[i] Origine : http://127.0.0.1:{args.port}/ → {args.root}")
+    if args.proxy_port:
+        servers.append(ThreadingHTTPServer(("127.0.0.1", args.proxy_port), make_proxy()))
+        print(f"[i] Proxy   : http://127.0.0.1:{args.proxy_port}")
+    for srv in servers:
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    for srv in servers:
+        srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
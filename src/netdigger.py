@@ -2,23 +2,63 @@
 # netdigger.py
 
 import os
+import re
 import sys
+import json
+import argparse
+import asyncio
+import codecs
+import locale
+import math
 import stat
+import time
+import shutil
 import threading
 import queue
 import subprocess
 import shlex
+import mmap
+import ctypes
+import select
+import signal
+import socket
+import ipaddress
+import sqlite3
+import struct
+import hashlib
+import functools
+import multiprocessing
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from urllib.parse import urlsplit, urljoin
 from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
 
+try:
+    import numpy as np
+except ImportError:  # optionnel : découpage automatique, formes d'onde, analyse
+    np = None
+try:
+    import fcntl
+except ImportError:  # Windows : pas de reflink, liens physiques seulement
+    fcntl = None
+
 APP_TITLE = "Netdigger"
 DEFAULT_SR = 44100
 DEFAULT_BIT_DEPTH = 16
 DEFAULT_CHANNELS = 2
 DEFAULT_FORMAT = "wav"  # wav, flac, ogg
+DEFAULT_MAX_JOBS = 2
+WARM_MARKER_TTL = 12 * 3600  # secondes avant de re-préchauffer un extracteur
+DEFAULT_COOKIE_TTL_MIN = 30
+DEFAULT_PREVIEW_SECONDS = 30
+DEFAULT_ENCODE_WORKERS = os.cpu_count() or 2
+DEFAULT_CHUNK_MINUTES = 20  # encodage parallèle par segments au-delà de cette durée
 
 HELP_HINT = "Cliquez sur 'Charger l'aide yt-dlp (-h)' pour afficher l'aide ici."
 GITHUB_LATEST_URL = "https://github.com/yt-dlp/yt-dlp/releases/latest/download/yt-dlp"
@@ -44,337 +84,5473 @@ def _user_data_dir() -> Path:
 
 LOCAL_BIN_DIR = _user_data_dir() / "bin"
 LOCAL_YTDLP = LOCAL_BIN_DIR / ("yt-dlp.exe" if os.name == "nt" else "yt-dlp")
+EXTRACTOR_CACHE_DIR = _user_data_dir() / "extractors"
+YTDLP_CACHE_ROOT = _user_data_dir() / "cache"
+COOKIES_DIR = _user_data_dir() / "cookies"
+BATCH_DIR = _user_data_dir() / "batch"
+PREVIEW_DIR = _user_data_dir() / "preview"
+WORK_DIR = _user_data_dir() / "work"
+PEAKS_DIR = _user_data_dir() / "peaks"
+ANALYSIS_DB = _user_data_dir() / "analysis.sqlite3"
+LIBRARY_DB = _user_data_dir() / "library.sqlite3"
+SYNC_DIR = _user_data_dir() / "sync"
 
-class NetdiggerApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title(APP_TITLE)
-        self.geometry("760x600")
-        self.minsize(760, 520)
+# ---------- Index local des extracteurs yt-dlp ----------
+# Script exécuté une seule fois par version de yt-dlp : il liste les
+# extracteurs dans l'ordre de priorité de yt-dlp avec leurs _VALID_URL.
+_EXTRACTOR_DUMP_SCRIPT = r"""
+import sys, json
+sys.path.insert(0, sys.argv[1])
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.version import __version__
+entries = []
+for ie in gen_extractor_classes():
+    pats = getattr(ie, "_VALID_URL", None)
+    if not pats:
+        continue
+    entries.append([ie.ie_key(), [pats] if isinstance(pats, str) else list(pats)])
+json.dump({"version": __version__, "entries": entries}, sys.stdout)
+"""
 
-        # --- Icône robuste ---
-        try:
-            if sys.platform.startswith("win"):
-                app_ico = ASSET_GFX_DIR / "netdigger.ico"
-                if app_ico.exists():
-                    self.iconbitmap(default=str(app_ico))
+_HOST_LITERAL = r"(?:[a-z0-9-]+\\\.)+[a-z]{2,}"
+_HOST_LITERAL_RE = re.compile(_HOST_LITERAL)
+_HOST_ALTERNATION_RE = re.compile(r"\(\?:%s(?:\|%s)*\)" % (_HOST_LITERAL, _HOST_LITERAL))
+_HOST_TAIL_RE = re.compile(r"(?<!\\)\\\.((?:[a-z0-9-]+\\\.)*[a-z]{2,})$")
+
+def _match_paren(pat, start):
+    # Index de la parenthèse fermante correspondant à pat[start] == "("
+    depth, i, in_class = 0, start, False
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+def _compact_verbose(pat):
+    # Retire blancs et commentaires d'un motif (?x) pour pouvoir l'analyser
+    out, i, in_class = [], 0, False
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            out.append(pat[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c.isspace():
+            i += 1
+            continue
+        elif c == "#":
+            nl = pat.find("\n", i)
+            i = len(pat) if nl < 0 else nl
+            continue
+        out.append(c)
+        i += 1
+    return "".join(out)
+
+def _pattern_host_keys(pat):
+    # Domaines littéraux qu'un hôte doit avoir en suffixe pour que `pat`
+    # puisse correspondre, ou None si le motif est trop générique pour être
+    # préfiltré (il sera alors toujours testé).
+    if pat.startswith("(?x)"):
+        pat = _compact_verbose(pat[4:])
+    m = re.match(r"(?:\(\?i\))?\^?https?\??://", pat)
+    if not m:
+        return None
+    # Section hôte : jusqu'au premier "/" hors groupe / classe
+    i, depth, in_class, alternation = m.end(), 0, False, False
+    while i < len(pat):
+        c = pat[i]
+        if c == "\\":
+            i += 2
+            continue
+        if in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            alternation = True
+        elif c == "/" and depth == 0:
+            break
+        i += 1
+    if i >= len(pat) or alternation:
+        return None
+    host = pat[m.end():i].lower()
+    # Préfixes optionnels de sous-domaine : (?:www\.)?, (?:[^/]+\.)?, ...
+    while host.startswith("("):
+        j = _match_paren(host, 0)
+        if j < 0 or host[j + 1:j + 2] != "?" or not host[1:j].endswith("\\."):
+            break
+        host = host[j + 2:]
+    if host.endswith(r"(?::\d+)?"):
+        host = host[:-len(r"(?::\d+)?")]
+    if _HOST_LITERAL_RE.fullmatch(host) or _HOST_ALTERNATION_RE.fullmatch(host):
+        return {lit.replace("\\.", ".") for lit in _HOST_LITERAL_RE.findall(host)}
+    # Sinon l'hôte doit au moins se terminer par ".<labels littéraux>"
+    tail = _HOST_TAIL_RE.search(host)
+    if tail:
+        return {tail.group(1).replace("\\.", ".")}
+    return None
+
+def _ytdlp_interpreter(ytdlp):
+    # yt-dlp zipapp / script pip : on relit le shebang pour trouver l'interpréteur
+    try:
+        with open(ytdlp, "rb") as f:
+            first = f.readline(512)
+    except OSError:
+        return None
+    if not first.startswith(b"#!"):
+        return None
+    return shlex.split(first[2:].decode("utf-8", "replace").strip())
+
+# Classification URL -> extracteur sans lancer yt-dlp : les motifs sont
+# regroupés par domaine littéral, une URL n'est testée que contre les
+# extracteurs de ses suffixes d'hôte et les motifs génériques, dans l'ordre
+# de priorité de yt-dlp.
+class ExtractorIndex:
+    def __init__(self, version, entries):
+        self.version = version
+        self.names = []
+        self.patterns = []
+        self.by_domain = {}
+        self.generic = []
+        self._compiled = {}
+        for name, pats in entries:
+            for pat in pats:
+                pos = len(self.patterns)
+                self.names.append(name)
+                self.patterns.append(pat)
+                keys = _pattern_host_keys(pat)
+                if keys is None:
+                    self.generic.append(pos)
                 else:
-                    app_png = ASSET_GFX_DIR / "netdigger_icon.png"
-                    if app_png.exists():
-                        self.iconphoto(False, tk.PhotoImage(file=str(app_png)))
-            else:
-                app_png = ASSET_GFX_DIR / "netdigger_icon.png"
-                if app_png.exists():
-                    self.iconphoto(False, tk.PhotoImage(file=str(app_png)))
+                    for key in keys:
+                        self.by_domain.setdefault(key, []).append(pos)
+
+    @classmethod
+    def load(cls, ytdlp):
+        ytdlp_path = Path(NetdiggerApp._which(ytdlp) or ytdlp)
+        st = ytdlp_path.stat()
+        stamp = f"{ytdlp_path.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+        stamps_file = EXTRACTOR_CACHE_DIR / "stamps.json"
+        try:
+            stamps = json.loads(stamps_file.read_text("utf-8"))
+        except (OSError, ValueError):
+            stamps = {}
+        version = stamps.get(stamp)
+        if version:
+            try:
+                data = json.loads((EXTRACTOR_CACHE_DIR / f"{version}.json").read_text("utf-8"))
+                return cls(data["version"], data["entries"])
+            except (OSError, ValueError, KeyError):
+                pass
+
+        interp = _ytdlp_interpreter(ytdlp_path)
+        if not interp:
+            raise RuntimeError(f"impossible d'inspecter {ytdlp_path} (binaire non Python)")
+        out = subprocess.check_output(
+            interp + ["-c", _EXTRACTOR_DUMP_SCRIPT, str(ytdlp_path)],
+            stderr=subprocess.DEVNULL, text=True
+        )
+        data = json.loads(out)
+        EXTRACTOR_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (EXTRACTOR_CACHE_DIR / f"{data['version']}.json").write_text(json.dumps(data), "utf-8")
+        stamps[stamp] = data["version"]
+        stamps_file.write_text(json.dumps(stamps), "utf-8")
+        return cls(data["version"], data["entries"])
+
+    def _regex(self, pos):
+        rx = self._compiled.get(pos)
+        if rx is None:
+            try:
+                rx = re.compile(self.patterns[pos])
+            except re.error:
+                rx = False
+            self._compiled[pos] = rx
+        return rx
+
+    def classify(self, url):
+        host = (urlsplit(url).hostname or "").lower()
+        labels = host.split(".")
+        candidates = set(self.generic)
+        for i in range(len(labels)):
+            candidates.update(self.by_domain.get(".".join(labels[i:]), ()))
+        for pos in sorted(candidates):
+            rx = self._regex(pos)
+            if rx and rx.match(url):
+                return self.names[pos]
+        return None
+
+# ---------- File d'attente ----------
+JOB_FINISHED = ("terminé", "erreur", "arrêté", "doublon")
+# Ligne imprimée par yt-dlp pour chaque fichier final (--print after_move:...)
+OUTPUT_MARKER = "ND-OUT"
+# Métadonnées de l'entrée (bibliothèque), imprimées juste avant sa ligne ND-OUT
+META_MARKER = "ND-META"
+META_FIELDS = "id,title,uploader,channel,tags,description,webpage_url,upload_date,duration"
+OUTPUT_PRINT_ARGS = ["--no-quiet",
+                     "--print", f"after_move:{META_MARKER}\t%(original_url)s\t%(filepath)s\t%(.{{{META_FIELDS}}})j",
+                     "--print", f"after_move:{OUTPUT_MARKER}\t%(original_url)s\t%(filepath)s"]
+# Chapitres de l'entrée, imprimés juste avant sa ligne ND-OUT (mode découpage)
+CHAPTER_MARKER = "ND-CHAP"
+CHAPTER_PRINT_ARGS = ["--print", f"after_move:{CHAPTER_MARKER}\t%(original_url)s\t%(chapters)j"]
+PROGRESS_RE = re.compile(r"^\[download\]\s+(\d+)(?:\.\d+)?%")
+# Fichier téléchargé avant conversion (gardé par -k quand les sorties sont vérifiées)
+SOURCE_RE = re.compile(r"^\[download\] (?:Destination: (.+)|(.+) has already been downloaded)$")
+# "[download] 100% of   24.06MiB in 00:00:03 at 7.50MiB/s" : octets / durée réseau du job
+DOWNLOADED_RE = re.compile(r"^\[download\]\s+100(?:\.0+)?% of\s+~?\s*([\d.]+)([KMGT]?i?B) in [\d:]+ at\s+([\d.]+)([KMGT]?i?B)/s")
+SIZE_UNITS = {"B": 1, "KiB": 1 << 10, "MiB": 1 << 20, "GiB": 1 << 30, "TiB": 1 << 40, "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12}
+EXTRACTING_RE = re.compile(r"^\[[^\]]+\] Extracting URL: (.+)$")
+
+@dataclass
+class Job:
+    id: int
+    url: str
+    outdir: str
+    extractor: str | None = None
+    cmd: list = field(default_factory=list)
+    status: str = "en attente"
+    rc: int | None = None
+    proc: object = None  # Popen (étapes bloquantes) ou processus asyncio (sortie de yt-dlp)
+    cancelled: bool = False
+    cookie_spec: str | None = None
+    log: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    progress: int = -1
+    settings: dict = field(default_factory=dict)
+    plan_path: str = ""
+    sections: list = field(default_factory=list)
+    kind: str = "download"  # download | preview | sync
+    full_sections: list = field(default_factory=list)  # plages du téléchargement confirmé après une preview
+    chapters: dict = field(default_factory=dict)  # fichier source -> chapitres yt-dlp (mode découpage)
+    pending_chapters: list | None = None
+    local_encode: bool = False  # source brute téléchargée puis encodée par Netdigger (chapitres, segments)
+    measures: dict = field(default_factory=dict)  # fichier source -> mesure de loudness (Future du pool)
+    meta: dict = field(default_factory=dict)  # fichier -> métadonnées yt-dlp (bibliothèque)
+    sync_source: str = ""  # chaîne / playlist synchronisée qui a ajouté ce job
+    sync_id: str = ""
+    estimate: dict = field(default_factory=dict)  # tailles estimées avant le lot (voir _estimate_job)
+    stage_dir: str = ""  # dossier local des sorties avant déplacement vers outdir
+    egress: object = None  # Egress attribuée au lancement (None : route par défaut)
+    net_bytes: int = 0
+    net_secs: float = 0.0
+    throttled: bool = False
+    extras: list = field(default_factory=list)  # fichiers annexes à déplacer avec les sorties (tranches)
+    sources: list = field(default_factory=list)  # fichiers téléchargés avant conversion (SOURCE_RE)
+    started: float = 0.0
+
+# ---------- Supervision des jobs (boucle asyncio) ----------
+# Tâches courtes hors jobs (préchauffage, cookies, aide, mise à jour) ; les
+# étapes bloquantes des jobs ont leur propre exécuteur (JobLoop.stage)
+JOB_LOOP_WORKERS = 8
+# Aucune sortie de yt-dlp pendant ce délai : le processus est arrêté
+JOB_STALL_TIMEOUT = 1800
+TK_BRIDGE_MS = 50
+STREAM_CHUNK = 1 << 16
+LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+class JobLoop:
+    # Boucle asyncio dans un thread : chaque job est une coroutine (lecture de
+    # la sortie de yt-dlp, annulation, délai) plutôt qu'un thread bloqué
+    def __init__(self, workers=JOB_LOOP_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="netdigger-job"))
+        _watch_children_with_pidfd(self.loop)
+        self.stages = None
+        self.stage_workers = 0
+        self._stage_lock = threading.Lock()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_blocking(self, func, *args):
+        return self.submit(asyncio.to_thread(func, *args))
+
+    def size_stages(self, jobs):
+        # Un thread par job simultané (un job n'a qu'une étape bloquante à la
+        # fois) : un encodage long ne retient pas les étapes des autres jobs.
+        # Jamais réduit, les jobs déjà lancés gardent leur place.
+        with self._stage_lock:
+            if jobs > self.stage_workers:
+                old = self.stages
+                self.stages = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="netdigger-stage")
+                self.stage_workers = jobs
+                if old is not None:
+                    old.shutdown(wait=False)
+
+    async def stage(self, func, *args):
+        return await self.loop.run_in_executor(self.stages, functools.partial(func, *args))
+
+def _watch_children_with_pidfd(loop):
+    # Avant Python 3.12, asyncio attend chaque processus enfant dans un thread
+    # dédié ; un pidfd (Linux >= 5.3) est surveillé par la boucle elle-même
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+def _terminate(proc):
+    # Popen ou processus asyncio, depuis n'importe quel thread ; un processus
+    # lancé dans sa propre session (_spawn_lines) est arrêté avec ses ffmpeg
+    if proc is None or proc.returncode is not None:
+        return
+    try:
+        if os.name != "nt" and os.getpgid(proc.pid) == proc.pid:
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            os.kill(proc.pid, signal.SIGTERM)
+    except OSError:
+        pass
+
+async def _read_lines(stream, timeout=JOB_STALL_TIMEOUT):
+    # Lignes coupées sur \n ou \r (progression de yt-dlp) comme le mode texte
+    # de Popen ; asyncio.TimeoutError si rien n'arrive pendant timeout s
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))("replace")
+    buf = ""
+    while True:
+        chunk = await asyncio.wait_for(stream.read(STREAM_CHUNK), timeout)
+        buf += decoder.decode(chunk, final=not chunk)
+        hold = "\r" if chunk and buf.endswith("\r") else ""  # \r\n coupé entre deux lectures
+        *lines, buf = LINE_BREAK_RE.split(buf[:len(buf) - len(hold)])
+        buf += hold
+        for line in lines:
+            yield line
+        if not chunk:
+            if buf:
+                yield buf
+            return
+
+# ---------- Commande yt-dlp / ffmpeg ----------
+# Noms --audio-format de yt-dlp (OGG = Vorbis)
+AUDIO_FORMAT_ARG = {"wav": "wav", "flac": "flac", "ogg": "vorbis"}
+
+def _sample_fmt_args(fmt, bd):
+    # WAV : le codec PCM fixe la profondeur ; FLAC 24 bits = s32 limité à 24 bits
+    if fmt == "wav":
+        return ["-c:a", "pcm_s24le" if bd == 24 else "pcm_s16le"]
+    if fmt == "flac":
+        return ["-sample_fmt", "s32", "-bits_per_raw_sample", "24"] if bd == 24 else ["-sample_fmt", "s16"]
+    return []
+
+def _ffmpeg_audio_args(fmt, sr, bd, ch, q, resample=True, remix=True):
+    ffargs = []
+    if resample:
+        ffargs.extend(["-ar", str(sr)])
+    if remix:
+        ffargs.extend(["-ac", str(ch)])
+    ffargs.extend(_sample_fmt_args(fmt, bd))
+    if fmt == "ogg":
+        ffargs.extend(["-q:a", f"{max(0.0, min(10.0, float(q))):.1f}"])
+    return ffargs
+
+# ---------- Plages temporelles ----------
+def _parse_timestamp(text):
+    # "83.5", "1:23", "1:02:03.5" -> secondes
+    parts = text.strip().split(":")
+    if not parts or len(parts) > 3 or not all(re.fullmatch(r"\d+(?:\.\d+)?", p) for p in parts):
+        raise ValueError(f"horodatage invalide: {text!r}")
+    secs = 0.0
+    for p in parts:
+        secs = secs * 60 + float(p)
+    return secs
+
+def _parse_range(text):
+    # "0:30-0:50", "1:00-" (jusqu'à la fin), "-20" (depuis le début)
+    start, sep, end = text.partition("-")
+    if not sep:
+        raise ValueError(f"plage invalide (début-fin attendu): {text!r}")
+    start_s = _parse_timestamp(start) if start.strip() else 0.0
+    end_s = _parse_timestamp(end) if end.strip() and end.strip() != "inf" else None
+    if end_s is not None and end_s <= start_s:
+        raise ValueError(f"plage vide: {text!r}")
+    return start_s, end_s
+
+def _section_args(sections):
+    # yt-dlp ne récupère que les octets / fragments nécessaires à chaque plage
+    args = []
+    for start, end in sections:
+        args += ["--download-sections", f"*{start:g}-{'inf' if end is None else f'{end:g}'}"]
+    return args
+
+def _work_dir(settings):
+    # Fichiers intermédiaires (source brute, PCM décodé, sondes) : dossier
+    # local rapide si configuré
+    return Path(settings["scratch"]) / "work" if settings.get("scratch") else WORK_DIR
+
+def _stage_dir(settings, outdir):
+    # Sorties d'un job en attente de déplacement vers outdir ; commun à tous
+    # les jobs d'un même dossier final (les commandes restent groupables)
+    if not settings.get("scratch"):
+        return ""
+    key = hashlib.sha1(os.path.abspath(outdir).encode("utf-8")).hexdigest()[:12]
+    return str(Path(settings["scratch"]) / "stage" / key)
+
+def _ytdlp_command(settings, url, outdir, plan=None, info_file=None, sections=None, local=False):
+    # Commande sans les arguments additionnels (ajoutés par l'appelant)
+    fmt = settings["fmt"]
+    split = local and not sections
+    if sections:
+        out_tpl = str(Path(outdir) / "%(title).200B [%(id)s] %(section_start)d-%(section_end)ds.%(ext)s")
+    elif split:
+        # Source brute dans le dossier de travail : décodée une fois puis
+        # découpée et encodée par Netdigger (voir _encode_local)
+        out_tpl = str(_work_dir(settings) / "%(title).200B [%(id)s].%(ext)s")
+    else:
+        out_tpl = str(Path(outdir) / "%(title).200B [%(id)s].%(ext)s")
+    cmd = [settings["ytdlp"]]
+    if split:
+        if plan is None:
+            cmd += ["-f", "bestaudio/best"]
+        else:
+            cmd += ["--load-info-json", str(info_file), "-f", plan["format_id"]]
+        cmd += CHAPTER_PRINT_ARGS
+    elif plan is None:
+        ffargs = _ffmpeg_audio_args(fmt, settings["sr"], settings["bd"], settings["ch"], settings["q"])
+        cmd += ["-x", "--audio-format", AUDIO_FORMAT_ARG[fmt], "--audio-quality", "0",
+                "--postprocessor-args", f"ffmpeg:{' '.join(shlex.quote(a) for a in ffargs)}"]
+    else:
+        cmd += ["--load-info-json", str(info_file), "-f", plan["format_id"],
+                "-x", "--audio-format", plan["audio_format"]]
+        if plan["ffargs"]:
+            cmd += ["--postprocessor-args", f"ffmpeg:{' '.join(shlex.quote(a) for a in plan['ffargs'])}"]
+    if sections:
+        cmd += _section_args(sections)
+    if settings.get("verify") and not split:
+        cmd.append("-k")  # source gardée : une sortie invalide est reconvertie sans nouveau téléchargement
+    cmd += ["--cache-dir", settings["cache_dir"], *OUTPUT_PRINT_ARGS, "-o", out_tpl]
+    if plan is None:
+        cmd.append(url)
+    return cmd
+
+# ---------- Synchronisation (chaînes / playlists) ----------
+# Une ligne par entrée du listage à plat (--flat-playlist, sans extraction
+# de chaque vidéo) ; le listage s'arrête dès qu'on retombe sur du connu
+SYNC_MARKER = "ND-SYNC"
+SYNC_PRINT = f"{SYNC_MARKER}\t%(id)s\t%(upload_date|)s\t%(timestamp|)s\t%(webpage_url,url|)s\t%(title|)s"
+SYNC_STOP_AFTER_KNOWN = 5  # entrées connues consécutives (tolère épinglées / réordonnées)
+DEFAULT_SYNC_INTERVAL_MIN = 60
+SYNC_SOURCES_FILE = SYNC_DIR / "sources.txt"
+
+def _sync_command(settings, url, reverse=False):
+    # reverse : playlist rangée du plus ancien au plus récent, listée à
+    # l'envers (yt-dlp doit alors charger toute la liste)
+    cmd = [settings["ytdlp"], "--flat-playlist", "--ignore-errors", "--no-warnings",
+           "--cache-dir", settings["cache_dir"], "--print", SYNC_PRINT]
+    cmd += ["-I", "::-1"] if reverse else ["--lazy-playlist"]
+    return cmd + [url]
+
+def _parse_sync_line(line):
+    vid, date, ts, url, title = (line.split("\t", 5)[1:] + [""] * 5)[:5]
+    if not date and ts and ts != "NA":
+        try:
+            date = time.strftime("%Y%m%d", time.gmtime(float(ts)))
+        except (ValueError, OverflowError):
+            date = ""
+    return {"id": url if vid in ("", "NA") else vid, "date": date, "url": url, "title": title}
+
+def _sync_newest_first(entries):
+    dates = [e["date"] for e in entries if e["date"]]
+    return not (len(dates) >= 2 and dates[0] < dates[-1])
+
+def _sync_path(url):
+    return SYNC_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+def _load_sync_state(url):
+    # {"url", "order", "synced", "entries": {id: {"date", "title", "url", "done"}}}
+    try:
+        return json.loads(_sync_path(url).read_text("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def _save_sync_state(state):
+    SYNC_DIR.mkdir(parents=True, exist_ok=True)
+    path = _sync_path(state["url"])
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=1), "utf-8")
+    tmp.replace(path)
+
+# ---------- Planification du format source ----------
+PLAN_COPY, PLAN_REMUX = "copie", "remux"
+PLAN_TRANSCODE, PLAN_RESAMPLE = "transcodage", "transcodage+rééchantillonnage"
+
+def _codec_family(acodec):
+    a = (acodec or "").lower()
+    if a.startswith(("mp4a", "aac")):
+        return "aac"
+    for fam in ("vorbis", "opus", "flac", "mp3", "pcm", "alac"):
+        if a.startswith(fam):
+            return fam
+    return a
+
+def _plan_audio_format(info, settings):
+    # Choisit le flux source le moins coûteux qui satisfait la cible, et le
+    # chemin le plus court : copie / remux > transcodage > + rééchantillonnage
+    fmt, sr, ch = settings["fmt"], settings["sr"], settings["ch"]
+    # acodec inconnu (liens directs) : accepté si le format est sans vidéo
+    formats = [f for f in info.get("formats") or []
+               if f.get("format_id") and f.get("acodec") != "none"
+               and (f.get("acodec") or f.get("vcodec") == "none")]
+    audio_only = [f for f in formats if f.get("vcodec") in (None, "none")] or formats
+    if not audio_only:
+        return None
+    duration = info.get("duration") or 0
+
+    def bitrate(f):
+        return f.get("abr") or f.get("tbr") or 0
+
+    def cost(f):
+        size = f.get("filesize") or f.get("filesize_approx")
+        if size:
+            return size
+        return bitrate(f) * 125 * duration if bitrate(f) and duration else float("inf")
+
+    best_abr = max(bitrate(f) for f in audio_only)
+    good = [f for f in audio_only if not best_abr or not bitrate(f) or bitrate(f) >= 0.9 * best_abr]
+
+    def meets(f):
+        return (not f.get("asr") or f["asr"] >= sr) and (not f.get("audio_channels") or f["audio_channels"] >= ch)
+
+    candidates = [f for f in good if meets(f)] or good or audio_only
+
+    def route(f):
+        same_rate = f.get("asr") == sr
+        same_ch = f.get("audio_channels") == ch
+        if fmt == "ogg" and _codec_family(f.get("acodec")) == "vorbis" and same_rate and same_ch:
+            return 0, (PLAN_COPY if f.get("ext") == "ogg" else PLAN_REMUX), None
+        ffargs = _ffmpeg_audio_args(fmt, sr, settings["bd"], ch, settings["q"],
+                                    resample=not same_rate, remix=not same_ch)
+        return (1, PLAN_TRANSCODE, ffargs) if same_rate else (2, PLAN_RESAMPLE, ffargs)
+
+    best = min(candidates, key=lambda f: (route(f)[0], cost(f)))
+    _rank, path, ffargs = route(best)
+    desc = (f"format {best['format_id']} ({_codec_family(best.get('acodec')) or '?'}, "
+            f"{best.get('asr') or '?'} Hz, {best.get('audio_channels') or '?'} can., "
+            f"{bitrate(best) or '?'} kb/s) -> {path}")
+    return {"format_id": best["format_id"], "path": path, "desc": desc,
+            "audio_format": AUDIO_FORMAT_ARG[fmt], "ffargs": ffargs}
+
+# ---------- Téléchargement segmenté (HTTP Range) ----------
+# Flux progressifs (un seul fichier http/https) : N connexions persistantes
+# se partagent les segments d'un fichier préalloué ; un segment en erreur est
+# relancé seul, depuis l'octet où il s'est arrêté
+DEFAULT_SEGMENT_CONNECTIONS = 4
+SEGMENT_SIZE = 4 << 20
+SEGMENT_MIN = 1 << 20
+SEGMENT_RETRIES = 5
+SEGMENT_TIMEOUT = 30
+SEGMENT_REDIRECTS = 5
+
+def _http_connection(parts, egress=None):
+    # Connexion directe, depuis une adresse source, ou via un proxy HTTP
+    # (CONNECT pour https, requête en forme absolue pour http)
+    cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    if egress is None:
+        return cls(parts.netloc, timeout=SEGMENT_TIMEOUT)
+    if egress.kind == "source":
+        return cls(parts.netloc, timeout=SEGMENT_TIMEOUT, source_address=(egress.spec, 0))
+    proxy = urlsplit(egress.spec)
+    if proxy.scheme != "http" or proxy.username:
+        raise OSError(f"proxy {egress.spec} non pris en charge par le téléchargement segmenté")
+    conn = cls(proxy.hostname, proxy.port, timeout=SEGMENT_TIMEOUT)
+    if parts.scheme == "https":
+        conn.set_tunnel(parts.hostname, parts.port or 443)
+    return conn
+
+def _http_get(conn, parts, headers, egress=None):
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    if egress is not None and egress.kind == "proxy" and parts.scheme == "http":
+        target = f"http://{parts.netloc}{target}"
+    conn.request("GET", target, headers=headers)
+    return conn.getresponse()
+
+def _probe_ranges(url, headers, egress=None):
+    # Suit les redirections ; -> (url finale, taille) si le serveur accepte
+    # les requêtes Range, sinon (url, None)
+    for _ in range(SEGMENT_REDIRECTS):
+        parts = urlsplit(url)
+        conn = _http_connection(parts, egress)
+        try:
+            resp = _http_get(conn, parts, {**headers, "Range": "bytes=0-0"}, egress)
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+                url = urljoin(url, resp.getheader("Location"))
+                continue
+            if resp.status >= 400:
+                raise OSError(f"HTTP {resp.status} {resp.reason}")
+            m = re.fullmatch(r"bytes 0-0/(\d+)", resp.getheader("Content-Range") or "")
+            if resp.status != 206 or not m:
+                return url, None  # corps complet : pas lu, la connexion est fermée
+            resp.read()
+            return url, int(m.group(1))
+        finally:
+            conn.close()
+    raise OSError("trop de redirections")
+
+def _segmented_download(url, dest, headers=None, connections=DEFAULT_SEGMENT_CONNECTIONS, progress=None, cancelled=None,
+                        egress=None):
+    # -> taille ; dest n'apparaît qu'une fois complet (fichier temporaire
+    # distinct du .part de yt-dlp, qui le prendrait pour une reprise)
+    headers = {"Accept-Encoding": "identity", **(headers or {})}
+    url, size = _probe_ranges(url, headers, egress)
+    if not size:
+        raise OSError("le serveur n'accepte pas les requêtes Range")
+    parts = urlsplit(url)
+    tmp = Path(f"{dest}.nd-seg")
+    with open(tmp, "wb") as f:
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+    step = max(SEGMENT_MIN, min(SEGMENT_SIZE, size // (connections * 4)))
+    todo = queue.SimpleQueue()
+    for start in range(0, size, step):
+        todo.put((start, min(size, start + step) - 1))
+    lock = threading.Lock()
+    done, errors = [0], []
+
+    def worker():
+        # Toute erreur est remontée : un segment manquant laisserait des zéros dans dest
+        conn = None
+        try:
+            with open(tmp, "r+b") as f:
+                while not errors:
+                    try:
+                        pos, end = todo.get_nowait()
+                    except queue.Empty:
+                        break
+                    tries = 0
+                    while pos <= end and not errors:
+                        if cancelled and cancelled():
+                            errors.append(RuntimeError("téléchargement arrêté"))
+                            break
+                        start = pos
+                        try:
+                            conn = conn or _http_connection(parts, egress)
+                            resp = _http_get(conn, parts, {**headers, "Range": f"bytes={pos}-{end}"}, egress)
+                            if resp.status != 206 or not (resp.getheader("Content-Range") or "").startswith(f"bytes {pos}-"):
+                                raise OSError(f"HTTP {resp.status} pour bytes={pos}-{end}")
+                            f.seek(pos)
+                            while pos <= end:
+                                chunk = resp.read(min(1 << 16, end - pos + 1))
+                                if not chunk:
+                                    raise OSError("connexion interrompue")
+                                f.write(chunk)
+                                pos += len(chunk)
+                                with lock:
+                                    done[0] += len(chunk)
+                                    if progress:
+                                        progress(done[0], size)
+                        except (OSError, http.client.HTTPException) as e:
+                            if conn is not None:
+                                conn.close()
+                                conn = None
+                            tries = 0 if pos > start else tries + 1
+                            if tries > SEGMENT_RETRIES:
+                                errors.append(e)
+                                break
+                            time.sleep(min(8.0, 0.5 * 2 ** tries))
         except Exception as e:
-            print(f"Impossible de charger l'icône: {e}")
+            errors.append(e)
+        finally:
+            if conn is not None:
+                conn.close()
 
-        self.proc = None
-        self.log_queue = queue.Queue()
-        self.after(100, self._drain_log_queue)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(connections, -(-size // step)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors or done[0] != size:
+        tmp.unlink(missing_ok=True)
+        raise errors[0] if errors else OSError(f"téléchargement incomplet ({done[0]}/{size} octets)")
+    os.replace(tmp, dest)
+    return size
 
-        self._init_vars()
-        self._build_ui()
+# ---------- Sorties réseau (adresses source, proxys) ----------
+# Une ligne par sortie : adresse IP locale (--source-address) ou URL de proxy
+# (--proxy). Les jobs simultanés sont répartis sur les sorties disponibles ;
+# une sortie bridée (429, limite de débit...) est mise en pause, une sortie
+# nettement plus lente que la meilleure ne reçoit un job qu'en dernier.
+EGRESS_FILE = _user_data_dir() / "egress.txt"
+EGRESS_COOLDOWN = 120  # s, doublé à chaque bridage consécutif
+EGRESS_COOLDOWN_MAX = 3600
+EGRESS_SLOW_RATIO = 0.3
+EGRESS_RATE_SMOOTHING = 0.3
+EGRESS_REFRESH_MS = 2000
+THROTTLE_RE = re.compile(r"HTTP Error 429|Too Many Requests|rate.?limit|confirm you.re not a bot", re.I)
 
-    def _init_vars(self):
-        # Main
-        self.url_var = tk.StringVar()
-        self.outdir_var = tk.StringVar(value=str(Path.home() / "sample/netdigger"))
+@dataclass
+class Egress:
+    spec: str
+    kind: str  # source | proxy
+    error: str | None = None  # dernière vérification échouée : sortie écartée
+    active: int = 0
+    jobs: int = 0
+    bytes: int = 0
+    secs: float = 0.0
+    rate: float | None = None  # octets / s, moyenne glissante
+    strikes: int = 0  # bridages consécutifs
+    paused_until: float = 0.0
 
-        # Settings audio
-        self.extra_args_var = tk.StringVar(value="")
-        self.format_var = tk.StringVar(value=DEFAULT_FORMAT)
-        self.sr_var = tk.IntVar(value=DEFAULT_SR)
-        self.bitdepth_var = tk.IntVar(value=DEFAULT_BIT_DEPTH)
-        self.channels_var = tk.IntVar(value=DEFAULT_CHANNELS)
-        self.vorbis_quality_var = tk.DoubleVar(value=5.0)
+def _parse_egress(line):
+    if "://" in line:
+        parts = urlsplit(line)
+        if not parts.hostname or not parts.port:
+            raise ValueError(f"proxy sans hôte ou port: {line!r}")
+        return Egress(line, "proxy")
+    ipaddress.ip_address(line)
+    return Egress(line, "source")
 
-        # yt-dlp source selection
-        self.ytdlp_source_var = tk.StringVar(value="local")  # system | local | custom
-        self.ytdlp_custom_path_var = tk.StringVar(value=self._which("yt-dlp") or "yt-dlp")
-        self.ytdlp_effective_var = tk.StringVar(value=self._resolve_ytdlp_path())
+def _egress_args(egress):
+    if egress is None:
+        return []
+    return ["--proxy", egress.spec] if egress.kind == "proxy" else ["--source-address", egress.spec]
 
-        # About
-        self.about_logo = None  # PhotoImage
-        self.help_loaded = False
+def _check_egress(egress):
+    # Adresse attribuable à un socket local / proxy joignable ; -> erreur ou None
+    try:
+        if egress.kind == "source":
+            family = socket.AF_INET6 if ipaddress.ip_address(egress.spec).version == 6 else socket.AF_INET
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.bind((egress.spec, 0))
+        else:
+            parts = urlsplit(egress.spec)
+            socket.create_connection((parts.hostname, parts.port), timeout=3).close()
+    except OSError as e:
+        return str(e)
+    return None
 
-    def _build_ui(self):
-        nb = ttk.Notebook(self)
-        nb.pack(fill="both", expand=True, padx=8, pady=8)
+class EgressPool:
+    # Manipulé depuis le thread Tk uniquement (lancement / fin des jobs)
+    def __init__(self):
+        self.items = []
 
-        main = ttk.Frame(nb)
-        settings = ttk.Frame(nb)
-        about = ttk.Frame(nb)
-        nb.add(main, text="Main")
-        nb.add(settings, text="Settings")
-        nb.add(about, text="About")
+    def load(self, lines):
+        # Garde les statistiques des sorties déjà connues ; -> lignes invalides
+        known = {e.spec: e for e in self.items}
+        items, errors = [], []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                items.append(known.get(line) or _parse_egress(line))
+            except ValueError as e:
+                errors.append(f"{line}: {e}")
+        self.items = items
+        return errors
 
-        # -------- MAIN TAB --------
-        frm = ttk.Frame(main)
-        frm.pack(fill="x", padx=8, pady=8)
+    def acquire(self):
+        usable = [e for e in self.items if e.error is None]
+        if not usable:
+            return None
+        now = time.time()
+        ready = [e for e in usable if e.paused_until <= now] or [min(usable, key=lambda e: e.paused_until)]
+        best = max((e.rate for e in ready if e.rate), default=None)
+        def load(e):
+            slow = best is not None and e.rate is not None and e.rate < EGRESS_SLOW_RATIO * best
+            return (slow, e.active, e.jobs)
+        egress = min(ready, key=load)
+        egress.active += 1
+        egress.jobs += 1
+        return egress
 
-        ttk.Label(frm, text="URL à télécharger:").grid(row=0, column=0, sticky="w")
-        url_ent = ttk.Entry(frm, textvariable=self.url_var)
-        url_ent.grid(row=1, column=0, columnspan=3, sticky="we", pady=(0,8))
-        frm.columnconfigure(0, weight=1)
+    def release(self, egress, nbytes, secs, throttled):
+        egress.active = max(0, egress.active - 1)
+        if nbytes and secs > 0:
+            sample = nbytes / secs
+            egress.rate = sample if egress.rate is None else egress.rate + EGRESS_RATE_SMOOTHING * (sample - egress.rate)
+            egress.bytes += nbytes
+            egress.secs += secs
+        if throttled:
+            egress.strikes += 1
+            egress.paused_until = time.time() + min(EGRESS_COOLDOWN_MAX, EGRESS_COOLDOWN * 2 ** (egress.strikes - 1))
+        elif nbytes:
+            egress.strikes = 0
+
+    def state(self, egress):
+        if egress.error:
+            return f"indisponible ({egress.error})"
+        left = egress.paused_until - time.time()
+        if left > 0:
+            return f"bridée, pause {_format_duration(left)}"
+        best = max((e.rate for e in self.items if e.rate and e.error is None), default=None)
+        if best and egress.rate and egress.rate < EGRESS_SLOW_RATIO * best:
+            return "lente"
+        return "ok"
+
+# ---------- Estimation du lot / espace disque ----------
+# Tailles estimées depuis l'info-json (durée, taille du flux source) ; un job
+# n'est lancé que si l'espace libre des dossiers de sortie et de travail
+# reste au-dessus de la réserve une fois les jobs en cours comptés
+DEFAULT_DISK_RESERVE_GB = 2
+DISK_RETRY_MS = 5000
+ESTIMATE_FLAC_RATIO = 0.6  # FLAC / PCM, valeur typique pour de la musique
+ESTIMATE_RATE = 2_000_000  # débit supposé par job (octets source / s) avant la première mesure
+ESTIMATE_RATE_SMOOTHING = 0.3
+ESTIMATE_KEYS = ("seconds", "source", "final", "out", "work")
+
+def _section_seconds(duration, sections):
+    if not sections:
+        return duration
+    return sum(max(0.0, min(duration, duration if end is None else end) - start) for start, end in sections)
+
+def _source_bytes(info, settings):
+    # Taille du flux que le plan choisirait, sinon débit x durée
+    plan = _plan_audio_format(info, settings)
+    formats = {f.get("format_id"): f for f in info.get("formats") or []}
+    f = formats.get(plan["format_id"], info) if plan else info
+    size = f.get("filesize") or f.get("filesize_approx")
+    rate = f.get("abr") or f.get("tbr")
+    if not size and rate:
+        size = rate * 125 * (info.get("duration") or 0)
+    return size or 0
+
+def _estimate_job(info, settings, sections=(), local=False):
+    # -> durée (s) et octets : source, sortie finale, pic dans le dossier de
+    # sortie, pic dans le dossier de travail ; playlist = somme des entrées
+    if info.get("_type") in ("playlist", "multi_video"):
+        parts = [_estimate_job(e, settings, sections, local) for e in info.get("entries") or [] if e]
+        return {k: sum(p[k] for p in parts) for k in ESTIMATE_KEYS}
+    duration = info.get("duration") or 0
+    seconds = _section_seconds(duration, sections)
+    source = _source_bytes(info, settings) * (seconds / duration if duration else 1)
+    pcm = seconds * settings["sr"] * settings["ch"] * settings["bd"] // 8
+    final = {"wav": pcm, "flac": pcm * ESTIMATE_FLAC_RATIO}.get(settings["fmt"], source)
+    if local:
+        # Source brute + PCM float décodé dans le dossier de travail
+        out, work = final, source + seconds * settings["sr"] * settings["ch"] * 4
+    else:
+        # Source et sortie coexistent le temps de la conversion
+        out, work = final + source, 0
+    return {"seconds": seconds, "source": int(source), "final": int(final), "out": int(out), "work": int(work)}
+
+def _disk_free(path):
+    # (périphérique, octets libres) du premier dossier existant de path
+    path = Path(path).absolute()
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return os.stat(path).st_dev, shutil.disk_usage(path).free
+
+def _format_duration(secs):
+    secs = int(secs)
+    if secs < 60:
+        return f"{secs} s"
+    h, m = divmod(round(secs / 60), 60)
+    return f"{h} h {m:02d} min" if h else f"{m} min"
+
+# ---------- Encodage local (pool de processus) ----------
+# Les fonctions exécutées dans le pool restent au niveau du module pour
+# être importables par les processus fils (spawn).
+PCM_FRAME_DTYPE = "f32le"  # source décodée : float 32 bits entrelacé
+
+def _ffmpeg_bin():
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+def _decode_to_pcm(src, dest, sr, ch, gain_db=0.0):
+    # Décodage unique de la source au format cible (fréquence / canaux, gain
+    # de normalisation appliqué au passage) ; renvoie le nombre de trames
+    gain = ["-af", f"volume={gain_db:.2f}dB"] if gain_db else []
+    subprocess.run(
+        [_ffmpeg_bin(), "-nostdin", "-v", "error", "-y", "-i", str(src), "-map", "0:a:0", *gain,
+         "-ar", str(sr), "-ac", str(ch), "-f", PCM_FRAME_DTYPE, str(dest)],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    return os.path.getsize(dest) // (4 * ch)
+
+def _feed_pcm(pcm, ch, start, end, stream):
+    # Envoie les trames [start, end[ de la source décodée, lues directement à
+    # leur position (découpe exacte à l'échantillon près), puis ferme le flux
+    frame = 4 * ch
+    try:
+        with open(pcm, "rb") as f:
+            f.seek(start * frame)
+            left = (end - start) * frame
+            while left > 0:
+                chunk = f.read(min(1 << 20, left))
+                if not chunk:
+                    break
+                stream.write(chunk)
+                left -= len(chunk)
+        stream.close()
+    except BrokenPipeError:
+        pass
+
+def _pcm_input_args(sr, ch):
+    return [_ffmpeg_bin(), "-nostdin", "-v", "error", "-y",
+            "-f", PCM_FRAME_DTYPE, "-ar", str(sr), "-ac", str(ch), "-i", "pipe:0"]
+
+def _check_ffmpeg(proc, name):
+    err = proc.stderr.read().decode("utf-8", "replace")
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg ({name}): {err.strip() or proc.returncode}")
+
+def _encode_pcm_segment(pcm, sr, ch, start, end, dest, fmt, bd, q, metadata=None):
+    # Encode les trames [start, end[ de la source décodée vers un fichier final
+    t0 = time.time()
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+    cmd = _pcm_input_args(sr, ch)
+    for key, value in (metadata or {}).items():
+        cmd += ["-metadata", f"{key}={value}"]
+    if fmt == "ogg":
+        cmd += ["-c:a", "libvorbis"]
+    cmd += _ffmpeg_audio_args(fmt, sr, bd, ch, q, resample=False, remix=False) + ["-f", fmt, str(part)]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _feed_pcm(pcm, ch, start, end, proc.stdin)
+    try:
+        _check_ffmpeg(proc, dest.name)
+    except RuntimeError:
+        part.unlink(missing_ok=True)
+        raise
+    part.replace(dest)
+    return str(dest), time.time() - t0
+
+# ---------- Encodage parallèle par segments (sources longues) ----------
+# Les segments sont alignés sur la taille de bloc FLAC imposée à l'encodeur :
+# chaque segment (sauf le dernier) contient un nombre entier de trames, que
+# l'on peut renuméroter et enchaîner sans toucher à l'audio.
+FLAC_BLOCK = 4096
+
+def _chunk_bounds(start, end, n, align=FLAC_BLOCK):
+    step = -(-(end - start) // max(1, n))
+    step = max(align, -(-step // align) * align)
+    bounds = list(range(start, end, step)) + [end]
+    return list(zip(bounds, bounds[1:]))
+
+def _wav_header(frames, sr, ch, bd):
+    # En-tête RIFF/WAVE canonique (WAVE_FORMAT_EXTENSIBLE au-delà de 16 bits
+    # ou 2 canaux, comme ffmpeg)
+    block = ch * bd // 8
+    fmt = struct.pack("<HHIIHH", 1, ch, sr, sr * block, block, bd)
+    if bd > 16 or ch > 2:
+        fmt = struct.pack("<HHIIHHHHI", 0xFFFE, ch, sr, sr * block, block, bd, 22, bd, {1: 4, 2: 3}.get(ch, 0))
+        fmt += b"\x01\x00\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"  # KSDATAFORMAT_SUBTYPE_PCM
+    data = frames * block
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + data) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", data))
+
+def _crc_table(poly, width):
+    top, mask = 1 << (width - 1), (1 << width) - 1
+    table = []
+    for i in range(256):
+        c = i << (width - 8)
+        for _ in range(8):
+            c = ((c << 1) ^ poly) & mask if c & top else (c << 1) & mask
+        table.append(c)
+    return table
+
+_CRC8_TABLE = _crc_table(0x07, 8)
+_CRC16_TABLE = _crc_table(0x8005, 16)
+
+def _crc8(data):
+    c = 0
+    for b in data:
+        c = _CRC8_TABLE[c ^ b]
+    return c
+
+def _crc16(data):
+    c = 0
+    for b in data:
+        c = ((c << 8) & 0xFFFF) ^ _CRC16_TABLE[(c >> 8) ^ b]
+    return c
+
+def _gf16_mul(a, b):
+    # Produit de polynômes modulo le polynôme du CRC-16 FLAC (x^16+x^15+x^2+1)
+    r = 0
+    while b:
+        if b & 1:
+            r ^= a
+        b >>= 1
+        a <<= 1
+        if a & 0x10000:
+            a ^= 0x18005
+    return r
+
+@functools.lru_cache(maxsize=None)
+def _crc16_xpow(nbytes):
+    # x^(8*nbytes) mod P (les tailles de trames se répètent : mis en cache)
+    result, base, n = 1, 0x100, nbytes
+    while n:
+        if n & 1:
+            result = _gf16_mul(result, base)
+        base = _gf16_mul(base, base)
+        n >>= 1
+    return result
+
+def _crc16_skip(crc, nbytes):
+    # Effet de nbytes octets sur un état CRC-16 : crc * x^(8*nbytes) mod P
+    return _gf16_mul(crc, _crc16_xpow(nbytes))
+
+def _flac_utf8(n):
+    # Numéro de trame codé "UTF-8" étendu (jusqu'à 36 bits)
+    if n < 0x80:
+        return bytes([n])
+    size = 2
+    while n >> (5 * size + 1):
+        size += 1
+    tail = []
+    for _ in range(size - 1):
+        tail.append(0x80 | (n & 0x3F))
+        n >>= 6
+    return bytes([((0xFF << (8 - size)) & 0xFF) | n] + tail[::-1])
+
+def _flac_utf8_len(first):
+    size = 0
+    while first & (0x80 >> size):
+        size += 1
+    return max(1, size)
+
+def _flac_renumber(frame, number):
+    # Réécrit le numéro d'une trame (blocs fixes) : CRC-8 recalculé sur
+    # l'en-tête, CRC-16 corrigé sans relire les sous-trames (le CRC est
+    # linéaire, seule la contribution de l'en-tête change)
+    num_len = _flac_utf8_len(frame[4])
+    end = 4 + num_len
+    end += {6: 1, 7: 2}.get(frame[2] >> 4, 0)
+    end += {12: 1, 13: 2, 14: 2}.get(frame[2] & 0x0F, 0)
+    old_head = frame[:end + 1]
+    head = frame[:4] + _flac_utf8(number) + frame[4 + num_len:end]
+    head += bytes([_crc8(head)])
+    body_len = len(frame) - len(old_head) - 2
+    crc = int.from_bytes(frame[-2:], "big") ^ _crc16_skip(_crc16(old_head) ^ _crc16(head), body_len)
+    return head + frame[end + 1:-2] + crc.to_bytes(2, "big")
+
+def _flac_comment_block(metadata):
+    vendor = b"Netdigger"
+    tags = {"title": "TITLE", "track": "TRACKNUMBER", "album": "ALBUM"}
+    comments = [f"{tags.get(k, k.upper())}={v}".encode("utf-8") for k, v in metadata.items()]
+    body = struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", len(comments))
+    for c in comments:
+        body += struct.pack("<I", len(c)) + c
+    return body
+
+def _join_flac(parts, dest, total_frames, metadata=None):
+    # parts : [(fichier FLAC d'un segment, tailles de ses trames)]
+    with open(parts[0][0], "rb") as f:
+        head = f.read(42)
+    if head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        raise RuntimeError("segment FLAC invalide (STREAMINFO absent)")
+    info = bytearray(head[8:42])
+    info[0:4] = struct.pack(">HH", FLAC_BLOCK, FLAC_BLOCK)
+    info[4:10] = bytes(6)  # tailles de trame min / max inconnues
+    info[13] = (info[13] & 0xF0) | ((total_frames >> 32) & 0x0F)
+    info[14:18] = (total_frames & 0xFFFFFFFF).to_bytes(4, "big")
+    info[18:34] = bytes(16)  # MD5 non calculé (autorisé par le format)
+    blocks = [(0, bytes(info))]
+    if metadata:
+        blocks.append((4, _flac_comment_block(metadata)))
+    number = 0
+    with open(dest, "wb") as out:
+        out.write(b"fLaC")
+        for i, (kind, body) in enumerate(blocks):
+            last = 0x80 if i == len(blocks) - 1 else 0
+            out.write(bytes([last | kind]) + len(body).to_bytes(3, "big") + body)
+        for path, sizes in parts:
+            with open(path, "rb") as f:
+                f.seek(os.path.getsize(path) - sum(sizes))
+                for size in sizes:
+                    frame = f.read(size)
+                    if len(frame) != size or frame[0] != 0xFF or frame[1] & 0xFE != 0xF8:
+                        raise RuntimeError(f"trame FLAC inattendue dans {Path(path).name}")
+                    out.write(_flac_renumber(frame, number))
+                    number += 1
+
+def _flac_frame_sizes(path):
+    # Tailles des trames telles que découpées par le parseur FLAC de ffmpeg
+    out = subprocess.run(
+        [_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a", "-c", "copy", "-f", "framecrc", "-"],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    ).stdout
+    return [int(line.split(",")[4]) for line in out.splitlines() if line and not line.startswith("#")]
+
+def _children_cpu():
+    t = os.times()
+    return t.children_user + t.children_system
+
+def _encode_pcm_chunk(pcm, sr, ch, start, end, dest, fmt, bd, offset=0):
+    # Un segment d'un encodage parallèle. WAV : PCM entier écrit en place dans
+    # le fichier final préalloué ; FLAC : fichier partiel + tailles des trames.
+    # "secs" = temps CPU de ffmpeg (temps réel si indisponible, ex. Windows)
+    t0, cpu0 = time.time(), _children_cpu()
+    name = Path(dest).name
+    if fmt == "wav":
+        cmd = _pcm_input_args(sr, ch) + ["-f", "s24le" if bd == 24 else "s16le", "pipe:1"]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        feeder = threading.Thread(target=_feed_pcm, args=(pcm, ch, start, end, proc.stdin), daemon=True)
+        feeder.start()
+        with open(dest, "r+b") as out:
+            out.seek(offset)
+            shutil.copyfileobj(proc.stdout, out, 1 << 20)
+        feeder.join()
+        _check_ffmpeg(proc, name)
+        return {"path": str(dest), "secs": (_children_cpu() - cpu0) or time.time() - t0, "sizes": None}
+    cmd = _pcm_input_args(sr, ch) + ["-frame_size", str(FLAC_BLOCK)]
+    cmd += _ffmpeg_audio_args(fmt, sr, bd, ch, 0, resample=False, remix=False) + ["-f", "flac", str(dest)]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _feed_pcm(pcm, ch, start, end, proc.stdin)
+    _check_ffmpeg(proc, name)
+    secs = (_children_cpu() - cpu0) or time.time() - t0
+    return {"path": str(dest), "secs": secs, "sizes": _flac_frame_sizes(dest)}
+
+def _safe_filename(text, fallback="sans titre"):
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", str(text or "")).strip(" .")
+    return name[:150] or fallback
+
+def _chapter_segments(chapters, frames, sr):
+    # (index, titre, trame début, trame fin) ; chaque chapitre s'arrête au
+    # début du suivant pour ne perdre aucun échantillon entre deux fichiers
+    chapters = sorted((c for c in chapters or [] if c.get("start_time") is not None),
+                      key=lambda c: c["start_time"])
+    segments = []
+    for i, chap in enumerate(chapters):
+        start = min(frames, max(0, round(chap["start_time"] * sr)))
+        if i + 1 < len(chapters):
+            end = round(chapters[i + 1]["start_time"] * sr)
+        elif chap.get("end_time") is not None:
+            end = round(chap["end_time"] * sr)
+        else:
+            end = frames
+        end = min(frames, end)
+        if end > start:
+            segments.append((len(segments) + 1, chap.get("title") or f"Chapitre {i + 1}", start, end))
+    return segments
+
+# ---------- En-têtes audio (pur Python, sans décodage) ----------
+AUDIO_EXTS = (".wav", ".flac", ".ogg")
+
+def _wav_info(path):
+    # RIFF/WAVE : format, position et taille du bloc "data"
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+            return None
+        info = {"format": "wav"}
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                break
+            cid, length = hdr[:4], struct.unpack("<I", hdr[4:])[0]
+            if cid == b"data":
+                info["data_offset"] = f.tell()
+                info["data_size"] = min(length, size - f.tell())  # tailles fausses des flux non finalisés
+                info["data_declared"] = length
+                break
+            body = f.read(length + (length & 1))
+            if cid == b"fmt " and length >= 16:
+                tag, ch, sr, _rate, block, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == 0xFFFE and length >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]  # sous-format de WAVE_FORMAT_EXTENSIBLE
+                info.update(tag=tag, codec={1: "pcm", 3: "float"}.get(tag, f"0x{tag:04x}"),
+                            channels=ch, sample_rate=sr, block_align=block, bits=bits)
+    if "channels" not in info or "data_offset" not in info or not info["block_align"]:
+        return None
+    info["frames"] = info["data_size"] // info["block_align"]
+    return info
+
+def _flac_info(path):
+    with open(path, "rb") as f:
+        head = f.read(42)
+    if head[:4] != b"fLaC" or head[4] & 0x7F != 0:
+        return None
+    si = head[8:42]
+    return {"format": "flac", "codec": "flac",
+            "sample_rate": (si[10] << 12) | (si[11] << 4) | (si[12] >> 4),
+            "channels": ((si[12] >> 1) & 0x07) + 1,
+            "bits": (((si[12] & 0x01) << 4) | (si[13] >> 4)) + 1,
+            "frames": ((si[13] & 0x0F) << 32) | int.from_bytes(si[14:18], "big")}
+
+def _ogg_info(path):
+    # Paquet d'identification (Vorbis / Opus) + granule de la dernière page
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        page = f.read(4096)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    if page[:4] != b"OggS":
+        return None
+    packet = page[27 + page[26]:]
+    last = tail.rfind(b"OggS")
+    granule = struct.unpack("<q", tail[last + 6:last + 14])[0] if last >= 0 and len(tail) >= last + 14 else 0
+    if packet[:7] == b"\x01vorbis":
+        ch, sr = struct.unpack("<BI", packet[11:16])
+        return {"format": "ogg", "codec": "vorbis", "channels": ch, "sample_rate": sr, "bits": 0, "frames": max(0, granule)}
+    if packet[:8] == b"OpusHead":
+        ch, preskip = struct.unpack("<BH", packet[9:12])
+        return {"format": "ogg", "codec": "opus", "channels": ch, "sample_rate": 48000, "bits": 0,
+                "frames": max(0, granule - preskip)}
+    return None
+
+def _audio_info(path):
+    # -> dict (format, codec, channels, sample_rate, bits, frames) ou None
+    reader = {".wav": _wav_info, ".flac": _flac_info, ".ogg": _ogg_info}.get(Path(path).suffix.lower())
+    if reader is None:
+        return None
+    try:
+        return reader(path)
+    except (OSError, struct.error, ValueError, IndexError):
+        return None
+
+# ---------- Vérification des sorties ----------
+# Contrôles sans décodage : en-tête et paramètres du flux, durée attendue,
+# dernière trame / page complète (CRC) ; le décodage complet est optionnel
+VERIFY_DURATION_TOLERANCE = 2.0  # s (durées yt-dlp arrondies, bornes des plages)
+VERIFY_TAIL = 1 << 17  # octets relus en fin de fichier pour la dernière trame / page
+_CRC32_OGG_TABLE = _crc_table(0x04C11DB7, 32)
+
+def _ogg_crc(data):
+    c = 0
+    for b in data:
+        c = ((c << 8) & 0xFFFFFFFF) ^ _CRC32_OGG_TABLE[(c >> 24) ^ b]
+    return c
+
+def _read_tail(path):
+    with open(path, "rb") as f:
+        f.seek(max(0, os.path.getsize(path) - VERIFY_TAIL))
+        return f.read()
+
+def _flac_last_frame(tail):
+    # -> (numéro, variable, taille de bloc) de la trame qui termine exactement
+    # le fichier (en-tête CRC-8 et trame CRC-16 valides), None sinon
+    pos = len(tail)
+    while True:
+        pos = tail.rfind(b"\xff", 0, pos)
+        if pos < 0:
+            return None
+        if pos + 6 > len(tail) or tail[pos + 1] & 0xFE != 0xF8:
+            continue
+        bs_code, sr_code = tail[pos + 2] >> 4, tail[pos + 2] & 0x0F
+        if bs_code == 0 or sr_code == 0x0F:
+            continue
+        first = tail[pos + 4]
+        size = _flac_utf8_len(first)
+        end = pos + 4 + size
+        end += {6: 1, 7: 2}.get(bs_code, 0) + {12: 1, 13: 2, 14: 2}.get(sr_code, 0)
+        if end + 3 > len(tail) or _crc8(tail[pos:end]) != tail[end]:
+            continue
+        if _crc16(tail[pos:-2]) != int.from_bytes(tail[-2:], "big"):
+            continue
+        number = first & (0x7F >> size) if size > 1 else first
+        for b in tail[pos + 5:pos + 4 + size]:
+            number = (number << 6) | (b & 0x3F)
+        extra = tail[pos + 4 + size:end]
+        if bs_code == 1:
+            block = 192
+        elif bs_code <= 5:
+            block = 576 << (bs_code - 2)
+        elif bs_code <= 7:
+            block = int.from_bytes(extra[:bs_code - 5], "big") + 1
+        else:
+            block = 256 << (bs_code - 8)
+        return number, bool(tail[pos + 1] & 0x01), block
+
+def _ogg_last_page(tail):
+    # -> en-tête de la page qui termine exactement le fichier (CRC valide), None sinon
+    pos = len(tail)
+    while True:
+        pos = tail.rfind(b"OggS", 0, pos)
+        if pos < 0:
+            return None
+        page = tail[pos:]
+        if len(page) < 27 or len(page) < 27 + page[26]:
+            continue
+        length = 27 + page[26] + sum(page[27:27 + page[26]])
+        if length != len(page):
+            continue
+        if _ogg_crc(page[:22] + bytes(4) + page[26:]) == struct.unpack("<I", page[22:26])[0]:
+            return page[:27]
+
+def _tail_problems(path, info):
+    problems = []
+    if info["format"] == "wav":
+        declared = info.get("data_declared", 0)
+        if declared < 0xFFFFFF00 and declared > info["data_size"]:
+            problems.append(f"fichier tronqué ({_human_size(info['data_size'])} de données sur {_human_size(declared)})")
+        elif info["data_size"] % info["block_align"]:
+            problems.append("dernière trame PCM incomplète")
+    elif info["format"] == "flac":
+        last = _flac_last_frame(_read_tail(path))
+        if last is None:
+            problems.append("dernière trame FLAC incomplète ou corrompue")
+        else:
+            with open(path, "rb") as f:
+                head = f.read(12)
+            number, variable, block = last
+            end = (number if variable else number * int.from_bytes(head[8:10], "big")) + block
+            if info["frames"] and end != info["frames"]:
+                problems.append(f"flux arrêté à {end} échantillons sur {info['frames']} annoncés")
+    elif info["format"] == "ogg":
+        page = _ogg_last_page(_read_tail(path))
+        if page is None:
+            problems.append("dernière page Ogg incomplète ou corrompue")
+        elif not page[5] & 0x04:
+            problems.append("fin de flux Ogg absente")
+    return problems
+
+def _expected_seconds(meta, sections):
+    # Durée attendue d'une sortie d'après les métadonnées yt-dlp (et la plage demandée)
+    duration = (meta or {}).get("duration")
+    if not duration:
+        return None
+    if not sections:
+        return float(duration)
+    start, end = sections[0]
+    return max(0.0, min(duration, duration if end is None else end) - start)
+
+def _verify_output(path, settings, expected=None):
+    # -> (infos de l'en-tête, [problèmes]) ; aucun décodage
+    fmt = settings["fmt"]
+    info = _audio_info(path)
+    if info is None:
+        return None, [f"en-tête {fmt.upper()} illisible"]
+    problems = []
+    if info["format"] != fmt or (fmt == "ogg" and info["codec"] != "vorbis"):
+        problems.append(f"format {info['format']}/{info['codec']} au lieu de {fmt}")
+    if info["sample_rate"] != settings["sr"]:
+        problems.append(f"{info['sample_rate']} Hz au lieu de {settings['sr']}")
+    if info["channels"] != settings["ch"]:
+        problems.append(f"{info['channels']} canaux au lieu de {settings['ch']}")
+    if fmt != "ogg" and info["bits"] != settings["bd"]:
+        problems.append(f"{info['bits']} bits au lieu de {settings['bd']}")
+    if not info["frames"]:
+        problems.append("aucun échantillon")
+    problems += _tail_problems(path, info)
+    secs = info["frames"] / info["sample_rate"] if info["sample_rate"] else 0.0
+    if expected and abs(secs - expected) > max(VERIFY_DURATION_TOLERANCE, 0.005 * expected):
+        problems.append(f"durée {_format_ts(secs)} au lieu de {_format_ts(expected)}")
+    info["seconds"] = secs
+    return info, problems
+
+def _decode_errors(path):
+    # Processus du pool : décodage complet, messages d'erreur de ffmpeg (vide si sain)
+    res = subprocess.run([_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a", "-f", "null", "-"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    errors = [l for l in res.stderr.splitlines() if l.strip()]
+    if res.returncode != 0 and not errors:
+        errors.append(f"ffmpeg code {res.returncode}")
+    return errors
+
+def _transcode_file(src, dest, fmt, sr, bd, ch, q):
+    # Processus du pool : nouvelle conversion d'une source déjà téléchargée
+    dest = Path(dest)
+    part = dest.with_name(dest.name + ".part")
+    cmd = [_ffmpeg_bin(), "-nostdin", "-v", "error", "-y", "-i", str(src), "-map", "0:a:0"]
+    if fmt == "ogg":
+        cmd += ["-c:a", "libvorbis"]
+    cmd += _ffmpeg_audio_args(fmt, sr, bd, ch, q) + ["-f", fmt, str(part)]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    part.replace(dest)
+    return str(dest)
+
+# ---------- Conversion de fichiers locaux ----------
+# Arborescence de fichiers audio / vidéo convertie avec les réglages audio
+# des jobs ; un manifeste dans le dossier de sortie mémorise la source
+# (taille, date) et les réglages de chaque sortie pour sauter ce qui est à jour
+INGEST_EXTS = AUDIO_EXTS + (".mp3", ".m4a", ".aac", ".opus", ".wma", ".aif", ".aiff", ".mp4", ".m4v", ".mkv", ".webm",
+                            ".mov", ".avi", ".flv")
+INGEST_MANIFEST = ".netdigger-ingest.json"
+INGEST_REPORT_S = 5
+
+def _ingest_key(settings):
+    return f"{settings['fmt']}/{settings['sr']}/{settings['bd']}/{settings['ch']}/{settings['q']:g}"
+
+def _load_ingest_manifest(out_root):
+    try:
+        return json.loads((Path(out_root) / INGEST_MANIFEST).read_text("utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_ingest_manifest(out_root, manifest):
+    path = Path(out_root) / INGEST_MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest), "utf-8")
+    os.replace(tmp, path)
+
+def _ingest_plan(src_root, out_root, settings, manifest):
+    # -> ([(chemin relatif, source, sortie, signature)], fichiers à jour, [(source, sortie déjà prise)])
+    src_root, out_root = Path(src_root), Path(out_root)
+    key = _ingest_key(settings)
+    todo, fresh, clashes, taken = [], 0, [], {}
+    for root, dirs, names in os.walk(src_root):
+        dirs[:] = sorted(x for x in dirs if Path(root, x) != out_root)
+        for name in sorted(names):
+            src = Path(root) / name
+            if not name.lower().endswith(INGEST_EXTS) or name.startswith("."):
+                continue
+            rel = str(src.relative_to(src_root).with_suffix(f".{settings['fmt']}"))
+            if rel in taken:
+                clashes.append((src, taken[rel]))
+                continue
+            taken[rel] = src
+            st = src.stat()
+            dest = out_root / rel
+            sig = [st.st_size, st.st_mtime_ns, key]
+            entry = manifest.get(rel)
+            try:
+                if entry and entry[:3] == sig and dest.stat().st_size == entry[3]:
+                    fresh += 1
+                    continue
+            except OSError:
+                pass
+            todo.append((rel, src, dest, sig))
+    return todo, fresh, clashes
+
+def _ingest_file(src, dest, fmt, sr, bd, ch, q):
+    # Processus du pool : conversion d'un fichier, durée lue dans l'en-tête de la sortie
+    t0 = time.time()
+    Path(dest).parent.mkdir(parents=True, exist_ok=True)
+    _transcode_file(src, dest, fmt, sr, bd, ch, q)
+    info = _audio_info(dest)
+    seconds = info["frames"] / info["sample_rate"] if info and info["sample_rate"] else 0.0
+    return {"size": os.path.getsize(dest), "seconds": seconds, "secs": time.time() - t0}
+
+# ---------- Découpage automatique (silences / attaques) ----------
+SLICE_BLOCK_MS = 10
+SLICE_MIN_GAP_MS = 80  # silences plus courts : rattachés au son qui les entoure
+SLICE_ONSET_RISE_DB = 12.0  # hausse d'énergie d'un bloc au suivant considérée comme une attaque
+DEFAULT_SLICE_THRESHOLD_DB = -50
+DEFAULT_SLICE_MIN_MS = 150
+DEFAULT_SLICE_PAD_MS = 20
+
+def _pcm_samples(path, info):
+    # -> (échantillons (trames, canaux[, 3]), type, octets bruts ou None).
+    # WAV PCM entier : memmap du fichier, sans copie ; sinon décodage ffmpeg
+    # en float32 dans un tampon
+    if info["format"] == "wav" and info.get("tag") == 1 and info["bits"] in (16, 24, 32):
+        width, ch = info["bits"] // 8, info["channels"]
+        raw = np.memmap(path, dtype=np.uint8, mode="r", offset=info["data_offset"],
+                        shape=(info["frames"] * width * ch,))
+        samples = raw.reshape(-1, ch, 3) if width == 3 else raw.view(f"<i{width}").reshape(-1, ch)
+        return samples, f"i{info['bits']}", raw
+    out = subprocess.run([_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a:0",
+                          "-f", PCM_FRAME_DTYPE, "pipe:1"],
+                         check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+    return np.frombuffer(out, dtype="<f4").reshape(-1, info["channels"]), "f32", None
+
+def _as_float(x, kind):
+    if kind == "i24":
+        v = x[..., 0].astype(np.int32) | (x[..., 1].astype(np.int32) << 8) | (x[..., 2].astype(np.int32) << 16)
+        return ((v << 8) >> 8).astype(np.float32) * np.float32(1 / 8388608)
+    if kind == "i16":
+        return x.astype(np.float32) * np.float32(1 / 32768)
+    if kind == "i32":
+        return x.astype(np.float32) * np.float32(1 / 2147483648)
+    return x
+
+def _block_db(samples, kind, block):
+    # Niveau RMS (dBFS) par bloc, canaux confondus ; calcul par tranches
+    # d'environ 1 M trames pour borner la mémoire sur les fichiers mappés
+    nblocks = len(samples) // block
+    out = np.empty(nblocks, dtype=np.float32)
+    step = max(1, (1 << 20) // block)
+    for i in range(0, nblocks, step):
+        j = min(nblocks, i + step)
+        x = _as_float(samples[i * block:j * block], kind)
+        power = np.square(x, dtype=np.float32).reshape(j - i, -1).mean(axis=1)
+        out[i:j] = 10 * np.log10(power + 1e-12)
+    return out
+
+def _find_slices(db, block, frames, sr, params):
+    # Zones au-dessus du seuil (blocs), éventuellement recoupées aux attaques,
+    # puis converties en trames avec la marge demandée
+    loud = db > params["threshold_db"]
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], loud.view(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    if len(starts) > 1:
+        keep = (starts[1:] - ends[:-1]) * block >= SLICE_MIN_GAP_MS * sr // 1000
+        starts, ends = starts[np.r_[True, keep]], ends[np.r_[keep, True]]
+    min_blocks = max(1, params["min_ms"] * sr // 1000 // block)
+    pad = params["pad_ms"] * sr // 1000
+    onsets = np.empty(0, dtype=np.int64)
+    if params.get("onsets"):
+        onsets = np.flatnonzero((np.diff(db) > SLICE_ONSET_RISE_DB) & loud[1:]) + 1
+    slices = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if end - start < min_blocks:
+            continue
+        cuts = [start]
+        lo, hi = np.searchsorted(onsets, [start + min_blocks, end - min_blocks + 1])
+        for onset in onsets[lo:hi].tolist():
+            if onset - cuts[-1] >= min_blocks:
+                cuts.append(onset)
+        cuts.append(end)
+        # Marge avant chaque attaque / après la fin de zone, bornée au fichier
+        bounds = [max(0, cuts[0] * block - pad)] + [max(0, c * block - pad) for c in cuts[1:-1]]
+        bounds.append(min(frames, cuts[-1] * block + pad))
+        slices.extend(zip(bounds, bounds[1:]))
+    # Pas de chevauchement entre deux zones voisines
+    for i in range(1, len(slices)):
+        if slices[i][0] < slices[i - 1][1]:
+            mid = (slices[i][0] + slices[i - 1][1]) // 2
+            slices[i - 1], slices[i] = (slices[i - 1][0], mid), (mid, slices[i][1])
+    return [(a, b) for a, b in slices if b > a]
+
+def _encode_float_buffer(buf, sr, ch, dest, fmt, bd, q):
+    cmd = _pcm_input_args(sr, ch)
+    if fmt == "ogg":
+        cmd += ["-c:a", "libvorbis"]
+    cmd += _ffmpeg_audio_args(fmt, sr, bd, ch, q, resample=False, remix=False) + ["-f", fmt, str(dest)]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        proc.stdin.write(memoryview(np.ascontiguousarray(buf)).cast("B"))
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    _check_ffmpeg(proc, Path(dest).name)
+
+def _slice_audio_file(path, params):
+    # Tâche du pool : découpe un fichier en "<nom> slices/<nom> NNN.<ext>".
+    # Les tranches WAV sont écrites directement depuis le fichier mappé.
+    t0 = time.time()
+    path = Path(path)
+    info = _audio_info(path)
+    if not info or not info.get("channels") or not info.get("sample_rate"):
+        raise RuntimeError(f"format non reconnu: {path.name}")
+    sr, ch, fmt = info["sample_rate"], info["channels"], info["format"]
+    samples, kind, raw = _pcm_samples(path, info)
+    block = max(1, sr * SLICE_BLOCK_MS // 1000)
+    bounds = _find_slices(_block_db(samples, kind, block), block, len(samples), sr, params)
+    out_dir = path.with_name(f"{path.stem} slices")
+    out_dir.mkdir(exist_ok=True)
+    prefix = f"{path.stem} "
+    for old in out_dir.iterdir():
+        if old.name.startswith(prefix) and re.fullmatch(r"\d{3,}\." + fmt, old.name[len(prefix):]):
+            old.unlink()
+    written = []
+    for i, (a, b) in enumerate(bounds, 1):
+        dest = out_dir / f"{prefix}{i:03d}.{fmt}"
+        if raw is not None:
+            frame = info["block_align"]
+            with open(dest, "wb") as f:
+                f.write(_wav_header(b - a, sr, ch, info["bits"]))
+                f.write(raw[a * frame:b * frame])
+        else:
+            _encode_float_buffer(samples[a:b], sr, ch, dest, fmt, params["bd"], params["q"])
+        written.append(str(dest))
+    return {"path": str(path), "slices": written, "secs": time.time() - t0}
+
+# ---------- Formes d'onde (fichiers de pics multi-résolution) ----------
+# Un fichier de pics par sortie : min / max par tranche de 256 trames puis
+# par facteur 4 (256 … 262144 trames / pic). L'affichage ne lit que ces
+# pics ; ils ne sont recalculés que si le fichier audio a changé (mtime / taille).
+PEAK_MAGIC = b"NDPK"
+PEAK_VERSION = 1
+PEAK_BASE = 256
+PEAK_FACTOR = 4
+PEAK_LEVELS = 6
+_PEAK_HEAD = struct.Struct("<4sHHqqIQ")  # magic, version, canaux, mtime_ns, taille, fréquence, trames
+
+def _peak_path(path):
+    key = hashlib.sha1(str(Path(path).resolve()).encode("utf-8")).hexdigest()
+    return PEAKS_DIR / f"{key}.peaks"
+
+def _iter_pcm_chunks(path, info, frames_per_chunk):
+    # Blocs float32 (trames, canaux) : memmap pour les WAV PCM, sinon sortie
+    # de ffmpeg lue morceau par morceau (jamais tout le fichier en mémoire)
+    if info["format"] == "wav" and info.get("tag") == 1 and info["bits"] in (16, 24, 32):
+        samples, kind, _raw = _pcm_samples(path, info)
+        for i in range(0, len(samples), frames_per_chunk):
+            yield _as_float(samples[i:i + frames_per_chunk], kind)
+        return
+    yield from _ffmpeg_pcm_chunks(path, info["channels"], frames_per_chunk)
+
+def _ffmpeg_pcm_chunks(path, ch, frames_per_chunk, args=()):
+    # args : conversion éventuelle (-ar / -ac), ch doit correspondre à la sortie
+    proc = subprocess.Popen([_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a:0", *args,
+                             "-f", PCM_FRAME_DTYPE, "pipe:1"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = proc.stdout.read(frames_per_chunk * 4 * ch)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // (4 * ch) * 4 * ch], dtype="<f4").reshape(-1, ch)
+    finally:
+        proc.stdout.close()
+        _check_ffmpeg(proc, Path(path).name)
+
+def _peak_counts(frames):
+    counts = [-(-frames // PEAK_BASE)]
+    for _ in range(1, PEAK_LEVELS):
+        counts.append(-(-counts[-1] // PEAK_FACTOR))
+    return counts
+
+def _build_peaks(path):
+    # Tâche du pool : calcule et écrit le fichier de pics de `path`
+    t0 = time.time()
+    st = os.stat(path)
+    info = _audio_info(path)
+    if not info or not info.get("channels"):
+        raise RuntimeError(f"format non reconnu: {Path(path).name}")
+    finest, frames = [], 0
+    for chunk in _iter_pcm_chunks(path, info, PEAK_BASE * 4096):
+        frames += len(chunk)
+        lo, hi = chunk.min(axis=1), chunk.max(axis=1)
+        pad = (-len(lo)) % PEAK_BASE  # seul le dernier morceau est incomplet
+        if pad:
+            lo, hi = np.pad(lo, (0, pad), mode="edge"), np.pad(hi, (0, pad), mode="edge")
+        finest.append(np.stack([lo.reshape(-1, PEAK_BASE).min(axis=1), hi.reshape(-1, PEAK_BASE).max(axis=1)], axis=1))
+    levels = [np.concatenate(finest) if finest else np.zeros((0, 2), np.float32)]
+    for _ in range(1, PEAK_LEVELS):
+        prev = levels[-1]
+        pad = (-len(prev)) % PEAK_FACTOR
+        if pad:
+            prev = np.concatenate([prev, np.repeat(prev[-1:], pad, axis=0)])
+        prev = prev.reshape(-1, PEAK_FACTOR, 2)
+        levels.append(np.stack([prev[:, :, 0].min(axis=1), prev[:, :, 1].max(axis=1)], axis=1))
+    dest = _peak_path(path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PEAK_HEAD.pack(PEAK_MAGIC, PEAK_VERSION, info["channels"], st.st_mtime_ns, st.st_size,
+                                info["sample_rate"], frames))
+        for level in levels:
+            f.write((np.clip(level, -1, 1) * 32767).astype("<i2").tobytes())
+    tmp.replace(dest)
+    return {"path": str(path), "peaks": str(dest), "secs": time.time() - t0}
+
+def _load_peaks(path):
+    # -> {"sr", "frames", "levels"} si le fichier de pics est à jour, sinon None
+    peaks = _peak_path(path)
+    try:
+        st = os.stat(path)
+        with open(peaks, "rb") as f:
+            head = _PEAK_HEAD.unpack(f.read(_PEAK_HEAD.size))
+    except (OSError, struct.error):
+        return None
+    magic, version, _ch, mtime_ns, size, sr, frames = head
+    if magic != PEAK_MAGIC or version != PEAK_VERSION or mtime_ns != st.st_mtime_ns or size != st.st_size:
+        return None
+    data = np.fromfile(peaks, dtype="<i2", offset=_PEAK_HEAD.size)
+    levels, pos = [], 0
+    for count in _peak_counts(frames):
+        levels.append(data[pos:pos + 2 * count].reshape(-1, 2))
+        pos += 2 * count
+    if pos != len(data):
+        return None
+    return {"sr": sr, "frames": frames, "levels": levels}
+
+def _peak_columns(peaks, start, end, width):
+    # min / max (-1..1) par colonne de pixels pour les trames [start, end[,
+    # depuis le niveau le plus grossier encore assez fin
+    span = max(1, end - start)
+    level = 0
+    while level + 1 < PEAK_LEVELS and PEAK_BASE * PEAK_FACTOR ** (level + 1) <= span / width:
+        level += 1
+    spp = PEAK_BASE * PEAK_FACTOR ** level
+    data = peaks["levels"][level]
+    a, b = start // spp, min(len(data), -(-end // spp))
+    if b <= a:
+        return np.zeros(width), np.zeros(width)
+    edges = a + (np.arange(width + 1) * (b - a)) // width
+    if b - a >= width:
+        lo = np.minimum.reduceat(data[a:b, 0], edges[:-1] - a)
+        hi = np.maximum.reduceat(data[a:b, 1], edges[:-1] - a)
+    else:
+        cols = np.minimum(edges[:-1], b - 1)
+        lo, hi = data[cols, 0], data[cols, 1]
+    return lo / 32767.0, hi / 32767.0
+
+def _format_ts(secs):
+    # Inverse de _parse_timestamp : "m:ss.mmm" / "h:mm:ss.mmm"
+    h, rest = divmod(max(0.0, secs), 3600)
+    m, s = divmod(rest, 60)
+    return f"{int(h)}:{int(m):02d}:{s:06.3f}" if h else f"{int(m)}:{s:06.3f}"
+
+# ---------- Analyse (loudness, crête, tempo, tonalité) ----------
+# Un seul décodage en flux par fichier ; tout est calculé par blocs NumPy.
+LOUDNESS_BLOCK_HZ = 10  # sous-blocs de 100 ms (blocs BS.1770 de 400 ms, pas de 100 ms)
+LOUDNESS_MEASURE_SR = 48000
+DEFAULT_NORMALIZE_LUFS = -14.0
+NORMALIZE_CEILING_DB = -1.0  # crête échantillon maximale après normalisation
+ANALYSIS_FFT = 4096
+ANALYSIS_HOP = 1024
+HASH_CHUNK = 1 << 23
+KEY_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+_KEY_MAJOR = [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]  # Krumhansl-Kessler
+_KEY_MINOR = [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]
+
+def _file_hash(path):
+    # Empreinte du contenu (indépendante du nom / de la date), lue par
+    # grandes tranches d'un mmap
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as view:
+                for i in range(0, size, HASH_CHUNK):
+                    h.update(view[i:i + HASH_CHUNK])
+    return h.hexdigest()
+
+def _k_weighting(sr, n):
+    # Gain en puissance du filtre de pondération K (BS.1770, coefficients
+    # recalculés pour sr) aux fréquences d'une rfft de n points, avec les
+    # facteurs de Parseval : somme(|X|² * w) = moyenne quadratique filtrée
+    k = math.tan(math.pi * 1681.974450955533 / sr)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    k = math.tan(math.pi * 38.13547087602444 / sr)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    z = np.exp(-1j * 2 * np.pi * np.fft.rfftfreq(n))
+    def resp(b, a):
+        return (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    w = np.abs(resp(shelf_b, shelf_a) * resp(hp_b, hp_a)) ** 2
+    w[1:(n + 1) // 2] *= 2  # rfft : chaque bin hors DC / Nyquist compte double
+    return w / (n * n)
+
+def _block_powers(chunk, sub, kw, ch):
+    # Puissance K-pondérée de chaque sous-bloc complet de 100 ms, par canal
+    n = len(chunk) // sub * sub
+    spec = np.fft.rfft(chunk[:n].reshape(-1, sub, ch), axis=1)
+    return np.einsum("bfc,f->bc", spec.real ** 2 + spec.imag ** 2, kw)
+
+def _integrated_loudness(sub_powers, ch):
+    # sub_powers : puissance K-pondérée par sous-bloc de 100 ms et par canal
+    if len(sub_powers) < 4:
+        return None
+    gains = np.ones(ch)
+    if ch == 6:
+        gains = np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])  # 5.1 : LFE ignoré, surround +1.5 dB
+    z = (sub_powers[:-3] + sub_powers[1:-2] + sub_powers[2:-1] + sub_powers[3:]) / 4
+    power = z @ gains
+    loud = -0.691 + 10 * np.log10(power + 1e-20)
+    gated = loud > -70
+    if not gated.any():
+        return None
+    relative = -0.691 + 10 * np.log10(power[gated].mean()) - 10
+    gated &= loud > relative
+    return float(-0.691 + 10 * np.log10(power[gated].mean()))
+
+def _estimate_tempo(env, fps):
+    # Autocorrélation (FFT) de l'enveloppe d'attaques, pondérée autour de 120 BPM
+    if len(env) < fps * 5:
+        return None
+    env = env - env.mean()
+    n = len(env)
+    spec = np.fft.rfft(env, 2 * n)
+    ac = np.fft.irfft(spec * np.conj(spec))[:n]
+    lags = np.arange(1, n)
+    bpm = 60 * fps / lags
+    mask = (bpm >= 60) & (bpm <= 200)
+    if not mask.any():
+        return None
+    score = ac[1:][mask] * np.exp(-0.5 * np.log2(bpm[mask] / 120) ** 2)
+    lag = float(lags[mask][np.argmax(score)])
+    i = int(lag)
+    if 1 <= i < n - 1:
+        a, b, c = ac[i - 1], ac[i], ac[i + 1]
+        den = a - 2 * b + c
+        if den:
+            lag += 0.5 * (a - c) / den
+    return round(float(60 * fps / lag), 1)
+
+def _estimate_key(chroma):
+    if not chroma.any():
+        return None
+    profiles = np.array([np.roll(_KEY_MAJOR, k) for k in range(12)] + [np.roll(_KEY_MINOR, k) for k in range(12)])
+    profiles = (profiles - profiles.mean(axis=1, keepdims=True)) / profiles.std(axis=1, keepdims=True)
+    c = (chroma - chroma.mean()) / (chroma.std() or 1)
+    best = int(np.argmax(profiles @ c))
+    return f"{KEY_NAMES[best % 12]} {'maj' if best < 12 else 'min'}"
+
+def _analyze_samples(chunks, sr, ch):
+    # chunks : blocs float32 (trames, canaux) de longueur multiple de sr / 10
+    sub = sr // LOUDNESS_BLOCK_HZ
+    kw = _k_weighting(sr, sub)
+    chroma_map = _chroma_map(sr, ANALYSIS_FFT, 55, 5000)
+    window = np.hanning(ANALYSIS_FFT).astype(np.float32)
+    powers, env = [], []
+    chroma = np.zeros(12)
+    peak, frames = 0.0, 0
+    tail, prev = np.zeros(0, np.float32), None
+    for chunk in chunks:
+        frames += len(chunk)
+        if len(chunk):
+            peak = max(peak, float(np.abs(chunk).max()))
+        if len(chunk) >= sub:
+            powers.append(_block_powers(chunk, sub, kw, ch))
+        # STFT mono continue d'un bloc à l'autre (reste conservé dans tail)
+        tail = np.concatenate([tail, chunk.mean(axis=1)])
+        count = (len(tail) - ANALYSIS_FFT) // ANALYSIS_HOP + 1 if len(tail) >= ANALYSIS_FFT else 0
+        if count:
+            win = np.lib.stride_tricks.sliding_window_view(tail, ANALYSIS_FFT)[::ANALYSIS_HOP][:count]
+            mag = np.abs(np.fft.rfft(win * window, axis=1))
+            chroma += (mag ** 2).sum(axis=0) @ chroma_map
+            logmag = np.log1p(mag)
+            stacked = np.vstack([logmag[:1] if prev is None else prev, logmag])
+            env.append(np.maximum(np.diff(stacked, axis=0), 0).sum(axis=1))
+            prev = logmag[-1:]
+            tail = tail[count * ANALYSIS_HOP:]
+    sub_powers = np.concatenate(powers) if powers else np.zeros((0, ch))
+    loudness = _integrated_loudness(sub_powers, ch)
+    return {
+        "loudness": None if loudness is None else round(loudness, 2),
+        "peak": round(20 * math.log10(peak), 2) if peak > 0 else None,
+        "tempo": _estimate_tempo(np.concatenate(env), sr / ANALYSIS_HOP) if env else None,
+        "key": _estimate_key(chroma),
+        "duration": round(frames / sr, 3),
+        "sample_rate": sr,
+        "channels": ch,
+    }
+
+def _analyze_audio_file(path, db_path=None):
+    # Tâche du pool : empreinte du contenu, puis analyse sauf si ce contenu
+    # est déjà dans le cache (fichier copié / renommé)
+    t0 = time.time()
+    st = os.stat(path)
+    digest = _file_hash(path)
+    data = AnalysisCache(db_path).by_hash(digest) if db_path else None
+    if data is None:
+        info = _audio_info(path)
+        if not info or not info.get("channels") or not info.get("sample_rate"):
+            raise RuntimeError(f"format non reconnu: {Path(path).name}")
+        sr = info["sample_rate"]
+        data = _analyze_samples(_iter_pcm_chunks(path, info, sr // LOUDNESS_BLOCK_HZ * 100), sr, info["channels"])
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest,
+            "data": data, "secs": time.time() - t0}
+
+def _analysis_summary(data):
+    parts = []
+    if data.get("loudness") is not None:
+        parts.append(f"{data['loudness']:.1f} LUFS")
+    if data.get("peak") is not None:
+        parts.append(f"crête {data['peak']:.1f} dBFS")
+    if data.get("tempo"):
+        parts.append(f"{data['tempo']:.1f} BPM")
+    if data.get("key"):
+        parts.append(data["key"])
+    return ", ".join(parts) or "silence"
+
+def _measure_loudness(chunks, sr, ch):
+    # Première passe de normalisation : loudness intégrée et crête seulement
+    sub = sr // LOUDNESS_BLOCK_HZ
+    kw = _k_weighting(sr, sub)
+    powers, peak = [], 0.0
+    for chunk in chunks:
+        if len(chunk):
+            peak = max(peak, float(np.abs(chunk).max()))
+        if len(chunk) >= sub:
+            powers.append(_block_powers(chunk, sub, kw, ch))
+    loudness = _integrated_loudness(np.concatenate(powers) if powers else np.zeros((0, ch)), ch)
+    return {"loudness": None if loudness is None else round(loudness, 2),
+            "peak": round(20 * math.log10(peak), 2) if peak > 0 else None}
+
+def _measure_source(path, ch, db_path):
+    # Tâche du pool : mesure d'une source téléchargée dans la disposition de
+    # canaux de sortie, mise en cache par empreinte (indépendante du format /
+    # de la fréquence d'export, mesurée à LOUDNESS_MEASURE_SR)
+    t0 = time.time()
+    digest = _file_hash(path)
+    cache = AnalysisCache(db_path)
+    data = cache.measured(digest, ch)
+    if data is None:
+        sr = LOUDNESS_MEASURE_SR
+        data = _measure_loudness(_ffmpeg_pcm_chunks(path, ch, sr // LOUDNESS_BLOCK_HZ * 100,
+                                                    ["-ar", str(sr), "-ac", str(ch)]), sr, ch)
+        cache.store_loudness(digest, ch, data)
+        data["cached"] = False
+    else:
+        data["cached"] = True
+    data["secs"] = time.time() - t0
+    return data
+
+def _normalize_gain(measure, target):
+    # Gain linéaire vers la cible, réduit si la crête dépasserait le plafond
+    if measure.get("loudness") is None:
+        return 0.0
+    gain = target - measure["loudness"]
+    if measure.get("peak") is not None:
+        gain = min(gain, NORMALIZE_CEILING_DB - measure["peak"])
+    return round(gain, 2)
+
+class AnalysisCache:
+    # Résultats d'analyse par empreinte de contenu ; (chemin, taille, mtime)
+    # -> empreinte pour ne même pas relire les fichiers inchangés
+    def __init__(self, path=None):
+        self.path = Path(path or ANALYSIS_DB)
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)")
+        con.execute("CREATE TABLE IF NOT EXISTS analysis (hash TEXT PRIMARY KEY, data TEXT, updated REAL)")
+        con.execute("CREATE TABLE IF NOT EXISTS loudness (hash TEXT, channels INTEGER, loudness REAL, peak REAL, "
+                    "PRIMARY KEY (hash, channels))")
+        return con
+
+    def clear(self):
+        # Vidé table par table plutôt que supprimé : les jobs en cours gardent
+        # une base valide et écrivent simplement de nouveaux résultats
+        con = self._connect()
+        try:
+            with con:
+                for table in ("files", "analysis", "loudness"):
+                    con.execute(f"DELETE FROM {table}")
+            con.execute("VACUUM")
+        finally:
+            con.close()
+
+    def by_hash(self, digest):
+        con = self._connect()
+        try:
+            row = con.execute("SELECT data FROM analysis WHERE hash = ?", (digest,)).fetchone()
+        finally:
+            con.close()
+        return json.loads(row[0]) if row else None
+
+    def known(self, path, st):
+        # Résultat en cache si le fichier n'a pas changé depuis son dernier passage
+        con = self._connect()
+        try:
+            row = con.execute(
+                "SELECT a.data FROM files f JOIN analysis a ON a.hash = f.hash "
+                "WHERE f.path = ? AND f.size = ? AND f.mtime_ns = ?",
+                (str(path), st.st_size, st.st_mtime_ns)
+            ).fetchone()
+        finally:
+            con.close()
+        return json.loads(row[0]) if row else None
+
+    def measured(self, digest, ch):
+        con = self._connect()
+        try:
+            row = con.execute("SELECT loudness, peak FROM loudness WHERE hash = ? AND channels = ?", (digest, ch)).fetchone()
+        finally:
+            con.close()
+        return {"loudness": row[0], "peak": row[1]} if row else None
+
+    def store_loudness(self, digest, ch, data):
+        con = self._connect()
+        try:
+            with con:
+                con.execute("INSERT OR REPLACE INTO loudness VALUES (?, ?, ?, ?)", (digest, ch, data["loudness"], data["peak"]))
+        finally:
+            con.close()
+
+    def store(self, result):
+        con = self._connect()
+        try:
+            with con:
+                con.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                            (result["path"], result["size"], result["mtime_ns"], result["hash"]))
+                con.execute("INSERT OR REPLACE INTO analysis VALUES (?, ?, ?)",
+                            (result["hash"], json.dumps(result["data"]), time.time()))
+        finally:
+            con.close()
+
+# ---------- Bibliothèque (index des sorties, recherche plein texte) ----------
+# En-têtes lus en pur Python (_audio_info) + métadonnées yt-dlp capturées au
+# téléchargement ; SQLite FTS5 pour la recherche, inotify pour les mises à jour
+LIBRARY_COLUMNS = ("size", "mtime_ns", "format", "codec", "sample_rate", "bits", "channels", "duration")
+LIBRARY_META = ("title", "uploader", "tags", "description", "url")
+LIBRARY_LIMIT = 500
+
+def _library_row(path, st):
+    info = _audio_info(path) or {}
+    sr = info.get("sample_rate") or 0
+    return (st.st_size, st.st_mtime_ns, info.get("format"), info.get("codec"), sr or None,
+            info.get("bits") or None, info.get("channels"), info["frames"] / sr if sr and "frames" in info else None)
+
+def _library_meta(meta):
+    # Dictionnaire yt-dlp (%(.{...})j) -> colonnes de la bibliothèque
+    tags = meta.get("tags") or []
+    return (meta.get("title"), meta.get("uploader") or meta.get("channel"),
+            ", ".join(tags) if isinstance(tags, list) else str(tags),
+            meta.get("description"), meta.get("webpage_url"))
+
+def _fts_query(text):
+    # Chaque mot devient un préfixe, tous requis : "kick 909" -> "kick"* "909"*
+    return " ".join(f'"{t}"*' for t in re.findall(r"\w+", text))
+
+class LibraryIndex:
+    # Une connexion par appel : utilisée depuis le thread Tk, les jobs et le watcher
+    def __init__(self, path=None):
+        self.path = Path(path or LIBRARY_DB)
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, "
+                    + ", ".join(LIBRARY_COLUMNS + LIBRARY_META) + ")")
+        con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5("
+                    "name, title, uploader, tags, description, tokenize='unicode61 remove_diacritics 2')")
+        con.execute("CREATE TABLE IF NOT EXISTS fingerprints (path TEXT PRIMARY KEY, codes BLOB, head BLOB)")
+        # Compteur de modifications des empreintes, tenu par la base elle-même :
+        # vu par tous les processus et toutes les connexions (FingerprintIndex)
+        con.execute("CREATE TABLE IF NOT EXISTS fingerprints_version (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER)")
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            con.execute(f"CREATE TRIGGER IF NOT EXISTS fingerprints_{event.lower()} AFTER {event} ON fingerprints "
+                        "BEGIN INSERT INTO fingerprints_version VALUES (1, 1) "
+                        "ON CONFLICT(id) DO UPDATE SET n = n + 1; END")
+        con.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, partial TEXT, full TEXT)")
+        return con
+
+    def _refresh_fts(self, con, path):
+        row = con.execute("SELECT id, title, uploader, tags, description FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        p = Path(path)
+        con.execute("DELETE FROM files_fts WHERE rowid = ?", (row[0],))
+        con.execute("INSERT INTO files_fts (rowid, name, title, uploader, tags, description) VALUES (?, ?, ?, ?, ?, ?)",
+                    (row[0], f"{p.parent.name} {p.stem}", *row[1:]))
+
+    def _upsert(self, con, path, st):
+        con.execute(f"INSERT INTO files (path, {', '.join(LIBRARY_COLUMNS)}) VALUES (?{', ?' * len(LIBRARY_COLUMNS)}) "
+                    f"ON CONFLICT(path) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in LIBRARY_COLUMNS)}",
+                    (path, *_library_row(path, st)))
+
+    def update_many(self, items):
+        # items : [(chemin, stat)] ; les métadonnées déjà connues sont conservées
+        con = self._connect()
+        try:
+            with con:
+                for path, st in items:
+                    self._upsert(con, path, st)
+                    self._refresh_fts(con, path)
+        finally:
+            con.close()
+
+    def set_meta(self, path, meta):
+        path = str(path)
+        con = self._connect()
+        try:
+            with con:
+                self._upsert(con, path, os.stat(path))
+                con.execute(f"UPDATE files SET {', '.join(f'{c} = ?' for c in LIBRARY_META)} WHERE path = ?",
+                            (*_library_meta(meta), path))
+                self._refresh_fts(con, path)
+        finally:
+            con.close()
+
+    def remove(self, paths, prefix=False):
+        # prefix : chemins de dossiers, tout leur contenu est retiré
+        con = self._connect()
+        try:
+            with con:
+                for path in paths:
+                    if prefix:
+                        lo = path.rstrip(os.sep) + os.sep
+                        where, args = "path >= ? AND path < ?", (lo, lo[:-1] + chr(ord(os.sep) + 1))
+                    else:
+                        where, args = "path = ?", (path,)
+                    con.execute(f"DELETE FROM files_fts WHERE rowid IN (SELECT id FROM files WHERE {where})", args)
+                    con.execute(f"DELETE FROM fingerprints WHERE {where}", args)
+                    con.execute(f"DELETE FROM hashes WHERE {where}", args)
+                    con.execute(f"DELETE FROM files WHERE {where}", args)
+        finally:
+            con.close()
+
+    def clear(self):
+        # Vidé en place (watcher, jobs et dédoublonnage peuvent écrire en même
+        # temps) ; les empreintes audio sont gardées : coûteuses à recalculer et
+        # toujours valables pour leur chemin, retirées avec leur fichier
+        con = self._connect()
+        try:
+            with con:
+                for table in ("files_fts", "files", "hashes"):
+                    con.execute(f"DELETE FROM {table}")
+        finally:
+            con.close()
+
+    def rename(self, old, new):
+        # Même audio dans un autre fichier (compactage) : métadonnées et empreinte
+        # reportées (le compteur fingerprints_version fait recharger FingerprintIndex)
+        con = self._connect()
+        try:
+            with con:
+                con.execute("DELETE FROM files_fts WHERE rowid IN (SELECT id FROM files WHERE path = ?)", (new,))
+                con.execute("DELETE FROM files WHERE path = ?", (new,))
+                con.execute("UPDATE files SET path = ? WHERE path = ?", (new, old))
+                con.execute("INSERT OR REPLACE INTO fingerprints SELECT ?, codes, head FROM fingerprints WHERE path = ?", (new, old))
+                con.execute("DELETE FROM fingerprints WHERE path = ?", (old,))
+                con.execute("DELETE FROM hashes WHERE path IN (?, ?)", (old, new))
+                self._upsert(con, new, os.stat(new))
+                self._refresh_fts(con, new)
+        finally:
+            con.close()
+
+    def hashes(self, paths):
+        # -> {chemin: (taille, mtime_ns, empreinte partielle, complète)}
+        con = self._connect()
+        try:
+            out = {}
+            for path in paths:
+                row = con.execute("SELECT size, mtime_ns, partial, full FROM hashes WHERE path = ?", (path,)).fetchone()
+                if row:
+                    out[path] = row
+            return out
+        finally:
+            con.close()
+
+    def store_hashes(self, rows):
+        con = self._connect()
+        try:
+            with con:
+                con.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                                [(path, *row) for path, row in rows.items()])
+        finally:
+            con.close()
+
+    def snapshot(self, root):
+        lo = str(root).rstrip(os.sep) + os.sep
+        con = self._connect()
+        try:
+            rows = con.execute("SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?",
+                               (lo, lo[:-1] + chr(ord(os.sep) + 1))).fetchall()
+        finally:
+            con.close()
+        return {path: (size, mtime) for path, size, mtime in rows}
+
+    def search(self, text, limit=LIBRARY_LIMIT):
+        cols = "f.path, f.title, f.duration, f.sample_rate, f.bits, f.channels, f.uploader"
+        query = _fts_query(text)
+        con = self._connect()
+        try:
+            total = con.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            if not query:
+                rows = con.execute(f"SELECT {cols} FROM files f ORDER BY f.id DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = con.execute(f"SELECT {cols} FROM files_fts JOIN files f ON f.id = files_fts.rowid "
+                                   "WHERE files_fts MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+        finally:
+            con.close()
+        return rows, total
+
+def _scan_library(root, index=None):
+    # Réindexation incrémentale : seuls les fichiers nouveaux / modifiés sont
+    # relus ; -> (mis à jour, retirés, total)
+    index = index or LibraryIndex()
+    root = os.path.abspath(root)
+    known = index.snapshot(root)
+    changed, present = [], set()
+    for dirpath, _dirs, names in os.walk(root):
+        for name in names:
+            if not name.lower().endswith(AUDIO_EXTS):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            present.add(path)
+            if known.get(path) != (st.st_size, st.st_mtime_ns):
+                changed.append((path, st))
+    gone = [p for p in known if p not in present]
+    index.update_many(changed)
+    index.remove(gone)
+    return len(changed), len(gone), len(present)
+
+# inotify (Linux) via ctypes : pas de dépendance
+IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x8, 0x40, 0x80
+IN_CREATE, IN_DELETE, IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x100, 0x200, 0x4000, 0x8000, 0x40000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class DirWatcher:
+    # Surveillance récursive d'un dossier ; on_event(chemin, quoi) est appelé
+    # depuis le thread du watcher, quoi = changed | removed | removed_dir | rescan
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, root, on_event):
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify indisponible sur ce système")
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.root = root
+        self.on_event = on_event
+        self.dirs = {}
+        self._stop = threading.Event()
+        self._watch_tree(root)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _watch_tree(self, top):
+        for dirpath, _dirs, _names in os.walk(top):
+            wd = self._add(self.fd, os.fsencode(dirpath), self.MASK)
+            if wd >= 0:
+                self.dirs[wd] = dirpath
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not select.select([self.fd], [], [], 0.5)[0]:
+                continue
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                continue
+            pos = 0
+            while pos + _INOTIFY_EVENT.size <= len(data):
+                wd, mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, pos)
+                name = data[pos + _INOTIFY_EVENT.size:pos + _INOTIFY_EVENT.size + length].rstrip(b"\0")
+                pos += _INOTIFY_EVENT.size + length
+                try:
+                    self._dispatch(wd, mask, name)
+                except Exception:
+                    pass  # un événement illisible ne doit pas arrêter la surveillance
+        os.close(self.fd)
+
+    def _dispatch(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            self.on_event(self.root, "rescan")
+            return
+        if mask & IN_IGNORED:
+            self.dirs.pop(wd, None)
+            return
+        base = self.dirs.get(wd)
+        if base is None:
+            return
+        path = os.path.join(base, os.fsdecode(name))
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                # Des fichiers ont pu arriver avant la pose de la surveillance
+                self._watch_tree(path)
+                self.on_event(path, "rescan")
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.on_event(path, "removed_dir")
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self.on_event(path, "changed")
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self.on_event(path, "removed")
+
+    def close(self):
+        self._stop.set()
+
+# ---------- Empreintes audio (détection des ré-uploads) ----------
+# Chroma par trame sur un mono à 11 025 Hz : codes 32 bits par trame (forme
+# et évolution du chroma, robustes au codec / gain / rééchantillonnage) pour
+# la vérification, et "tête" de blocs de chroma d'une seconde pour la
+# recherche du plus proche voisin sur tout l'index
+FP_SR = 11025
+FP_FFT = 2048
+FP_HOP = 1024
+FP_BLOCK = 11  # trames par bloc de tête (~1 s)
+FP_HEAD_BLOCKS = 30
+FP_WINDOW = 20  # blocs comparés ; décalage toléré = FP_HEAD_BLOCKS - FP_WINDOW
+FP_MAX_SECONDS = 180  # codes conservés pour le début de chaque fichier
+FP_PROBE_SECONDS = 30
+FP_MIN_SECONDS = 20
+FP_CANDIDATE_SIM = 0.6
+FP_MAX_BER = 0.25  # taux d'erreur binaire maximal d'un doublon
+
+def _chroma_map(sr, n, lo, hi):
+    # Bins d'une rfft de n points -> 12 classes de hauteur (0 = do)
+    freqs = np.fft.rfftfreq(n, 1 / sr)
+    valid = (freqs >= lo) & (freqs <= hi)
+    pitch = (np.round(12 * np.log2(freqs[valid] / 440)).astype(np.int64) + 9) % 12
+    chroma_map = np.zeros((len(freqs), 12))
+    chroma_map[np.flatnonzero(valid), pitch] = 1
+    return chroma_map
+
+def _fingerprint_samples(x):
+    # x : mono float32 à FP_SR -> (codes uint32, tête float16 (blocs, 12)) ou None
+    if len(x) < FP_MIN_SECONDS * FP_SR:
+        return None
+    win = np.lib.stride_tricks.sliding_window_view(x, FP_FFT)[::FP_HOP]
+    power = np.abs(np.fft.rfft(win * np.hanning(FP_FFT).astype(np.float32), axis=1)) ** 2
+    chroma = np.log1p(1e3 * (power @ _chroma_map(FP_SR, FP_FFT, 55, 3520)) / (power.sum(axis=1, keepdims=True) + 1e-12))
+    c = np.cumsum(np.vstack([np.zeros((1, 12)), chroma]), axis=0)
+    c = (c[3:] - c[:-3]) / 3  # lissage sur 3 trames
+    bits = np.concatenate([
+        c[2:] > np.roll(c[2:], -1, axis=1),
+        c[2:] > c[:-2],
+        (c[2:] > np.roll(c[2:], -3, axis=1))[:, :8],
+    ], axis=1)
+    codes = np.packbits(bits, axis=1, bitorder="little").view("<u4")[:, 0]
+    blocks = len(chroma) // FP_BLOCK
+    head = chroma[:blocks * FP_BLOCK].reshape(blocks, FP_BLOCK, 12).mean(axis=1)[:FP_HEAD_BLOCKS]
+    head = head - head.mean(axis=1, keepdims=True)
+    head /= np.linalg.norm(head, axis=1, keepdims=True) + 1e-9
+    if len(head) < FP_HEAD_BLOCKS:
+        head = np.vstack([head, np.zeros((FP_HEAD_BLOCKS - len(head), 12))])
+    return codes.astype("<u4"), head.astype(np.float16)
+
+def _fingerprint_file(path, seconds=FP_MAX_SECONDS):
+    # Tâche du pool : empreinte du début du fichier (None si trop court)
+    t0 = time.time()
+    res = subprocess.run([_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a:0", "-t", str(seconds),
+                          "-ac", "1", "-ar", str(FP_SR), "-f", PCM_FRAME_DTYPE, "pipe:1"],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if res.returncode != 0:
+        raise RuntimeError(f"ffmpeg ({Path(path).name}): {res.stderr.decode('utf-8', 'replace').strip()}")
+    fp = _fingerprint_samples(np.frombuffer(res.stdout, dtype="<f4"))
+    return {"path": str(path), "codes": None if fp is None else fp[0].tobytes(),
+            "head": None if fp is None else fp[1].tobytes(), "secs": time.time() - t0}
+
+def _head_similarity(heads, query):
+    # heads (N, blocs, 12), query (blocs, 12) : meilleure corrélation moyenne
+    # sur FP_WINDOW blocs, l'un ou l'autre début décalé -> (sim (N,), décalage en blocs (N,))
+    span = FP_HEAD_BLOCKS - FP_WINDOW
+    scores = []
+    for shift in range(-span, span + 1):
+        a, b = (shift, 0) if shift >= 0 else (0, -shift)
+        scores.append(np.einsum("nbc,bc->n", heads[:, a:a + FP_WINDOW], query[b:b + FP_WINDOW]) / FP_WINDOW)
+    scores = np.stack(scores, axis=1)
+    best = scores.argmax(axis=1)
+    return scores[np.arange(len(heads)), best], best - span
+
+def _code_ber(stored, query, center, radius):
+    # Taux d'erreur binaire minimal entre les codes de la requête et ceux du
+    # fichier, pour des décalages de trames dans [center - radius, center + radius]
+    best = 1.0
+    for off in range(center - radius, center + radius + 1):
+        a, b = max(0, off), max(0, -off)
+        n = min(len(stored) - a, len(query) - b)
+        if n < FP_WINDOW * FP_BLOCK:
+            continue
+        diff = np.bitwise_xor(stored[a:a + n], query[b:b + n])
+        best = min(best, np.unpackbits(diff.view(np.uint8)).sum() / (32 * n))
+    return best
+
+class FingerprintIndex:
+    # Têtes de tous les fichiers gardées en mémoire (une matrice) : la
+    # recherche du plus proche voisin est un produit matriciel ; rechargée
+    # quand fingerprints_version (tenu par des triggers) a changé
+    def __init__(self, library=None):
+        self.library = library or LibraryIndex()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._paths, self._heads = [], None
+
+    def add(self, path, codes, head):
+        con = self.library._connect()
+        try:
+            with con:
+                con.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)", (str(path), codes, head))
+        finally:
+            con.close()
+        with self._lock:
+            self._stamp = None
+
+    def missing(self, root):
+        # Fichiers indexés sous root sans empreinte
+        lo = str(root).rstrip(os.sep) + os.sep
+        con = self.library._connect()
+        try:
+            return [r[0] for r in con.execute(
+                "SELECT f.path FROM files f LEFT JOIN fingerprints p ON p.path = f.path "
+                "WHERE p.path IS NULL AND f.path >= ? AND f.path < ?", (lo, lo[:-1] + chr(ord(os.sep) + 1)))]
+        finally:
+            con.close()
+
+    def _load(self, con):
+        stamp = con.execute("SELECT COALESCE(MAX(n), 0) FROM fingerprints_version").fetchone()[0]
+        if stamp == self._stamp:
+            return
+        rows = con.execute("SELECT path, head FROM fingerprints WHERE head IS NOT NULL").fetchall()
+        self._paths = [r[0] for r in rows]
+        self._heads = (np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float16)
+                       .reshape(len(rows), FP_HEAD_BLOCKS, 12).astype(np.float32))
+        self._stamp = stamp
+
+    def match(self, codes, head, exclude=(), candidates=5):
+        # -> (chemin, taux d'erreur) du meilleur doublon probable, ou None
+        query_codes = np.frombuffer(codes, dtype="<u4")
+        query_head = np.frombuffer(head, dtype=np.float16).reshape(FP_HEAD_BLOCKS, 12).astype(np.float32)
+        con = self.library._connect()
+        try:
+            with self._lock:
+                self._load(con)
+                if not self._paths:
+                    return None
+                sims, shifts = _head_similarity(self._heads, query_head)
+                paths = self._paths
+            best = None
+            for i in np.argsort(-sims)[:candidates]:
+                if sims[i] < FP_CANDIDATE_SIM or paths[i] in exclude:
+                    continue
+                row = con.execute("SELECT codes FROM fingerprints WHERE path = ?", (paths[i],)).fetchone()
+                if row is None or not os.path.exists(paths[i]):
+                    continue
+                ber = _code_ber(np.frombuffer(row[0], dtype="<u4"), query_codes, int(shifts[i]) * FP_BLOCK, FP_BLOCK)
+                if ber <= FP_MAX_BER and (best is None or ber < best[1]):
+                    best = (paths[i], ber)
+            return best
+        finally:
+            con.close()
+
+# ---------- Doublons exacts (reflinks / liens physiques) ----------
+# Taille, puis empreinte partielle (début + fin), puis empreinte complète :
+# la plupart des fichiers ne sont jamais lus en entier
+DEDUPE_PARTIAL = 1 << 16
+FICLONE = 0x40049409  # ioctl Linux (Btrfs, XFS, ...) : copie à la demande
+
+def _partial_hash(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, "little"))
+        h.update(f.read(DEDUPE_PARTIAL))
+        if size > 2 * DEDUPE_PARTIAL:
+            f.seek(-DEDUPE_PARTIAL, os.SEEK_END)
+            h.update(f.read())
+    return h.hexdigest()
+
+def _content_groups(index, paths):
+    # Groupes de chemins au contenu identique ; empreintes mises en cache
+    # dans la bibliothèque (invalidées par taille / mtime)
+    by_size = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size:
+            by_size.setdefault(st.st_size, []).append((path, st))
+    candidates = [items for items in by_size.values() if len(items) > 1]
+    if not candidates:
+        return []
+    cached = index.hashes([p for items in candidates for p, _st in items])
+    updates = {}
+    for kind, func in ((0, _partial_hash), (1, _file_hash)):
+        nxt = []
+        for items in candidates:
+            buckets = {}
+            for path, st in items:
+                row = updates.get(path) or cached.get(path)
+                if row is None or tuple(row[:2]) != (st.st_size, st.st_mtime_ns):
+                    row = [st.st_size, st.st_mtime_ns, None, None]
+                row = updates[path] = list(row)
+                if row[2 + kind] is None:
+                    row[2 + kind] = func(path)
+                buckets.setdefault(row[2 + kind], []).append((path, st))
+            nxt += [b for b in buckets.values() if len(b) > 1]
+        candidates = nxt
+    index.store_hashes(updates)
+    return [[p for p, _st in items] for items in candidates]
+
+def _link_duplicate(keeper, dup):
+    # Remplace dup par un reflink de keeper si le système de fichiers le
+    # permet, sinon par un lien physique ; -> "reflink" | "hardlink"
+    dup = Path(dup)
+    tmp = dup.with_name(f".{dup.name}.nd-dedupe")
+    st = os.stat(dup)
+    method = None
+    if fcntl is not None:
+        try:
+            with open(keeper, "rb") as src, open(tmp, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.chmod(tmp, stat.S_IMODE(st.st_mode))
+            method = "reflink"
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    if method is None:
+        os.link(keeper, tmp)
+        method = "hardlink"
+    try:
+        os.replace(tmp, dup)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+    return method
+
+def _dedupe_library(root, index=None, only=None, log=None):
+    # Fichiers identiques de la bibliothèque sous root remplacés par des liens
+    # vers le plus ancien ; only : ne traiter que les groupes contenant l'un
+    # de ces chemins (nouvelles sorties). -> (fichiers liés, octets libérés)
+    index = index or LibraryIndex()
+    known = index.snapshot(root)
+    fresh = set(map(str, only or ()))
+    if only is not None:
+        sizes = {known[p][0] for p in fresh if p in known}
+        paths = [p for p, (size, _mtime) in known.items() if size in sizes]
+    else:
+        paths = list(known)
+    linked = saved = 0
+    for group in _content_groups(index, paths):
+        if only is not None and not fresh & set(group):
+            continue
+        stats = {p: os.stat(p) for p in group}
+        keeper = min(group, key=lambda p: (p in fresh, stats[p].st_mtime_ns))
+        for path in group:
+            a, b = stats[path], stats[keeper]
+            if path == keeper or (a.st_dev, a.st_ino) == (b.st_dev, b.st_ino) or a.st_dev != b.st_dev:
+                continue
+            method = _link_duplicate(keeper, path)
+            linked += 1
+            saved += a.st_size
+            if log:
+                log(f"{Path(path).name} -> {method} de {keeper} ({_human_size(a.st_size)} libérés)")
+    return linked, saved
+
+# ---------- Compactage WAV -> FLAC (maintenance) ----------
+# WAV peu utilisés encodés en FLAC par un pool de processus en priorité basse ;
+# l'original n'est supprimé qu'après comparaison des empreintes du PCM
+DEFAULT_COMPACT_DAYS = 90
+DEFAULT_COMPACT_MBPS = 50
+DEFAULT_COMPACT_WORKERS = 2
+COMPACT_IO_FACTOR = 2 * (1 + ESTIMATE_FLAC_RATIO)  # octets lus + écrits par octet de WAV (encodage puis relecture des deux)
+COMPACT_INTERVAL_MS = 24 * 3600 * 1000
+COMPACT_START_MS = 10 * 60 * 1000  # premier passage automatique après le démarrage
+
+def _background_priority():
+    # Initialiseur du pool : CPU et E/S au plus bas, hérités par ffmpeg
+    if os.name == "nt":
+        # La classe de priorité est héritée par ffmpeg ; le mode arrière-plan
+        # (E/S et mémoire basses) ne vaut que pour le processus du pool
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x00000040)  # IDLE_PRIORITY_CLASS
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x00100000)  # PROCESS_MODE_BACKGROUND_BEGIN
+        return
+    os.nice(19)
+    if shutil.which("ionice"):
+        subprocess.run(["ionice", "-c", "3", "-p", str(os.getpid())], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _compact_candidates(root, days):
+    # WAV PCM 16 / 24 bits non lus depuis days jours, sans FLAC du même nom
+    cutoff = time.time() - days * 86400
+    found = []
+    for dirpath, _dirs, names in os.walk(root):
+        for name in names:
+            if not name.lower().endswith(".wav"):
+                continue
+            path = Path(dirpath) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            # atime figé (noatime) : la date de modification fait foi
+            if max(st.st_atime, st.st_mtime) > cutoff or path.with_suffix(".flac").exists():
+                continue
+            info = _audio_info(path)
+            if info and info["codec"] == "pcm" and info["bits"] in (16, 24) and info["data_declared"] == info["data_size"]:
+                found.append((str(path), st.st_size))
+    return found
+
+def _pcm_digest(chunks):
+    h = hashlib.sha256()
+    for chunk in chunks:
+        h.update(chunk)
+    return h.hexdigest()
+
+def _wav_data_chunks(path, info):
+    with open(path, "rb") as f:
+        f.seek(info["data_offset"])
+        left = info["data_size"]
+        while left:
+            chunk = f.read(min(HASH_CHUNK, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            yield chunk
+
+def _flac_pcm_chunks(path, bits):
+    # PCM entier décodé par ffmpeg, même disposition que les données WAV
+    proc = subprocess.Popen([_ffmpeg_bin(), "-nostdin", "-v", "error", "-i", str(path), "-map", "0:a:0",
+                             "-f", "s24le" if bits == 24 else "s16le", "-"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            chunk = proc.stdout.read(HASH_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        proc.stdout.close()
+        _check_ffmpeg(proc, Path(path).name)
+
+def _compact_wav(path):
+    # Processus du pool : FLAC écrit à côté du WAV puis vérifié (PCM identique
+    # au bit près) ; l'appelant met l'index à jour puis supprime l'original
+    t0 = time.time()
+    src = Path(path)
+    info = _wav_info(src)
+    dest = src.with_suffix(".flac")
+    part = dest.with_name(dest.name + ".part")
+    try:
+        subprocess.run([_ffmpeg_bin(), "-nostdin", "-v", "error", "-y", "-i", str(src), "-map", "0:a:0", "-map_metadata", "0",
+                        "-c:a", "flac", *_sample_fmt_args("flac", info["bits"]), "-f", "flac", str(part)],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if _pcm_digest(_flac_pcm_chunks(part, info["bits"])) != _pcm_digest(_wav_data_chunks(src, info)):
+            raise RuntimeError("PCM décodé différent de l'original, WAV conservé")
+        shutil.copystat(src, part)
+        os.replace(part, dest)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return {"path": str(src), "dest": str(dest), "before": os.path.getsize(src), "after": os.path.getsize(dest),
+            "secs": time.time() - t0}
+
+# ---------- Déplacement vers le dossier final ----------
+# Les sorties sont produites dans le dossier local (scratch) puis copiées
+# vers le dossier final (NAS...) par un pool de threads séparé des jobs
+DEFAULT_MOVE_WORKERS = 2
+
+def _move_output(src, dest):
+    # Copie vérifiée (empreinte relue à l'arrivée) puis renommage atomique ;
+    # la copie locale n'est supprimée qu'une fois la destination en place
+    src, dest = Path(src), Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if os.stat(src).st_dev == os.stat(dest.parent).st_dev:
+        os.replace(src, dest)
+        return
+    tmp = dest.with_name(f".{dest.name}.nd-move")
+    try:
+        shutil.copyfile(src, tmp)
+        shutil.copystat(src, tmp)
+        if _file_hash(tmp) != _file_hash(src):
+            raise OSError(f"copie corrompue: {dest}")
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    src.unlink()
+
+# ---------- File partagée (plusieurs machines) ----------
+# Base SQLite sur un partage commun : l'interface y dépose les jobs, des
+# workers sans interface (netdigger --worker) les prennent sous bail
+QUEUE_LEASE = 60  # s sans battement avant que le job soit rendu à la file
+QUEUE_HEARTBEAT = 10
+QUEUE_POLL = 5
+QUEUE_MAX_ATTEMPTS = 3  # baux expirés (worker disparu) avant de passer le job en erreur
+QUEUE_LOG_TAIL = 200
+QUEUE_REFRESH_MS = 3000
+QUEUE_JOB_BASE = 1_000_000  # ids locaux des jobs de la file, distincts de ceux de l'interface (BATCH_DIR)
+
+class SharedQueue:
+    # Journal classique et non WAL : la mémoire partagée du WAL ne traverse pas
+    # le réseau ; chaque écriture est une transaction BEGIN IMMEDIATE courte
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=DELETE")
+        con.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, url TEXT, outdir TEXT, sections TEXT, settings TEXT, "
+                    "state TEXT, worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, cancel INTEGER DEFAULT 0, "
+                    "progress TEXT DEFAULT '', outputs TEXT DEFAULT '[]', log TEXT DEFAULT '', created REAL, updated REAL)")
+        con.execute("CREATE TABLE IF NOT EXISTS workers (name TEXT PRIMARY KEY, seen REAL, running INTEGER)")
+        return con
+
+    def _write(self, fn):
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                res = fn(con)
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            con.execute("COMMIT")
+            return res
+        finally:
+            con.close()
+
+    def submit(self, entries):
+        # entries : [(url, dossier de sortie, plages, réglages)]
+        now = time.time()
+        return self._write(lambda con: [
+            con.execute("INSERT INTO jobs (url, outdir, sections, settings, state, created, updated) VALUES (?, ?, ?, ?, 'en attente', ?, ?)",
+                        (url, outdir, json.dumps(sections), json.dumps(settings), now, now)).lastrowid
+            for url, outdir, sections, settings in entries])
+
+    def lease(self, worker):
+        # Rend d'abord à la file les jobs dont le bail a expiré, puis prend le plus ancien
+        def fn(con):
+            now = time.time()
+            con.execute("UPDATE jobs SET state = CASE WHEN cancel THEN 'arrêté' WHEN attempts >= ? THEN 'erreur' ELSE 'en attente' END, "
+                        "progress = 'bail expiré (' || worker || ')', worker = NULL, updated = ? "
+                        "WHERE state = 'en cours' AND lease_until < ?", (QUEUE_MAX_ATTEMPTS, now, now))
+            row = con.execute("SELECT * FROM jobs WHERE state = 'en attente' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                con.execute("UPDATE jobs SET state = 'en cours', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                            "progress = '', updated = ? WHERE id = ?", (worker, now + QUEUE_LEASE, now, row["id"]))
+            return row
+        return self._write(fn)
+
+    def heartbeat(self, job_id, worker, progress):
+        # None : bail perdu (expiré puis repris ailleurs) ; sinon True si annulation demandée
+        def fn(con):
+            now = time.time()
+            cur = con.execute("UPDATE jobs SET lease_until = ?, progress = ?, updated = ? WHERE id = ? AND worker = ? AND state = 'en cours'",
+                              (now + QUEUE_LEASE, progress, now, job_id, worker))
+            if cur.rowcount == 0:
+                return None
+            return bool(con.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+        return self._write(fn)
+
+    def finish(self, job_id, worker, state, outputs, log):
+        def fn(con):
+            cur = con.execute("UPDATE jobs SET state = ?, outputs = ?, log = ?, progress = '', lease_until = NULL, updated = ? "
+                              "WHERE id = ? AND worker = ? AND state = 'en cours'",
+                              (state, json.dumps(outputs), "\n".join(log[-QUEUE_LOG_TAIL:]), time.time(), job_id, worker))
+            return cur.rowcount > 0
+        return self._write(fn)
+
+    def release(self, job_id, worker):
+        # Arrêt propre d'un worker : le job repart sans compter de tentative
+        self._write(lambda con: con.execute(
+            "UPDATE jobs SET state = 'en attente', worker = NULL, lease_until = NULL, attempts = attempts - 1, progress = '', updated = ? "
+            "WHERE id = ? AND worker = ? AND state = 'en cours'", (time.time(), job_id, worker)))
+
+    def seen(self, worker, running):
+        # running < 0 : worker arrêté
+        def fn(con):
+            if running < 0:
+                con.execute("DELETE FROM workers WHERE name = ?", (worker,))
+            else:
+                con.execute("INSERT OR REPLACE INTO workers (name, seen, running) VALUES (?, ?, ?)", (worker, time.time(), running))
+        self._write(fn)
+
+    def cancel(self, ids):
+        # Jobs en attente arrêtés tout de suite, jobs en cours au prochain battement de leur worker
+        marks = ", ".join("?" * len(ids))
+        def fn(con):
+            now = time.time()
+            con.execute(f"UPDATE jobs SET state = 'arrêté', updated = ? WHERE state = 'en attente' AND id IN ({marks})", (now, *ids))
+            con.execute(f"UPDATE jobs SET cancel = 1, updated = ? WHERE state = 'en cours' AND id IN ({marks})", (now, *ids))
+        self._write(fn)
+
+    def retry(self):
+        return self._write(lambda con: con.execute(
+            "UPDATE jobs SET state = 'en attente', worker = NULL, attempts = 0, cancel = 0, progress = '', updated = ? "
+            "WHERE state IN ('erreur', 'arrêté')", (time.time(),)).rowcount)
+
+    def purge(self):
+        return self._write(lambda con: con.execute("DELETE FROM jobs WHERE state IN ('terminé', 'doublon')").rowcount)
+
+    def snapshot(self):
+        con = self._connect()
+        try:
+            jobs = con.execute("SELECT id, url, state, worker, progress, attempts, lease_until, outputs FROM jobs ORDER BY id").fetchall()
+            workers = con.execute("SELECT name, seen, running FROM workers ORDER BY name").fetchall()
+            return [dict(r) for r in jobs], [dict(r) for r in workers]
+        finally:
+            con.close()
+
+    def job_log(self, job_id):
+        con = self._connect()
+        try:
+            row = con.execute("SELECT log, outputs FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return (row["log"], json.loads(row["outputs"])) if row else ("", [])
+        finally:
+            con.close()
+
+def _same_url(url, shown):
+    # yt-dlp tronque les URL longues dans "Extracting URL: ..." (truncate_string)
+    return shown == url or (len(url) > 120 and shown == f"{url[:97]}...{url[-20:]}")
+
+def _group_key(job):
+    # Deux jobs sont groupables si leur commande ne diffère que par l'URL
+    # (et le fichier cookies privé, dérivé de l'id du job)
+    cmd = list(job.cmd)
+    del cmd[cmd.index(job.url)]
+    if "--cookies" in cmd:
+        del cmd[cmd.index("--cookies") + 1]
+    return tuple(cmd), job.cookie_spec
+
+# ---------- Cookies navigateur ----------
+def _split_cookies_from_browser(cmd):
+    # Retire --cookies-from-browser de la commande, renvoie (cmd, spec)
+    out, spec, i = [], None, 0
+    while i < len(cmd):
+        arg = cmd[i]
+        if arg == "--cookies-from-browser" and i + 1 < len(cmd):
+            spec = cmd[i + 1]
+            i += 2
+            continue
+        if arg.startswith("--cookies-from-browser="):
+            spec = arg.split("=", 1)[1]
+        else:
+            out.append(arg)
+        i += 1
+    return out, spec
+
+# Export Netscape des cookies d'un navigateur, partagé par tous les jobs :
+# la base du profil n'est ouverte et déchiffrée qu'une fois par TTL au lieu
+# d'une fois par job.
+class CookieCache:
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.last_used = {}
+
+    def path_for(self, spec):
+        return COOKIES_DIR / (re.sub(r"[^\w.-]", "_", spec) + ".txt")
+
+    def age(self, spec):
+        try:
+            return time.time() - self.path_for(spec).stat().st_mtime
+        except OSError:
+            return None
+
+    def _lock(self, spec):
+        with self._guard:
+            return self._locks.setdefault(spec, threading.Lock())
+
+    def export(self, ytdlp, spec):
+        with self._lock(spec):
+            return self._export_locked(ytdlp, spec)
+
+    def _export_locked(self, ytdlp, spec):
+        COOKIES_DIR.mkdir(parents=True, exist_ok=True)
+        os.chmod(COOKIES_DIR, 0o700)
+        final = self.path_for(spec)
+        tmp = final.with_suffix(".tmp")
+        tmp.unlink(missing_ok=True)
+        # Sans URL yt-dlp sort en erreur, mais enregistre le cookie jar en quittant
+        res = subprocess.run(
+            [ytdlp, "--cookies-from-browser", spec, "--cookies", str(tmp), "--no-warnings"],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=120
+        )
+        try:
+            head = tmp.read_text("utf-8", "replace")[:200]
+        except OSError:
+            head = ""
+        if "Netscape HTTP Cookie File" not in head:
+            tmp.unlink(missing_ok=True)
+            lines = [l for l in res.stdout.splitlines() if l.strip()]
+            raise RuntimeError(lines[-1] if lines else f"export des cookies {spec} impossible")
+        os.chmod(tmp, 0o600)
+        tmp.replace(final)
+        return final
+
+    def get(self, ytdlp, spec, ttl):
+        self.last_used[spec] = time.time()
+        with self._lock(spec):
+            age = self.age(spec)
+            if age is None or age > ttl:
+                return self._export_locked(ytdlp, spec)
+            return self.path_for(spec)
+
+    def copy_to(self, ytdlp, spec, ttl, dest: Path):
+        # Copie privée par job : yt-dlp réécrit le fichier --cookies en sortie
+        src = self.get(ytdlp, spec, ttl)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(src, dest)
+        os.chmod(dest, 0o600)
+        return dest
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+def _human_size(n: int) -> str:
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "o" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} To"
+
+class NetdiggerApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title(APP_TITLE)
+        self.geometry("800x720")
+        self.minsize(760, 600)
+
+        # --- Icône robuste ---
+        try:
+            if sys.platform.startswith("win"):
+                app_ico = ASSET_GFX_DIR / "netdigger.ico"
+                if app_ico.exists():
+                    self.iconbitmap(default=str(app_ico))
+                else:
+                    app_png = ASSET_GFX_DIR / "netdigger_icon.png"
+                    if app_png.exists():
+                        self.iconphoto(False, tk.PhotoImage(file=str(app_png)))
+            else:
+                app_png = ASSET_GFX_DIR / "netdigger_icon.png"
+                if app_png.exists():
+                    self.iconphoto(False, tk.PhotoImage(file=str(app_png)))
+        except Exception as e:
+            print(f"Impossible de charger l'icône: {e}")
+
+        self.log_queue = queue.Queue()
+        self.extractor_index = None
+        self.ytdlp_version = None
+        self.jobs = {}
+        self.job_seq = 0
+        self.pending = deque()
+        self.running = set()
+        self.workers = 0
+        self.warming = []  # lots en préchauffage / estimation, pas encore dans pending
+        self.cookie_cache = CookieCache()
+        self.encode_pool = None
+        self.encode_pool_size = 0
+        self._pool_lock = threading.Lock()
+        self._watch_after = None
+        self._library_watcher = None
+        self._library_after = None
+        self.fp_index = FingerprintIndex()
+        self.rate = None  # débit mesuré par job (octets source / s)
+        self.move_pool = ThreadPoolExecutor(max_workers=DEFAULT_MOVE_WORKERS)
+        self.egress_pool = EgressPool()
+        self._disk_after = None
+        self._shared_busy = False
+        self.ingesting = 0
+        self._ingest_cancel = threading.Event()
+        self.compacting = False
+        self._compact_cancel = threading.Event()
+        self.job_loop = JobLoop()
+        self._tk_calls = queue.SimpleQueue()
+        self.after(100, self._drain_log_queue)
+        self.after(TK_BRIDGE_MS, self._drain_tk_calls)
+        self.after(60000, self._cookie_tick)
+
+        self._init_vars()
+        self._build_ui()
+        self.after(500, self._start_library_watch)
+        self.after(0, self._apply_egress)
+        self.after(EGRESS_REFRESH_MS, self._egress_tick)
+        self.after(QUEUE_REFRESH_MS, self._shared_tick)
+        self.after(COMPACT_START_MS, self._compact_tick)
+        self.outdir_var.trace_add("write", lambda *args: self._schedule_library_watch())
+
+    def _init_vars(self):
+        # Main
+        self.outdir_var = tk.StringVar(value=str(Path.home() / "sample/netdigger"))
+        self.range_start_var = tk.StringVar(value="")
+        self.range_end_var = tk.StringVar(value="")
+        self.preview_seconds_var = tk.IntVar(value=DEFAULT_PREVIEW_SECONDS)
+        self.split_chapters_var = tk.BooleanVar(value=False)
+        self.segmented_var = tk.BooleanVar(value=False)
+        self.segment_connections_var = tk.IntVar(value=DEFAULT_SEGMENT_CONNECTIONS)
+
+        # Settings audio
+        self.extra_args_var = tk.StringVar(value="")
+        self.format_var = tk.StringVar(value=DEFAULT_FORMAT)
+        self.sr_var = tk.IntVar(value=DEFAULT_SR)
+        self.bitdepth_var = tk.IntVar(value=DEFAULT_BIT_DEPTH)
+        self.channels_var = tk.IntVar(value=DEFAULT_CHANNELS)
+        self.vorbis_quality_var = tk.DoubleVar(value=5.0)
+        self.normalize_var = tk.BooleanVar(value=False)
+        self.normalize_target_var = tk.DoubleVar(value=DEFAULT_NORMALIZE_LUFS)
+
+        # Découpage automatique
+        self.slice_auto_var = tk.BooleanVar(value=False)
+        self.slice_threshold_var = tk.IntVar(value=DEFAULT_SLICE_THRESHOLD_DB)
+        self.slice_min_ms_var = tk.IntVar(value=DEFAULT_SLICE_MIN_MS)
+        self.slice_pad_ms_var = tk.IntVar(value=DEFAULT_SLICE_PAD_MS)
+        self.slice_onsets_var = tk.BooleanVar(value=False)
+
+        # yt-dlp source selection
+        self.ytdlp_source_var = tk.StringVar(value="local")  # system | local | custom
+        self.ytdlp_custom_path_var = tk.StringVar(value=self._which("yt-dlp") or "yt-dlp")
+        self.ytdlp_effective_var = tk.StringVar(value=self._resolve_ytdlp_path())
+
+        # Avancé : file d'attente / cache yt-dlp
+        self.max_jobs_var = tk.IntVar(value=DEFAULT_MAX_JOBS)
+        self.group_size_var = tk.IntVar(value=1)
+        self.plan_formats_var = tk.BooleanVar(value=True)
+        self.encode_workers_var = tk.IntVar(value=DEFAULT_ENCODE_WORKERS)
+        self.chunk_minutes_var = tk.IntVar(value=DEFAULT_CHUNK_MINUTES)
+        self.peaks_auto_var = tk.BooleanVar(value=np is not None)
+        self.analyze_auto_var = tk.BooleanVar(value=False)
+        self.library_var = tk.BooleanVar(value=True)
+        self.dedupe_var = tk.BooleanVar(value=False)
+        self.fingerprint_var = tk.BooleanVar(value=np is not None)
+        self.dup_check_var = tk.StringVar(value="off")
+        self.sync_baseline_var = tk.BooleanVar(value=True)
+        self.sync_interval_var = tk.IntVar(value=DEFAULT_SYNC_INTERVAL_MIN)
+        self.sync_watch_var = tk.BooleanVar(value=False)
+        self.warm_cache_var = tk.BooleanVar(value=True)
+        self.estimate_batch_var = tk.BooleanVar(value=True)
+        self.disk_reserve_var = tk.IntVar(value=DEFAULT_DISK_RESERVE_GB)
+        self.scratch_var = tk.StringVar(value="")
+        self.verify_var = tk.BooleanVar(value=True)
+        self.compact_days_var = tk.IntVar(value=DEFAULT_COMPACT_DAYS)
+        self.compact_workers_var = tk.IntVar(value=DEFAULT_COMPACT_WORKERS)
+        self.compact_mbps_var = tk.IntVar(value=DEFAULT_COMPACT_MBPS)
+        self.compact_auto_var = tk.BooleanVar(value=False)
+        self.verify_decode_var = tk.BooleanVar(value=False)
+        self.shared_queue_var = tk.StringVar(value="")
+        self.shared_submit_var = tk.BooleanVar(value=False)
+        self.shared_workers_var = tk.StringVar(value="")
+        self.cache_dir_var = tk.StringVar(value=str(self._ytdlp_cache_dir()))
+        self.cache_size_var = tk.StringVar(value="?")
+        self.cookie_cache_var = tk.BooleanVar(value=True)
+        self.cookie_ttl_var = tk.IntVar(value=DEFAULT_COOKIE_TTL_MIN)
+        self.cookie_status_var = tk.StringVar(value="")
+        # Copie lisible depuis les threads des jobs (les variables Tk ne le sont pas)
+        self._cookie_ttl_s = DEFAULT_COOKIE_TTL_MIN * 60
+        self.cookie_ttl_var.trace_add("write", lambda *args: setattr(self, "_cookie_ttl_s", self._cookie_ttl()))
+
+        # About
+        self.about_logo = None  # PhotoImage
+        self.help_loaded = False
+
+    def _build_ui(self):
+        nb = ttk.Notebook(self)
+        nb.pack(fill="both", expand=True, padx=8, pady=8)
+
+        main = ttk.Frame(nb)
+        settings = ttk.Frame(nb)
+        advanced_tab = ttk.Frame(nb)
+        about = ttk.Frame(nb)
+        nb.add(main, text="Main")
+        nb.add(settings, text="Settings")
+        nb.add(advanced_tab, text="Avancé")
+        nb.add(about, text="About")
+        advanced = self._scrollable_frame(advanced_tab)
+
+        # -------- MAIN TAB --------
+        frm = ttk.Frame(main)
+        frm.pack(fill="x", padx=8, pady=8)
+
+        ttk.Label(frm, text="URL(s) à télécharger (une par ligne):").grid(row=0, column=0, sticky="w")
+        self.url_txt = tk.Text(frm, height=4, wrap="none")
+        self.url_txt.grid(row=1, column=0, columnspan=3, sticky="we", pady=(0,8))
+        frm.columnconfigure(0, weight=1)
+
+        ttk.Label(frm, text="Dossier de sortie:").grid(row=2, column=0, sticky="w")
+        out_ent = ttk.Entry(frm, textvariable=self.outdir_var)
+        out_ent.grid(row=3, column=0, sticky="we", pady=(0,8))
+        ttk.Button(frm, text="Parcourir...", command=self._choose_outdir).grid(row=3, column=1, sticky="e", padx=(8,0))
+
+        range_row = ttk.Frame(frm)
+        range_row.grid(row=4, column=0, columnspan=3, sticky="we", pady=(0,8))
+        ttk.Label(range_row, text="Plage (optionnel) début:").pack(side="left")
+        ttk.Entry(range_row, textvariable=self.range_start_var, width=10).pack(side="left", padx=(4,8))
+        ttk.Label(range_row, text="fin:").pack(side="left")
+        ttk.Entry(range_row, textvariable=self.range_end_var, width=10).pack(side="left", padx=(4,8))
+        ttk.Label(range_row, text="ou par URL : <url> 0:30-0:50 1:02:00-1:02:20", foreground="#555").pack(side="left", padx=(8,0))
+        ttk.Checkbutton(frm, text="Découper par chapitres (un fichier par chapitre, encodés en parallèle)",
+                        variable=self.split_chapters_var).grid(row=5, column=0, columnspan=3, sticky="w", pady=(0,4))
+        seg_row = ttk.Frame(frm)
+        seg_row.grid(row=6, column=0, columnspan=3, sticky="w", pady=(0,8))
+        ttk.Checkbutton(seg_row, text="Téléchargement segmenté (flux directs, requêtes Range parallèles), connexions:",
+                        variable=self.segmented_var).pack(side="left")
+        ttk.Spinbox(seg_row, from_=2, to=32, textvariable=self.segment_connections_var, width=4).pack(side="left", padx=(4,0))
+
+        btns = ttk.Frame(main)
+        btns.pack(fill="x", padx=8)
+        self.download_btn = ttk.Button(btns, text="Download", command=self._on_download)
+        self.download_btn.pack(side="left")
+        ttk.Button(btns, text="Preview", command=self._on_preview).pack(side="left", padx=(8,0))
+        ttk.Spinbox(btns, from_=5, to=600, textvariable=self.preview_seconds_var, width=5).pack(side="left", padx=(4,0))
+        ttk.Label(btns, text="s").pack(side="left", padx=(2,0))
+        ttk.Button(btns, text="Synchroniser", command=self._on_sync).pack(side="left", padx=(8,0))
+        ttk.Button(btns, text="Convertir un dossier…", command=self._convert_folder).pack(side="left", padx=(8,0))
+        self.stop_btn = ttk.Button(btns, text="Stop", command=self._on_stop, state="disabled")
+        self.stop_btn.pack(side="left", padx=(8,0))
+        ttk.Button(btns, text="Retirer les terminés", command=self._clear_finished_jobs).pack(side="right")
+        ttk.Button(btns, text="Forme d'onde", command=self._on_waveform).pack(side="right", padx=(0,8))
+        ttk.Button(btns, text="Bibliothèque", command=self._show_library).pack(side="right", padx=(0,8))
+
+        jobs_frame = ttk.LabelFrame(main, text="File d'attente")
+        jobs_frame.pack(fill="x", padx=8, pady=(8,0))
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=("id", "url", "extractor", "plan", "status"), show="headings", height=5)
+        for col, title, width, stretch in (("id", "#", 40, False), ("url", "URL", 300, True),
+                                           ("extractor", "Extracteur", 100, False), ("plan", "Chemin", 100, False),
+                                           ("status", "Statut", 100, False)):
+            self.jobs_tree.heading(col, text=title)
+            self.jobs_tree.column(col, width=width, stretch=stretch)
+        self.jobs_tree.pack(fill="x", expand=True, side="left")
+        jobs_scroll = ttk.Scrollbar(jobs_frame, command=self.jobs_tree.yview)
+        jobs_scroll.pack(side="right", fill="y")
+        self.jobs_tree.configure(yscrollcommand=jobs_scroll.set)
+        self.jobs_tree.bind("<Double-1>", self._show_job_log)
+
+        log_frame = ttk.LabelFrame(main, text="Sortie / Verbose")
+        log_frame.pack(fill="both", expand=True, padx=8, pady=8)
+        self.log_txt = tk.Text(log_frame, height=12, wrap="word")
+        self.log_txt.pack(fill="both", expand=True, side="left")
+        log_scroll = ttk.Scrollbar(log_frame, command=self.log_txt.yview)
+        log_scroll.pack(side="right", fill="y")
+        self.log_txt.configure(yscrollcommand=log_scroll.set)
+        self._log("Prêt.\n")
+
+        # -------- SETTINGS TAB --------
+        # Source yt-dlp
+        ybox = ttk.LabelFrame(settings, text="Source yt-dlp")
+        ybox.pack(fill="x", padx=8, pady=8)
+
+        src_row = ttk.Frame(ybox)
+        src_row.pack(fill="x", pady=(2,2))
+        ttk.Radiobutton(src_row, text="System (PATH)", variable=self.ytdlp_source_var, value="system", command=self._update_ytdlp_effective).pack(side="left")
+        ttk.Radiobutton(src_row, text="Local (dossier utilisateur)", variable=self.ytdlp_source_var, value="local", command=self._update_ytdlp_effective).pack(side="left", padx=(12,0))
+        ttk.Radiobutton(src_row, text="Custom", variable=self.ytdlp_source_var, value="custom", command=self._update_ytdlp_effective).pack(side="left", padx=(12,0))
+
+        custom_row = ttk.Frame(ybox)
+        custom_row.pack(fill="x", pady=(2,2))
+        ttk.Label(custom_row, text="Chemin custom:").pack(side="left")
+        ttk.Entry(custom_row, textvariable=self.ytdlp_custom_path_var).pack(side="left", fill="x", expand=True, padx=(8,8))
+        ttk.Button(custom_row, text="Parcourir…", command=self._choose_custom_ytdlp).pack(side="left")
+
+        eff_row = ttk.Frame(ybox)
+        eff_row.pack(fill="x", pady=(2,2))
+        ttk.Label(eff_row, text="Utilisé:").pack(side="left")
+        self.ytdlp_effective_lab = ttk.Label(eff_row, textvariable=self.ytdlp_effective_var)
+        self.ytdlp_effective_lab.pack(side="left", padx=(8,0))
+        ttk.Button(eff_row, text="Vérifier version", command=self._check_version).pack(side="right")
+        ttk.Label(ybox, text="Cache yt-dlp (taille, vidage, préchauffage) : onglet Avancé, cadre « Cache yt-dlp (Settings) »",
+                  foreground="#555").pack(anchor="w", pady=(0,4))
+
+        # Gestion copie locale
+        up_box = ttk.LabelFrame(settings, text="Gestion de la copie locale (dossier utilisateur)")
+        up_box.pack(fill="x", padx=8, pady=8)
+        ttk.Button(up_box, text="Télécharger/Mettre à jour (latest GitHub)", command=self._download_latest_local).pack(side="left")
+        ttk.Button(up_box, text="Télécharger version précise (tag)", command=self._download_tagged_local).pack(side="left", padx=(8,0))
+        ttk.Button(up_box, text="Ouvrir le dossier", command=lambda: self._open_dir(LOCAL_BIN_DIR)).pack(side="left", padx=(8,0))
+
+        # Audio
+        audio_box = ttk.LabelFrame(settings, text="Format / Paramètres audio")
+        audio_box.pack(fill="x", padx=8, pady=8)
+
+        ttk.Label(audio_box, text="Format:").grid(row=0, column=0, sticky="w")
+        fmt_cmb = ttk.Combobox(audio_box, textvariable=self.format_var, values=["wav", "flac", "ogg"], state="readonly", width=8)
+        fmt_cmb.grid(row=0, column=1, sticky="w", padx=(8,16))
+        fmt_cmb.bind("<<ComboboxSelected>>", lambda e: self._update_controls_state())
+
+        ttk.Label(audio_box, text="Sample rate:").grid(row=0, column=2, sticky="w")
+        sr_frame = ttk.Frame(audio_box)
+        sr_frame.grid(row=0, column=3, sticky="w", padx=(8,16))
+        ttk.Radiobutton(sr_frame, text="44.1 kHz", variable=self.sr_var, value=44100, command=self._update_controls_state).pack(side="left")
+        ttk.Radiobutton(sr_frame, text="48 kHz", variable=self.sr_var, value=48000, command=self._update_controls_state).pack(side="left")
+
+        ttk.Label(audio_box, text="Bit depth:").grid(row=1, column=0, sticky="w", pady=(8,0))
+        bd_frame = ttk.Frame(audio_box)
+        bd_frame.grid(row=1, column=1, sticky="w", padx=(8,16), pady=(8,0))
+        ttk.Radiobutton(bd_frame, text="16", variable=self.bitdepth_var, value=16, command=self._update_controls_state).pack(side="left")
+        ttk.Radiobutton(bd_frame, text="24", variable=self.bitdepth_var, value=24, command=self._update_controls_state).pack(side="left")
+
+        ttk.Label(audio_box, text="Canaux:").grid(row=1, column=2, sticky="w", pady=(8,0))
+        ch_frame = ttk.Frame(audio_box)
+        ch_frame.grid(row=1, column=3, sticky="w", padx=(8,16), pady=(8,0))
+        ttk.Radiobutton(ch_frame, text="Mono", variable=self.channels_var, value=1).pack(side="left")
+        ttk.Radiobutton(ch_frame, text="Stéréo", variable=self.channels_var, value=2).pack(side="left")
+
+        self.vorbis_frame = ttk.Frame(audio_box)
+        self.vorbis_label = ttk.Label(self.vorbis_frame, text="Qualité Vorbis (q):")
+        self.vorbis_scale = ttk.Scale(self.vorbis_frame, from_=0.0, to=10.0, orient="horizontal", variable=self.vorbis_quality_var)
+        self.vorbis_value = ttk.Label(self.vorbis_frame, textvariable=tk.StringVar(value=str(self.vorbis_quality_var.get())))
+        self.vorbis_quality_var.trace_add("write", lambda *args: self.vorbis_value.config(text=f"{self.vorbis_quality_var.get():.1f}"))
+        self.vorbis_label.pack(side="left")
+        self.vorbis_scale.pack(side="left", fill="x", expand=True, padx=8)
+        self.vorbis_value.pack(side="left")
+
+        norm_frame = ttk.Frame(audio_box)
+        norm_frame.grid(row=3, column=0, columnspan=4, sticky="w", pady=(8,0))
+        ttk.Checkbutton(norm_frame, text="Normaliser (EBU R128) à", variable=self.normalize_var).pack(side="left")
+        ttk.Spinbox(norm_frame, from_=-40, to=-5, increment=1, textvariable=self.normalize_target_var, width=6).pack(side="left", padx=(8,0))
+        ttk.Label(norm_frame, text=f"LUFS (crête ≤ {NORMALIZE_CEILING_DB:g} dBFS, mesure mise en cache, nécessite numpy)",
+                  foreground="#555").pack(side="left", padx=(8,0))
+
+        # Découpage automatique
+        slice_box = ttk.LabelFrame(settings, text="Découpage automatique (one-shots / boucles)")
+        slice_box.pack(fill="x", padx=8, pady=8)
+        slice_row = ttk.Frame(slice_box)
+        slice_row.pack(fill="x", pady=(2,2))
+        ttk.Checkbutton(slice_row, text="Découper après téléchargement", variable=self.slice_auto_var).pack(side="left")
+        ttk.Checkbutton(slice_row, text="Couper aussi aux attaques", variable=self.slice_onsets_var).pack(side="left", padx=(12,0))
+        ttk.Button(slice_row, text="Découper un dossier…", command=self._slice_folder).pack(side="right")
+        slice_params = ttk.Frame(slice_box)
+        slice_params.pack(fill="x", pady=(2,4))
+        ttk.Label(slice_params, text="Seuil de silence (dBFS):").pack(side="left")
+        ttk.Spinbox(slice_params, from_=-90, to=-10, textvariable=self.slice_threshold_var, width=5).pack(side="left", padx=(4,12))
+        ttk.Label(slice_params, text="Durée min. (ms):").pack(side="left")
+        ttk.Spinbox(slice_params, from_=10, to=60000, increment=10, textvariable=self.slice_min_ms_var, width=7).pack(side="left", padx=(4,12))
+        ttk.Label(slice_params, text="Marge (ms):").pack(side="left")
+        ttk.Spinbox(slice_params, from_=0, to=2000, increment=5, textvariable=self.slice_pad_ms_var, width=6).pack(side="left", padx=(4,0))
+
+        # Arguments additionnels + tip
+        extra_box = ttk.LabelFrame(settings, text="Arguments additionnels (passés à yt-dlp tels quels)")
+        extra_box.pack(fill="x", padx=8, pady=8)
+        ttk.Entry(extra_box, textvariable=self.extra_args_var).pack(fill="x", padx=8, pady=(8,4))
+        ttk.Label(
+            extra_box,
+            text='Astuce : ajoutez "--cookies-from-browser firefox" en cas de problème de login (exporté une fois et mis en cache, voir Avancé).',
+            foreground="#555"
+        ).pack(fill="x", padx=8, pady=(0,8))
+
+        # Aide yt-dlp (-h)
+        help_box = ttk.LabelFrame(settings, text="Aide yt-dlp (-h)")
+        help_box.pack(fill="both", expand=True, padx=8, pady=8)
+        help_btns = ttk.Frame(help_box)
+        help_btns.pack(fill="x")
+        ttk.Button(help_btns, text="Charger l'aide yt-dlp (-h)", command=self._load_ytdlp_help).pack(side="left")
+        ttk.Button(help_btns, text="Effacer", command=self._clear_help).pack(side="left", padx=(8,0))
+        self.help_txt = tk.Text(help_box, wrap="word")
+        self.help_txt.pack(fill="both", expand=True)
+        self.help_txt.insert("1.0", HELP_HINT)
+
+        self._update_controls_state()
+        self._update_ytdlp_effective()
+
+        # -------- ADVANCED TAB --------
+        queue_box = ttk.LabelFrame(advanced, text="File d'attente")
+        queue_box.pack(fill="x", padx=8, pady=8)
+        ttk.Label(queue_box, text="Téléchargements simultanés:").pack(side="left")
+        ttk.Spinbox(queue_box, from_=1, to=16, textvariable=self.max_jobs_var, width=5).pack(side="left", padx=(8,0))
+        ttk.Label(queue_box, text="URL par processus yt-dlp (--batch-file, 1 = désactivé ; sans analyse des formats ni segmenté):").pack(side="left", padx=(16,0))
+        ttk.Spinbox(queue_box, from_=1, to=100, textvariable=self.group_size_var, width=5).pack(side="left", padx=(8,0))
+
+        disk_box = ttk.LabelFrame(advanced, text="Espace disque")
+        disk_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(disk_box, text="Estimer taille et durée du lot avant de démarrer (info-json réutilisé par l'analyse des formats)",
+                        variable=self.estimate_batch_var).pack(anchor="w", pady=(2,2))
+        disk_row = ttk.Frame(disk_box)
+        disk_row.pack(fill="x", pady=(2,4))
+        ttk.Label(disk_row, text="Réserve d'espace libre, sortie et dossier de travail (Go, 0 = désactivé):").pack(side="left")
+        ttk.Spinbox(disk_row, from_=0, to=1000, textvariable=self.disk_reserve_var, width=5).pack(side="left", padx=(8,0))
+        scratch_row = ttk.Frame(disk_box)
+        scratch_row.pack(fill="x", pady=(2,4))
+        ttk.Label(scratch_row, text="Dossier de travail local (tmpfs, SSD ; vide = désactivé):").pack(side="left")
+        ttk.Entry(scratch_row, textvariable=self.scratch_var).pack(side="left", fill="x", expand=True, padx=(8,0))
+        ttk.Button(scratch_row, text="Parcourir…", command=self._choose_scratch).pack(side="left", padx=(8,0))
+        ttk.Label(disk_box, text="Téléchargement et encodage dans ce dossier, puis copie vérifiée vers le dossier de sortie en arrière-plan.",
+                  foreground="#555").pack(anchor="w", pady=(0,4))
+
+        verify_box = ttk.LabelFrame(advanced, text="Vérification des sorties")
+        verify_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(verify_box, text="Vérifier chaque sortie (en-tête, format / fréquence / bits / canaux, durée, dernière trame), sans décodage",
+                        variable=self.verify_var).pack(anchor="w", pady=(2,2))
+        ttk.Checkbutton(verify_box, text="Décoder aussi chaque sortie en entier (pool d'encodage)",
+                        variable=self.verify_decode_var).pack(anchor="w", pady=(2,2))
+        ttk.Label(verify_box, text="Une sortie invalide est reconvertie depuis la source téléchargée, gardée jusqu'à la vérification.",
+                  foreground="#555").pack(anchor="w", pady=(0,4))
+
+        plan_box = ttk.LabelFrame(advanced, text="Format source")
+        plan_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(plan_box, text="Analyser les formats avant téléchargement (copie / remux si possible, pas de rééchantillonnage inutile)",
+                        variable=self.plan_formats_var).pack(anchor="w", pady=(2,4))
+
+        encode_box = ttk.LabelFrame(advanced, text="Encodage local (chapitres, sources longues)")
+        encode_box.pack(fill="x", padx=8, pady=8)
+        ttk.Label(encode_box, text="Processus d'encodage:").pack(side="left")
+        ttk.Spinbox(encode_box, from_=1, to=64, textvariable=self.encode_workers_var, width=5).pack(side="left", padx=(8,0))
+        ttk.Label(encode_box, text=f"({os.cpu_count() or '?'} cœurs)", foreground="#555").pack(side="left", padx=(8,0))
+        ttk.Label(encode_box, text="Encodage par segments au-delà de (min, WAV/FLAC, 0 = jamais):").pack(side="left", padx=(16,0))
+        ttk.Spinbox(encode_box, from_=0, to=600, textvariable=self.chunk_minutes_var, width=5).pack(side="left", padx=(8,0))
+
+        peaks_box = ttk.LabelFrame(advanced, text="Formes d'onde")
+        peaks_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(peaks_box, text="Calculer les pics après chaque téléchargement (affichage instantané, nécessite numpy)",
+                        variable=self.peaks_auto_var).pack(anchor="w", pady=(2,2))
+        ttk.Button(peaks_box, text="Supprimer les fichiers de pics", command=self._delete_peak_files).pack(anchor="w", pady=(2,4))
+
+        analysis_box = ttk.LabelFrame(advanced, text="Analyse (loudness intégrée, crête, tempo, tonalité)")
+        analysis_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(analysis_box, text="Analyser chaque fichier après téléchargement (nécessite numpy)",
+                        variable=self.analyze_auto_var).pack(anchor="w", pady=(2,2))
+        analysis_btns = ttk.Frame(analysis_box)
+        analysis_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(analysis_btns, text="Analyser le dossier de sortie", command=self._analyze_outdir).pack(side="left")
+        ttk.Button(analysis_btns, text="Vider le cache d'analyse",
+                   command=self._clear_analysis_cache).pack(side="left", padx=(8,0))
+
+        library_box = ttk.LabelFrame(advanced, text="Bibliothèque (index du dossier de sortie)")
+        library_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(library_box, text="Indexer les sorties et surveiller le dossier (en-têtes, métadonnées yt-dlp, inotify)",
+                        variable=self.library_var, command=self._start_library_watch).pack(anchor="w", pady=(2,2))
+        ttk.Checkbutton(library_box, text="Remplacer une sortie identique à un fichier existant par un lien (reflink, sinon lien physique)",
+                        variable=self.dedupe_var).pack(anchor="w", pady=(2,2))
+        library_btns = ttk.Frame(library_box)
+        library_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(library_btns, text="Réindexer le dossier de sortie", command=self._start_library_watch).pack(side="left")
+        ttk.Button(library_btns, text="Dédoublonner le dossier de sortie", command=self._dedupe_outdir).pack(side="left", padx=(8,0))
+        ttk.Button(library_btns, text="Vider l'index", command=self._clear_library).pack(side="left", padx=(8,0))
+
+        compact_box = ttk.LabelFrame(advanced, text="Compactage WAV -> FLAC (maintenance en priorité basse)")
+        compact_box.pack(fill="x", padx=8, pady=8)
+        compact_row = ttk.Frame(compact_box)
+        compact_row.pack(fill="x", pady=(2,2))
+        ttk.Label(compact_row, text="WAV non lus depuis (jours):").pack(side="left")
+        ttk.Spinbox(compact_row, from_=0, to=3650, textvariable=self.compact_days_var, width=5).pack(side="left", padx=(8,0))
+        ttk.Label(compact_row, text="Processus:").pack(side="left", padx=(16,0))
+        ttk.Spinbox(compact_row, from_=1, to=64, textvariable=self.compact_workers_var, width=4).pack(side="left", padx=(8,0))
+        ttk.Label(compact_row, text="Débit disque max (Mo/s, 0 = illimité):").pack(side="left", padx=(16,0))
+        ttk.Spinbox(compact_row, from_=0, to=10000, textvariable=self.compact_mbps_var, width=6).pack(side="left", padx=(8,0))
+        ttk.Checkbutton(compact_box, text="Compacter le dossier de sortie automatiquement une fois par jour",
+                        variable=self.compact_auto_var).pack(anchor="w", pady=(2,2))
+        compact_btns = ttk.Frame(compact_box)
+        compact_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(compact_btns, text="Compacter le dossier de sortie", command=self._compact_outdir).pack(side="left")
+        ttk.Button(compact_btns, text="Arrêter", command=self._compact_cancel.set).pack(side="left", padx=(8,0))
+        ttk.Label(compact_box, text="Le WAV n'est supprimé qu'après comparaison au bit près du PCM décodé du FLAC ; métadonnées de la bibliothèque conservées.",
+                  foreground="#555").pack(anchor="w", pady=(0,4))
+
+        dup_box = ttk.LabelFrame(advanced, text="Doublons (empreintes audio, ré-uploads)")
+        dup_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(dup_box, text="Calculer l'empreinte de chaque sortie (nécessite numpy)",
+                        variable=self.fingerprint_var).pack(anchor="w", pady=(2,2))
+        dup_row = ttk.Frame(dup_box)
+        dup_row.pack(fill="x", pady=(2,2))
+        ttk.Label(dup_row, text=f"Avant chaque téléchargement, comparer les {FP_PROBE_SECONDS} premières secondes à l'index:").pack(side="left")
+        for value, label in (("off", "Non"), ("flag", "Signaler"), ("skip", "Ne pas télécharger")):
+            ttk.Radiobutton(dup_row, text=label, variable=self.dup_check_var, value=value).pack(side="left", padx=(8,0))
+        ttk.Button(dup_box, text="Calculer les empreintes manquantes du dossier de sortie",
+                   command=self._fingerprint_library).pack(anchor="w", pady=(2,4))
+
+        sync_box = ttk.LabelFrame(advanced, text="Synchronisation (chaînes / playlists)")
+        sync_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(sync_box, text="Première synchro d'une source : enregistrer l'existant sans le télécharger",
+                        variable=self.sync_baseline_var).pack(anchor="w", pady=(2,2))
+        ttk.Label(sync_box, text="Sources surveillées (une URL par ligne):").pack(anchor="w")
+        self.sync_sources_txt = tk.Text(sync_box, height=4, wrap="none")
+        self.sync_sources_txt.pack(fill="x", pady=(2,2))
+        if SYNC_SOURCES_FILE.exists():
+            self.sync_sources_txt.insert("1.0", SYNC_SOURCES_FILE.read_text("utf-8"))
+        watch_row = ttk.Frame(sync_box)
+        watch_row.pack(fill="x", pady=(2,4))
+        ttk.Checkbutton(watch_row, text="Surveiller, toutes les", variable=self.sync_watch_var,
+                        command=self._toggle_watch).pack(side="left")
+        ttk.Spinbox(watch_row, from_=5, to=10080, textvariable=self.sync_interval_var, width=6).pack(side="left", padx=(8,0))
+        ttk.Label(watch_row, text="min").pack(side="left", padx=(4,0))
+        ttk.Button(watch_row, text="Synchroniser maintenant", command=self._sync_watch_list).pack(side="left", padx=(16,0))
+
+        egress_box = ttk.LabelFrame(advanced, text="Sorties réseau (adresses source / proxys)")
+        egress_box.pack(fill="x", padx=8, pady=8)
+        ttk.Label(egress_box, text="Une par ligne : adresse IP locale (--source-address) ou proxy (http://hôte:port, socks5://…) ; vide = route par défaut").pack(anchor="w")
+        self.egress_txt = tk.Text(egress_box, height=3, wrap="none")
+        self.egress_txt.pack(fill="x", pady=(2,2))
+        if EGRESS_FILE.exists():
+            self.egress_txt.insert("1.0", EGRESS_FILE.read_text("utf-8"))
+        ttk.Button(egress_box, text="Appliquer et vérifier", command=self._apply_egress).pack(anchor="w", pady=(2,2))
+        self.egress_tree = ttk.Treeview(egress_box, columns=("spec", "state", "active", "jobs", "rate", "total"), show="headings", height=3)
+        for col, title, width in (("spec", "Sortie", 220), ("state", "État", 180), ("active", "En cours", 70),
+                                  ("jobs", "Jobs", 60), ("rate", "Débit", 90), ("total", "Total", 90)):
+            self.egress_tree.heading(col, text=title)
+            self.egress_tree.column(col, width=width, stretch=col in ("spec", "state"))
+        self.egress_tree.pack(fill="x", pady=(2,4))
+
+        shared_box = ttk.LabelFrame(advanced, text="File partagée (plusieurs machines)")
+        shared_box.pack(fill="x", padx=8, pady=8)
+        shared_row = ttk.Frame(shared_box)
+        shared_row.pack(fill="x", pady=(2,2))
+        ttk.Label(shared_row, text="Fichier de la file (partage commun, vide = désactivé):").pack(side="left")
+        ttk.Entry(shared_row, textvariable=self.shared_queue_var).pack(side="left", fill="x", expand=True, padx=(8,0))
+        ttk.Button(shared_row, text="Parcourir…", command=self._choose_shared_queue).pack(side="left", padx=(8,0))
+        ttk.Checkbutton(shared_box, text="Download envoie les URL à la file partagée au lieu de les télécharger ici",
+                        variable=self.shared_submit_var).pack(anchor="w", pady=(2,2))
+        ttk.Label(shared_box, text=f"Workers : netdigger --worker FICHIER [--outdir DOSSIER] [--jobs N] ; bail de {QUEUE_LEASE}s "
+                                   "renouvelé pendant le job, rendu à la file si le worker disparaît.",
+                  foreground="#555").pack(anchor="w")
+        self.shared_tree = ttk.Treeview(shared_box, columns=("id", "url", "state", "worker", "progress", "attempts"), show="headings", height=5)
+        for col, title, width in (("id", "#", 50), ("url", "URL", 260), ("state", "État", 90), ("worker", "Worker", 140),
+                                  ("progress", "Progression", 140), ("attempts", "Essais", 55)):
+            self.shared_tree.heading(col, text=title)
+            self.shared_tree.column(col, width=width, stretch=col in ("url", "progress"))
+        self.shared_tree.pack(fill="x", pady=(2,2))
+        self.shared_tree.bind("<Double-1>", self._show_shared_log)
+        ttk.Label(shared_box, textvariable=self.shared_workers_var, foreground="#555").pack(anchor="w")
+        shared_btns = ttk.Frame(shared_box)
+        shared_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(shared_btns, text="Annuler la sélection", command=self._cancel_shared).pack(side="left")
+        ttk.Button(shared_btns, text="Relancer les échecs", command=lambda: self._shared_action("retry")).pack(side="left", padx=(8,0))
+        ttk.Button(shared_btns, text="Retirer les terminés", command=lambda: self._shared_action("purge")).pack(side="left", padx=(8,0))
+
+        cache_box = ttk.LabelFrame(advanced, text="Cache yt-dlp (Settings) : player JS, signatures…")
+        cache_box.pack(fill="x", padx=8, pady=8)
+        cache_row = ttk.Frame(cache_box)
+        cache_row.pack(fill="x", pady=(2,2))
+        ttk.Label(cache_row, text="Dossier:").pack(side="left")
+        ttk.Label(cache_row, textvariable=self.cache_dir_var).pack(side="left", padx=(8,0))
+        size_row = ttk.Frame(cache_box)
+        size_row.pack(fill="x", pady=(2,2))
+        ttk.Label(size_row, text="Taille:").pack(side="left")
+        ttk.Label(size_row, textvariable=self.cache_size_var).pack(side="left", padx=(8,0))
+        ttk.Checkbutton(cache_box, text="Préchauffer le cache une fois avant chaque lot", variable=self.warm_cache_var).pack(anchor="w", pady=(2,2))
+        cache_btns = ttk.Frame(cache_box)
+        cache_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(cache_btns, text="Calculer la taille", command=self._refresh_cache_info).pack(side="left")
+        ttk.Button(cache_btns, text="Vider ce cache", command=lambda: self._evict_cache(others=False)).pack(side="left", padx=(8,0))
+        ttk.Button(cache_btns, text="Purger les autres versions", command=lambda: self._evict_cache(others=True)).pack(side="left", padx=(8,0))
+        ttk.Button(cache_btns, text="Ouvrir le dossier", command=lambda: self._open_dir(self._ytdlp_cache_dir())).pack(side="left", padx=(8,0))
+
+        cookie_box = ttk.LabelFrame(advanced, text="Cookies navigateur (--cookies-from-browser)")
+        cookie_box.pack(fill="x", padx=8, pady=8)
+        ttk.Checkbutton(cookie_box, text="Exporter une fois vers un fichier Netscape partagé au lieu de lire le profil à chaque job",
+                        variable=self.cookie_cache_var).pack(anchor="w", pady=(2,2))
+        ttl_row = ttk.Frame(cookie_box)
+        ttl_row.pack(fill="x", pady=(2,2))
+        ttk.Label(ttl_row, text="Durée de validité (min):").pack(side="left")
+        ttk.Spinbox(ttl_row, from_=1, to=1440, textvariable=self.cookie_ttl_var, width=6).pack(side="left", padx=(8,0))
+        ttk.Label(ttl_row, textvariable=self.cookie_status_var, foreground="#555").pack(side="left", padx=(12,0))
+        cookie_btns = ttk.Frame(cookie_box)
+        cookie_btns.pack(fill="x", pady=(2,4))
+        ttk.Button(cookie_btns, text="Exporter maintenant", command=self._refresh_cookies_now).pack(side="left")
+        ttk.Button(cookie_btns, text="Supprimer les exports", command=self._delete_cookie_exports).pack(side="left", padx=(8,0))
+
+        # -------- ABOUT TAB --------
+        about_inner = ttk.Frame(about)
+        about_inner.pack(fill="both", expand=True)
+
+        center = ttk.Frame(about_inner)
+        center.place(relx=0.5, rely=0.5, anchor="center")
+
+        logo_path = ASSET_GFX_DIR / "netdigger_logo.png"
+        if logo_path.exists():
+            try:
+                self.about_logo = tk.PhotoImage(file=str(logo_path))
+                ttk.Label(center, image=self.about_logo).pack(pady=(0,12))
+            except Exception as e:
+                ttk.Label(center, text=f"(Logo introuvable ou invalide: {e})").pack(pady=(0,12))
+        else:
+            ttk.Label(center, text="(gfx/netdigger_logo.png manquant)").pack(pady=(0,12))
+
+        info_text = (
+            "Netdigger\n"
+            "Version : 0.1.0\n"
+            "Auteur : Captain Cool\n"
+            "Site / Repo : Suspicious Sausage Records\n"
+            "Licence : bootleg tool\n"
+        )
+        ttk.Label(center, text=info_text, justify="center").pack()
+
+    # ---------- Helpers UI ----------
+    def _scrollable_frame(self, parent):
+        canvas = tk.Canvas(parent, highlightthickness=0)
+        vsb = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
+        inner = ttk.Frame(canvas)
+        win = canvas.create_window((0, 0), window=inner, anchor="nw")
+        inner.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.bind("<Configure>", lambda e: canvas.itemconfigure(win, width=e.width))
+        canvas.configure(yscrollcommand=vsb.set)
+        canvas.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+        return inner
+
+    def _choose_outdir(self):
+        d = filedialog.askdirectory(initialdir=self.outdir_var.get() or str(Path.home()))
+        if d:
+            self.outdir_var.set(d)
+
+    def _choose_scratch(self):
+        d = filedialog.askdirectory(initialdir=self.scratch_var.get() or str(Path.home()))
+        if d:
+            self.scratch_var.set(d)
+
+    def _choose_shared_queue(self):
+        path = filedialog.asksaveasfilename(title="File partagée", defaultextension=".db", confirmoverwrite=False,
+                                            initialfile="netdigger-queue.db", filetypes=[("SQLite", "*.db"), ("Tous", "*")])
+        if path:
+            self.shared_queue_var.set(path)
+
+    def _choose_custom_ytdlp(self):
+        path = filedialog.askopenfilename(
+            title="Choisir binaire yt-dlp",
+            filetypes=[("yt-dlp", "yt-dlp*"), ("Tous", "*.*")]
+        )
+        if path:
+            self.ytdlp_custom_path_var.set(path)
+            self._update_ytdlp_effective()
+
+    def _update_ytdlp_effective(self):
+        self.ytdlp_effective_var.set(self._resolve_ytdlp_path())
+        self._load_extractor_index()
+
+    def _load_extractor_index(self):
+        ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
+        def worker():
+            try:
+                index = ExtractorIndex.load(ytdlp)
+                version = index.version
+            except Exception as e:
+                self.log_queue.put(f"Index des extracteurs indisponible: {e}")
+                index, version = None, self._query_ytdlp_version(ytdlp)
+            def apply():
+                # Ignore un index construit pour un binaire entre-temps remplacé
+                if (self.ytdlp_effective_var.get() or "yt-dlp") == ytdlp:
+                    self.extractor_index = index
+                    self.ytdlp_version = version
+                    self._refresh_cache_info()
+            self._to_tk(apply)
+        self.extractor_index = None
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _classify_url(self, url):
+        if self.extractor_index is None:
+            return None
+        return self.extractor_index.classify(url)
+
+    def _resolve_ytdlp_path(self):
+        src = self.ytdlp_source_var.get()
+        if src == "local":
+            return str(LOCAL_YTDLP)
+        elif src == "custom":
+            return self.ytdlp_custom_path_var.get().strip() or "yt-dlp"
+        else:
+            return self._which("yt-dlp") or "yt-dlp"
+
+    def _update_controls_state(self):
+        fmt = self.format_var.get()
+        show_vorbis = (fmt == "ogg")
+        if show_vorbis:
+            self.vorbis_frame.grid(row=2, column=0, columnspan=4, sticky="we", pady=(8,0))
+        else:
+            self.vorbis_frame.grid_forget()
+
+    # ---------- Download workflow ----------
+    def _on_download(self):
+        entries = self._queued_entries()
+        outdir = self.outdir_var.get().strip()
+        if entries is None:
+            return
+        if not entries:
+            messagebox.showwarning(APP_TITLE, "Veuillez renseigner au moins une URL.")
+            return
+        if not outdir:
+            messagebox.showwarning(APP_TITLE, "Veuillez choisir un dossier de sortie.")
+            return
+        Path(outdir).mkdir(parents=True, exist_ok=True)
+        if self.shared_submit_var.get():
+            self._submit_shared(entries, outdir)
+            return
+
+        jobs = [self._new_job(url, outdir, sections) for url, sections in entries]
+        self.url_txt.delete("1.0", "end")
+        self._start_batch(jobs)
+
+    def _on_preview(self):
+        # Récupère seulement les N premières secondes de la première URL ; le
+        # téléchargement complet n'est lancé qu'après confirmation
+        entries = self._queued_entries()
+        if not entries:
+            if entries is not None:
+                messagebox.showwarning(APP_TITLE, "Veuillez renseigner au moins une URL.")
+            return
+        url, sections = entries[0]
+        try:
+            seconds = max(1, int(self.preview_seconds_var.get()))
+        except (tk.TclError, ValueError):
+            seconds = DEFAULT_PREVIEW_SECONDS
+        PREVIEW_DIR.mkdir(parents=True, exist_ok=True)
+        job = self._new_job(url, str(PREVIEW_DIR), [(0.0, float(seconds))], kind="preview")
+        job.full_sections = sections
+        self._start_batch([job])
+
+    def _offer_full_download(self, job):
+        if job.outputs:
+            try:
+                self._open_path(Path(job.outputs[0]))
+            except OSError as e:
+                self._log(f"Lecture de la preview impossible: {e}\n")
+        ok = messagebox.askyesno(APP_TITLE, f"Preview de {job.url} prête.\n\nLancer le téléchargement complet ?")
+        for path in job.outputs:
+            Path(path).unlink(missing_ok=True)
+        if ok:
+            outdir = self.outdir_var.get().strip() or str(Path.home())
+            Path(outdir).mkdir(parents=True, exist_ok=True)
+            self._start_batch([self._new_job(job.url, outdir, job.full_sections)])
+
+    # ---------- Synchronisation ----------
+    def _on_sync(self):
+        # Chaque URL de la zone de saisie devient un job de synchro (plages ignorées)
+        entries = self._queued_entries()
+        if not entries:
+            if entries is not None:
+                messagebox.showwarning(APP_TITLE, "Veuillez renseigner au moins une URL de chaîne ou de playlist.")
+            return
+        if not self.outdir_var.get().strip():
+            messagebox.showwarning(APP_TITLE, "Veuillez choisir un dossier de sortie.")
+            return
+        self.url_txt.delete("1.0", "end")
+        self._start_sync([url for url, _sections in entries])
+
+    def _start_sync(self, urls):
+        outdir = self.outdir_var.get().strip()
+        if not outdir:
+            self._log("Synchro ignorée : aucun dossier de sortie.\n")
+            return
+        Path(outdir).mkdir(parents=True, exist_ok=True)
+        # Pas de deuxième synchro d'une source dont la précédente n'est pas finie
+        active = {j.url for j in self.jobs.values() if j.kind == "sync" and j.status not in JOB_FINISHED}
+        jobs = [self._new_job(url, outdir, kind="sync") for url in dict.fromkeys(urls) if url not in active]
+        if jobs:
+            self._start_batch(jobs)
+
+    async def _run_sync(self, job):
+        # Listage à plat, du plus récent au plus ancien, arrêté après
+        # SYNC_STOP_AFTER_KNOWN entrées déjà vues ; les nouvelles entrées sont
+        # ajoutées à l'instantané et mises en file par le thread Tk
+        status = "erreur"
+        cookie_file = COOKIES_DIR / "jobs" / f"{job.id}.txt"
+        try:
+            if job.cookie_spec:
+                job.cmd = await self.job_loop.stage(self._materialize_cookies, job.cmd, job.cookie_spec, cookie_file, f"[#{job.id}]")
+            state = _load_sync_state(job.url)
+            known = set(state["entries"]) if state else set()
+            listed, seen, run, stopped = [], set(), 0, False
+            if job.cancelled:
+                status = "arrêté"
+                return
+            job.proc = await self._spawn_lines(job.cmd)
+            self._to_tk(self._set_job_status, job, "listage")
+            async for raw in self._each_line(job.proc, f"[#{job.id}]"):
+                line = raw.rstrip()
+                if not line.startswith(SYNC_MARKER + "\t"):
+                    self._job_line(job, line)
+                    continue
+                entry = _parse_sync_line(line)
+                if entry["id"] in known:
+                    run += 1
+                    if run >= SYNC_STOP_AFTER_KNOWN and not stopped:
+                        stopped = True
+                        _terminate(job.proc)
+                elif entry["id"] not in seen and entry["url"]:
+                    run = 0
+                    seen.add(entry["id"])
+                    listed.append(entry)
+            job.rc = await job.proc.wait()
+            if stopped:
+                self._job_line(job, f"{SYNC_STOP_AFTER_KNOWN} entrées déjà connues d'affilée : fin du listage.")
+            self._job_line(job, f"Listage terminé : {len(listed)} nouvelle(s) entrée(s). Code de sortie: {job.rc}")
+            if job.cancelled:
+                status = "arrêté"
+            elif stopped or job.rc == 0 or listed:
+                # --ignore-errors : code non nul si des entrées sont indisponibles
+                self._to_tk(self._apply_sync, job, listed, not stopped)
+                status = "terminé"
+        except FileNotFoundError:
+            self.log_queue.put(f"[#{job.id}] Erreur: yt-dlp introuvable. Vérifiez la source dans Settings.")
+        except Exception as e:
+            self.log_queue.put(f"[#{job.id}] Erreur: {e}")
+        finally:
+            cookie_file.unlink(missing_ok=True)
+            self._to_tk(self._on_worker_done, [(job, status)])
+
+    def _apply_sync(self, job, listed, complete):
+        # Thread Tk (seul à écrire les instantanés) ; les entrées dont le
+        # téléchargement a échoué restent à faire et sont reprises ensuite
+        state = _load_sync_state(job.url) or {"url": job.url, "order": "newest", "entries": {}}
+        first = not state["entries"]
+        if first and complete:
+            state["order"] = "newest" if _sync_newest_first(listed) else "oldest"
+        baseline = first and job.settings["sync_baseline"]
+        for e in listed:
+            state["entries"][e["id"]] = {"date": e["date"], "title": e["title"], "url": e["url"], "done": baseline}
+        state["synced"] = time.time()
+        _save_sync_state(state)
+        active = {(j.sync_source, j.sync_id) for j in self.jobs.values() if j.sync_id and j.status not in JOB_FINISHED}
+        jobs = []
+        for vid, e in state["entries"].items():
+            if not e["done"] and (job.url, vid) not in active:
+                new = self._new_job(e["url"], job.outdir)
+                new.sync_source, new.sync_id = job.url, vid
+                jobs.append(new)
+        if baseline:
+            self._job_line(job, f"Première synchro : {len(listed)} entrée(s) enregistrée(s) comme référence, rien à télécharger.")
+        else:
+            self._job_line(job, f"Synchro : {len(jobs)} entrée(s) à télécharger.")
+        if jobs:
+            self._start_batch(jobs)
+
+    def _mark_synced(self, job):
+        state = _load_sync_state(job.sync_source)
+        if state and job.sync_id in state["entries"]:
+            state["entries"][job.sync_id]["done"] = True
+            _save_sync_state(state)
+
+    def _sync_watch_list(self):
+        urls = [l.strip() for l in self.sync_sources_txt.get("1.0", "end").splitlines()
+                if l.strip() and not l.strip().startswith("#")]
+        SYNC_DIR.mkdir(parents=True, exist_ok=True)
+        SYNC_SOURCES_FILE.write_text("".join(u + "\n" for u in urls), "utf-8")
+        if urls:
+            self._start_sync(urls)
+
+    def _toggle_watch(self):
+        if self._watch_after is not None:
+            self.after_cancel(self._watch_after)
+            self._watch_after = None
+        if self.sync_watch_var.get():
+            self._watch_tick()
+
+    def _watch_tick(self):
+        self._watch_after = None
+        if not self.sync_watch_var.get():
+            return
+        self._sync_watch_list()
+        try:
+            minutes = max(5, int(self.sync_interval_var.get()))
+        except (tk.TclError, ValueError):
+            minutes = DEFAULT_SYNC_INTERVAL_MIN
+        self._watch_after = self.after(minutes * 60000, self._watch_tick)
+
+    def _queued_entries(self):
+        # Une ligne = "<url> [plage ...]" ; sans plage, celle des champs début/fin
+        try:
+            default = self._default_sections()
+            entries = []
+            for line in self.url_txt.get("1.0", "end").splitlines():
+                tokens = line.split()
+                if not tokens or tokens[0].startswith("#"):
+                    continue
+                sections = [_parse_range(t) for t in tokens[1:]]
+                entries.append((tokens[0], sections or default))
+            return entries
+        except ValueError as e:
+            messagebox.showwarning(APP_TITLE, f"Plage invalide: {e}")
+            return None
+
+    def _default_sections(self):
+        start, end = self.range_start_var.get().strip(), self.range_end_var.get().strip()
+        if not start and not end:
+            return []
+        return [_parse_range(f"{start}-{end}")]
+
+    def _new_job(self, url, outdir, sections=None, kind="download"):
+        self.job_seq += 1
+        job = Job(self.job_seq, url, outdir, extractor=self._classify_url(url), sections=list(sections or []), kind=kind)
+        job.settings = self._job_settings()
+        job.local_encode = ((job.settings["chapters"] or job.settings["normalize"] is not None)
+                            and not job.sections and kind == "download")
+        if kind == "download":
+            job.stage_dir = _stage_dir(job.settings, outdir)
+        if kind == "sync":
+            state = _load_sync_state(url)
+            job.cmd = _sync_command(job.settings, url, reverse=bool(state) and state.get("order") == "oldest") + job.settings["extra"]
+        else:
+            job.cmd = self._build_command(url, job.stage_dir or outdir, job.settings, job.sections, job.local_encode)
+        job.cmd, job.cookie_spec = self._with_cached_cookies(job.cmd, COOKIES_DIR / "jobs" / f"{job.id}.txt")
+        self.jobs[job.id] = job
+        self.jobs_tree.insert("", "end", iid=str(job.id), values=(job.id, url, job.extractor or "?", "", job.status))
+        self._log(f"\n[#{job.id}] $ {' '.join(shlex.quote(x) for x in job.cmd)}\n")
+        return job
+
+    def _start_batch(self, jobs):
+        self.stop_btn.config(state="normal")
+        warm_cmds = self._warm_commands(jobs) if self.warm_cache_var.get() else []
+        probes = [job for job in jobs if job.kind != "sync"] if self.estimate_batch_var.get() else []
+        if not warm_cmds and not probes:
+            self._enqueue(jobs)
+            return
+        # Extractions préalables réparties sur les sorties réseau comme les
+        # téléchargements (sortie rendue à la fin du préchauffage)
+        for job in probes:
+            job.egress = self.egress_pool.acquire()
+        self.warming.append(jobs)
+        limit = self._max_jobs()
+        def worker():
+            try:
+                with ThreadPoolExecutor(max_workers=limit) as pool:
+                    list(pool.map(self._warm_one, warm_cmds))
+                    list(pool.map(self._prefetch_info, probes))
+            finally:
+                self._to_tk(self._end_warming, jobs, [item[-1] for item in warm_cmds])
+        self.job_loop.run_blocking(worker)
+
+    def _end_warming(self, jobs, warm_egress=()):
+        self.warming = [batch for batch in self.warming if batch is not jobs]
+        for egress in warm_egress:
+            if egress is not None:
+                self.egress_pool.release(egress, 0, 0.0, False)
+        for job in jobs:
+            if job.egress is not None:
+                self.egress_pool.release(job.egress, 0, 0.0, job.throttled)
+                if job.throttled:
+                    self._log(f"Sortie réseau {job.egress.spec} bridée : {self.egress_pool.state(job.egress)}\n")
+                job.egress, job.throttled = None, False
+        if self.egress_pool.items:
+            self._refresh_egress_view()
+        if not all(job.cancelled for job in jobs) and self._confirm_batch(jobs):
+            self._enqueue(jobs)
+        else:
+            for job in jobs:
+                job.cancelled = True
+                self._set_job_status(job, "arrêté")
+                (BATCH_DIR / f"info-{job.id}.json").unlink(missing_ok=True)
+            self._pump_jobs()
+
+    def _prefetch_info(self, job):
+        # yt-dlp -J avant le lot : estimation des tailles ; l'info-json est
+        # gardé pour _plan_job (pas de seconde extraction)
+        if job.cancelled:
+            return
+        s = job.settings
+        tail = job.cmd[job.cmd.index(job.url) + 1:]  # arguments additionnels + cookies
+        cmd = [s["ytdlp"], "-J", "--no-warnings", "--cache-dir", s["cache_dir"]] + tail + _egress_args(job.egress) + [job.url]
+        cookie_file = COOKIES_DIR / "jobs" / f"{job.id}.txt"
+        try:
+            if job.cookie_spec:
+                cmd = self._materialize_cookies(cmd, job.cookie_spec, cookie_file, f"[#{job.id}]")
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            job.throttled = bool(THROTTLE_RE.search(proc.stderr))
+            if proc.returncode != 0:
+                lines = [l for l in proc.stderr.splitlines() if l.strip()]
+                self._job_line(job, f"Estimation impossible ({lines[-1] if lines else proc.returncode}).")
+                return
+            info = json.loads(proc.stdout)
+        except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+            self._job_line(job, f"Estimation impossible: {e}")
+            return
+        finally:
+            cookie_file.unlink(missing_ok=True)
+        BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        (BATCH_DIR / f"info-{job.id}.json").write_text(proc.stdout, "utf-8")
+        local = job.local_encode or self._wants_chunked(job, info.get("duration") or 0)
+        e = _estimate_job(info, s, job.sections, local)
+        if not e["seconds"] and not e["source"]:
+            self._job_line(job, "Estimation: durée et taille inconnues (lien direct ?).")
+            return
+        job.estimate = e
+        work = f", ~{_human_size(e['work'])} de travail" if e["work"] else ""
+        self._job_line(job, f"Estimation: {_format_duration(e['seconds'])} d'audio, ~{_human_size(e['final'])} en sortie{work}")
+
+    def _confirm_batch(self, jobs):
+        # Totaux du lot ; demande confirmation si l'espace libre ne suffit pas
+        known = [job for job in jobs if job.estimate and not job.cancelled]
+        if not known:
+            return True
+        total = {k: sum(job.estimate[k] for job in known) for k in ESTIMATE_KEYS}
+        par = min(self._max_jobs(), len(known))
+        eta = total["source"] / ((self.rate or ESTIMATE_RATE) * par)
+        self._log(f"Lot: {len(known)}/{len(jobs)} job(s) estimé(s), {_format_duration(total['seconds'])} d'audio, "
+                  f"~{_human_size(total['final'])} à écrire ({_human_size(total['source'])} à télécharger), "
+                  f"durée ~{_format_duration(eta)}{'' if self.rate else ' (débit supposé)'}\n")
+        reserve = self._disk_reserve()
+        try:
+            needs = self._disk_needs([self.jobs[i] for i in self.running] + known)
+        except OSError:
+            return True
+        short = [f"{path}: {_human_size(need)} requis, {_human_size(free)} libres"
+                 for path, free, need in needs.values() if free - need < reserve]
+        if not short:
+            return True
+        return messagebox.askyesno(APP_TITLE, "Espace disque insuffisant pour tout le lot (réserve "
+                                   f"{_human_size(reserve)}) :\n" + "\n".join(short) +
+                                   "\n\nDémarrer quand même ? Les jobs attendront que de l'espace se libère.")
+
+    def _warm_commands(self, jobs):
+        # Une extraction à blanc par extracteur présent plusieurs fois dans le
+        # lot : les jobs suivants trouvent player JS / signatures en cache au
+        # lieu de tous les télécharger en même temps.
+        ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
+        cache_dir = self._ytdlp_cache_dir()
+        extra = shlex.split(self.extra_args_var.get().strip())
+        groups = {}
+        for job in jobs:
+            if job.extractor and job.extractor != "Generic":
+                groups.setdefault(job.extractor, []).append(job)
+        cmds = []
+        for extractor, group in groups.items():
+            if len(group) < 2:
+                continue
+            marker = cache_dir / ".warm" / extractor
+            try:
+                if time.time() - marker.stat().st_mtime < WARM_MARKER_TTL:
+                    continue
+            except OSError:
+                pass
+            # -I 1 : une chaîne ou une playlist n'est pas extraite entrée par entrée
+            cmd = [ytdlp, "--cache-dir", str(cache_dir), "--simulate", "--quiet", "--no-warnings", "-I", "1"] + extra + [group[0].url]
+            cookie_file = COOKIES_DIR / "jobs" / f"warm-{extractor}.txt"
+            cmd, spec = self._with_cached_cookies(cmd, cookie_file)
+            egress = self.egress_pool.acquire()
+            cmds.append((extractor, marker, cmd + _egress_args(egress), spec, cookie_file, egress))
+        return cmds
+
+    def _warm_one(self, item):
+        extractor, marker, cmd, spec, cookie_file, _egress = item
+        self.log_queue.put(f"Préchauffage du cache yt-dlp ({extractor})…")
+        try:
+            if spec:
+                cmd = self._materialize_cookies(cmd, spec, cookie_file, f"Préchauffage {extractor}")
+            rc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=180).returncode
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self.log_queue.put(f"Préchauffage {extractor} ignoré: {e}")
+            return
+        finally:
+            cookie_file.unlink(missing_ok=True)
+        if rc == 0:
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+
+    def _max_jobs(self):
+        try:
+            return max(1, int(self.max_jobs_var.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_MAX_JOBS
+
+    def _enqueue(self, jobs):
+        self.pending.extend(job for job in jobs if not job.cancelled)
+        self._pump_jobs()
+
+    def _group_size(self):
+        try:
+            return max(1, int(self.group_size_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+
+    def _pump_jobs(self):
+        limit = self._max_jobs()
+        self.job_loop.size_stages(limit)
+        size = self._group_size()
+        while self.pending and self.workers < limit:
+            group = self._take_group(size)
+            if not self._admit(group):
+                self.pending.extendleft(reversed(group))
+                break
+            self.workers += 1
+            egress = self.egress_pool.acquire()
+            if egress is not None:
+                self._log(f"[#{group[0].id}] Sortie réseau: {egress.spec}\n")
+            for job in group:
+                job.started = time.time()
+                job.egress = egress
+                job.cmd = job.cmd + _egress_args(egress)
+                self.running.add(job.id)
+                self._set_job_status(job, "en cours" if job is group[0] else "groupé")
+            if len(group) > 1:
+                self.job_loop.submit(self._run_group(group))
+            elif group[0].kind == "sync":
+                self.job_loop.submit(self._run_sync(group[0]))
+            else:
+                self.job_loop.submit(self._run_job(group[0]))
+        if not self.pending and not self.running and not self.warming and not self.ingesting:
+            self._reset_buttons()
+
+    def _disk_reserve(self):
+        try:
+            return max(0, int(self.disk_reserve_var.get())) << 30
+        except (tk.TclError, ValueError):
+            return DEFAULT_DISK_RESERVE_GB << 30
+
+    def _disk_needs(self, jobs):
+        # {périphérique: [dossier, octets libres, octets estimés des jobs]} ;
+        # sortie et dossier de travail comptés ensemble s'ils partagent un disque
+        needs, free = {}, {}
+        for job in jobs:
+            places = [(job.outdir, job.estimate.get("out", 0)), (_work_dir(job.settings), job.estimate.get("work", 0))]
+            if job.stage_dir:
+                places.append((job.stage_dir, job.estimate.get("out", 0)))
+            for path, amount in places:
+                if path not in free:
+                    free[path] = _disk_free(path)
+                dev, avail = free[path]
+                needs.setdefault(dev, [str(path), avail, 0])[2] += amount
+        return needs
+
+    def _admit(self, group):
+        # Les jobs en cours sont comptés en entier (ce qu'ils ont déjà écrit
+        # est aussi absent de l'espace libre) : admission prudente
+        reserve = self._disk_reserve()
+        if not reserve:
+            return True
+        try:
+            needs = self._disk_needs([self.jobs[i] for i in self.running] + group)
+        except OSError:
+            return True
+        for path, free, need in needs.values():
+            if free - need >= reserve:
+                continue
+            leader = group[0]
+            if leader.status != "attente disque":
+                self._set_job_status(leader, "attente disque")
+                self._log(f"[#{leader.id}] En attente d'espace disque sur {path} : {_human_size(free)} libres, "
+                          f"{_human_size(need)} estimés + réserve {_human_size(reserve)}\n")
+            if self._disk_after is None:
+                self._disk_after = self.after(DISK_RETRY_MS, self._disk_retry)
+            return False
+        return True
+
+    def _disk_retry(self):
+        self._disk_after = None
+        self._pump_jobs()
+
+    def _apply_egress(self):
+        # Liste enregistrée puis vérifiée en arrière-plan (bind / connexion au proxy)
+        text = self.egress_txt.get("1.0", "end")
+        errors = self.egress_pool.load(text.splitlines())
+        EGRESS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        EGRESS_FILE.write_text(text.strip() + "\n" if text.strip() else "", "utf-8")
+        for err in errors:
+            self._log(f"Sortie réseau ignorée: {err}\n")
+        items = list(self.egress_pool.items)
+        def worker():
+            results = [(egress, _check_egress(egress)) for egress in items]
+            self._to_tk(self._set_egress_checks, results)
+        threading.Thread(target=worker, daemon=True).start()
+        self._refresh_egress_view()
+
+    def _set_egress_checks(self, results):
+        for egress, error in results:
+            egress.error = error
+            if error:
+                self._log(f"Sortie réseau {egress.spec} indisponible: {error}\n")
+        self._refresh_egress_view()
+
+    def _refresh_egress_view(self):
+        self.egress_tree.delete(*self.egress_tree.get_children())
+        for egress in self.egress_pool.items:
+            self.egress_tree.insert("", "end", values=(
+                egress.spec, self.egress_pool.state(egress), egress.active, egress.jobs,
+                f"{_human_size(egress.rate)}/s" if egress.rate else "—", _human_size(egress.bytes)))
+
+    def _egress_tick(self):
+        if self.egress_pool.items:
+            self._refresh_egress_view()
+        self.after(EGRESS_REFRESH_MS, self._egress_tick)
+
+    def _submit_shared(self, entries, outdir):
+        # Le dossier de sortie doit être le même partage pour tous les workers
+        # (ou remplacé par leur option --outdir)
+        path = self.shared_queue_var.get().strip()
+        if not path:
+            messagebox.showwarning(APP_TITLE, "Choisissez le fichier de la file partagée (onglet Avancé).")
+            return
+        settings = self._job_settings()
+        try:
+            ids = SharedQueue(path).submit([(url, outdir, sections, settings) for url, sections in entries])
+        except sqlite3.Error as e:
+            messagebox.showerror(APP_TITLE, f"File partagée inaccessible: {e}")
+            return
+        self.url_txt.delete("1.0", "end")
+        self._log(f"{len(ids)} job(s) envoyés à la file partagée {path} (#{ids[0]}…#{ids[-1]})\n")
+        self._shared_tick(reschedule=False)
+
+    def _shared_tick(self, reschedule=True):
+        # Lecture de la file dans un thread : le partage peut être lent
+        path = self.shared_queue_var.get().strip()
+        if path and not self._shared_busy:
+            self._shared_busy = True
+            def worker():
+                try:
+                    res = SharedQueue(path).snapshot()
+                except sqlite3.Error as e:
+                    res = e
+                self._to_tk(self._refresh_shared_view, res)
+            threading.Thread(target=worker, daemon=True).start()
+        if reschedule:
+            self.after(QUEUE_REFRESH_MS, self._shared_tick)
+
+    def _refresh_shared_view(self, res):
+        self._shared_busy = False
+        if isinstance(res, Exception):
+            self.shared_workers_var.set(f"File partagée inaccessible: {res}")
+            return
+        jobs, workers = res
+        now = time.time()
+        sel = set(self.shared_tree.selection())
+        self.shared_tree.delete(*self.shared_tree.get_children())
+        for row in jobs:
+            state = row["state"]
+            if state == "en cours" and (row["lease_until"] or 0) < now:
+                state = "bail expiré"
+            self.shared_tree.insert("", "end", iid=str(row["id"]), values=(
+                row["id"], row["url"], state, row["worker"] or "", row["progress"] or "", row["attempts"]))
+        self.shared_tree.selection_set([iid for iid in sel if self.shared_tree.exists(iid)])
+        counts = {}
+        for row in jobs:
+            counts[row["state"]] = counts.get(row["state"], 0) + 1
+        desc = [f"{w['name']} ({w['running']} en cours)" if now - w["seen"] < QUEUE_LEASE
+                else f"{w['name']} (absent depuis {_format_duration(now - w['seen'])})" for w in workers]
+        self.shared_workers_var.set(f"Workers: {', '.join(desc) or 'aucun'} — "
+                                    + (", ".join(f"{n} {state}" for state, n in counts.items()) or "file vide"))
+
+    def _shared_action(self, action, *args):
+        path = self.shared_queue_var.get().strip()
+        if not path:
+            return
+        try:
+            getattr(SharedQueue(path), action)(*args)
+        except sqlite3.Error as e:
+            messagebox.showerror(APP_TITLE, f"File partagée inaccessible: {e}")
+        self._shared_tick(reschedule=False)
+
+    def _cancel_shared(self):
+        ids = [int(iid) for iid in self.shared_tree.selection()]
+        if ids:
+            self._shared_action("cancel", ids)
+
+    def _show_shared_log(self, event=None):
+        sel = self.shared_tree.selection()
+        path = self.shared_queue_var.get().strip()
+        if not sel or not path:
+            return
+        try:
+            log, outputs = SharedQueue(path).job_log(int(sel[0]))
+        except sqlite3.Error as e:
+            messagebox.showerror(APP_TITLE, f"File partagée inaccessible: {e}")
+            return
+        d = tk.Toplevel(self)
+        d.title(f"File partagée #{sel[0]} — {self.shared_tree.set(sel[0], 'url')}")
+        d.geometry("700x400")
+        txt = tk.Text(d, wrap="word")
+        txt.pack(fill="both", expand=True)
+        txt.insert("1.0", "".join(f"Sortie: {p}\n" for p in outputs) + (log or "(log disponible à la fin du job)"))
+        txt.see("end")
+
+    def _take_group(self, size):
+        # Plan de format, téléchargement segmenté et encodage par segments
+        # passent par _plan_job, propre à chaque job : ces jobs restent seuls
+        def groupable(job):
+            return job.kind != "sync" and not job.settings.get("plan") and not job.settings.get("segments")
+        leader = self.pending.popleft()
+        if size <= 1 or not groupable(leader):
+            return [leader]
+        key = _group_key(leader)
+        group, rest = [leader], deque()
+        while self.pending:
+            job = self.pending.popleft()
+            if len(group) < size and groupable(job) and _group_key(job) == key:
+                group.append(job)
+            else:
+                rest.append(job)
+        self.pending = rest
+        return group
+
+    def _set_job_status(self, job, status):
+        job.status = status
+        if self.jobs_tree.exists(str(job.id)):
+            self.jobs_tree.set(str(job.id), "status", status)
+
+    def _on_worker_done(self, results):
+        self.workers -= 1
+        for job, status in results:
+            self.running.discard(job.id)
+            self._set_job_status(job, status)
+        done = [job for job, status in results if status in ("terminé", "déplacement") and job.estimate.get("source")]
+        if done:
+            # Débit par job (octets source / s, étapes locales comprises) pour l'estimation des lots suivants
+            sample = sum(job.estimate["source"] for job in done) / max(1.0, time.time() - min(job.started for job in done))
+            self.rate = sample if self.rate is None else self.rate + ESTIMATE_RATE_SMOOTHING * (sample - self.rate)
+        egress = results[0][0].egress if results else None
+        if egress is not None:
+            jobs = [job for job, _status in results]
+            throttled = any(job.throttled for job in jobs)
+            self.egress_pool.release(egress, sum(job.net_bytes for job in jobs), sum(job.net_secs for job in jobs), throttled)
+            if throttled:
+                self._log(f"Sortie réseau {egress.spec} bridée : {self.egress_pool.state(egress)}\n")
+            self._refresh_egress_view()
+        self._pump_jobs()
+        for job, status in results:
+            if status == "déplacement":
+                # Le job libère sa place : la copie vers le dossier final se fait à part
+                self.move_pool.submit(self._move_job, job)
+            else:
+                self._job_done(job, status)
+
+    def _job_done(self, job, status):
+        if job.kind == "preview" and status == "terminé":
+            self._offer_full_download(job)
+        if job.sync_id and status == "terminé":
+            self._mark_synced(job)
+
+    def _move_job(self, job):
+        # Thread du pool de déplacement : sorties (et tranches) copiées vers
+        # le dossier final, puis étapes d'indexation sur les chemins définitifs
+        status = "erreur"
+        t0 = time.time()
+        try:
+            stage, moved, size = Path(job.stage_dir), {}, 0
+            for path in job.outputs + job.extras:
+                src = Path(path)
+                dest = Path(job.outdir) / src.relative_to(stage)
+                size += src.stat().st_size
+                _move_output(src, dest)
+                moved[path] = str(dest)
+                for parent in src.parents:
+                    if parent == stage:
+                        break
+                    try:
+                        parent.rmdir()
+                    except OSError:
+                        break
+            job.outputs = [moved[p] for p in job.outputs]
+            job.extras = [moved[p] for p in job.extras]
+            job.meta = {moved.get(p, p): meta for p, meta in job.meta.items()}
+            secs = time.time() - t0
+            self._job_line(job, f"{len(moved)} fichier(s) déplacé(s) vers {job.outdir} "
+                                f"({_human_size(size)} en {secs:.1f}s, {_human_size(size / max(secs, 1e-3))}/s)")
+            if self._run_index_stages(job):
+                status = "terminé"
+        except Exception as e:
+            self._job_line(job, f"Déplacement impossible (fichiers laissés dans {job.stage_dir}): {e}")
+        finally:
+            self._to_tk(self._on_moved, job, status)
+
+    def _on_moved(self, job, status):
+        self._set_job_status(job, status)
+        self._job_done(job, status)
+
+    def _show_job_log(self, event=None):
+        sel = self.jobs_tree.selection()
+        if not sel:
+            return
+        job = self.jobs.get(int(sel[0]))
+        if job is None:
+            return
+        d = tk.Toplevel(self)
+        d.title(f"Job #{job.id} — {job.url}")
+        d.geometry("700x400")
+        txt = tk.Text(d, wrap="word")
+        txt.pack(fill="both", expand=True)
+        txt.insert("1.0", "\n".join(job.log))
+        txt.see("end")
+
+    def _clear_finished_jobs(self):
+        for job_id, job in list(self.jobs.items()):
+            if job.status in JOB_FINISHED:
+                del self.jobs[job_id]
+                if self.jobs_tree.exists(str(job_id)):
+                    self.jobs_tree.delete(str(job_id))
+
+    def _on_stop(self):
+        self._ingest_cancel.set()
+        for job in self.pending:
+            job.cancelled = True
+            self._set_job_status(job, "arrêté")
+            (BATCH_DIR / f"info-{job.id}.json").unlink(missing_ok=True)
+        self.pending.clear()
+        for batch in self.warming:
+            for job in batch:
+                job.cancelled = True
+                self._set_job_status(job, "arrêté")
+        for job_id in self.running:
+            job = self.jobs[job_id]
+            job.cancelled = True
+            _terminate(job.proc)
+
+    def _job_settings(self):
+        # Instantané des réglages : les threads des jobs ne lisent pas les variables Tk
+        return {
+            "ytdlp": self.ytdlp_effective_var.get() or "yt-dlp",
+            "fmt": self.format_var.get(),
+            "sr": int(self.sr_var.get()),
+            "bd": int(self.bitdepth_var.get()),
+            "ch": int(self.channels_var.get()),
+            "q": float(self.vorbis_quality_var.get()),
+            "extra": shlex.split(self.extra_args_var.get().strip()),
+            "cache_dir": str(self._ytdlp_cache_dir()),
+            "plan": bool(self.plan_formats_var.get()),
+            "chapters": bool(self.split_chapters_var.get()),
+            "segments": self._segment_connections() if self.segmented_var.get() else 0,
+            "encoders": self._encode_workers(),
+            "chunk_s": self._chunk_seconds(),
+            "slice": self._slice_params() if self.slice_auto_var.get() else None,
+            "peaks": bool(self.peaks_auto_var.get()),
+            "analyze": bool(self.analyze_auto_var.get()),
+            "normalize": self._normalize_target(),
+            "sync_baseline": bool(self.sync_baseline_var.get()),
+            "library": bool(self.library_var.get()),
+            "dedupe": bool(self.dedupe_var.get()),
+            "fingerprint": bool(self.fingerprint_var.get()) and np is not None,
+            "dup_check": self.dup_check_var.get() if np is not None else "off",
+            "scratch": self.scratch_var.get().strip(),
+            "verify": bool(self.verify_var.get()),
+            "verify_decode": bool(self.verify_decode_var.get()),
+        }
+
+    def _slice_params(self):
+        def read(var, default):
+            try:
+                return int(var.get())
+            except (tk.TclError, ValueError):
+                return default
+        return {
+            "threshold_db": read(self.slice_threshold_var, DEFAULT_SLICE_THRESHOLD_DB),
+            "min_ms": max(1, read(self.slice_min_ms_var, DEFAULT_SLICE_MIN_MS)),
+            "pad_ms": max(0, read(self.slice_pad_ms_var, DEFAULT_SLICE_PAD_MS)),
+            "onsets": bool(self.slice_onsets_var.get()),
+            "bd": int(self.bitdepth_var.get()),
+            "q": float(self.vorbis_quality_var.get()),
+        }
+
+    def _chunk_seconds(self):
+        try:
+            return max(0, int(self.chunk_minutes_var.get())) * 60
+        except (tk.TclError, ValueError):
+            return DEFAULT_CHUNK_MINUTES * 60
+
+    def _segment_connections(self):
+        try:
+            return max(2, int(self.segment_connections_var.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_SEGMENT_CONNECTIONS
+
+    def _normalize_target(self):
+        if not self.normalize_var.get() or np is None:
+            return None
+        try:
+            return float(self.normalize_target_var.get())
+        except (tk.TclError, ValueError):
+            return DEFAULT_NORMALIZE_LUFS
+
+    def _encode_workers(self):
+        try:
+            return max(1, int(self.encode_workers_var.get()))
+        except (tk.TclError, ValueError):
+            return DEFAULT_ENCODE_WORKERS
+
+    def _build_command(self, url, outdir, settings=None, sections=None, local=False):
+        settings = settings or self._job_settings()
+        return _ytdlp_command(settings, url, outdir, sections=sections, local=local) + settings["extra"]
+
+    async def _run_job(self, job):
+        # Coroutine de la boucle des jobs ; les étapes bloquantes passent par son exécuteur
+        status = "erreur"
+        cookie_file = COOKIES_DIR / "jobs" / f"{job.id}.txt"
+        info_file = BATCH_DIR / f"info-{job.id}.json"
+        try:
+            if job.cookie_spec:
+                job.cmd = await self.job_loop.stage(self._materialize_cookies, job.cmd, job.cookie_spec, cookie_file, f"[#{job.id}]")
+            if await self.job_loop.stage(self._check_duplicate, job, job.cmd[job.cmd.index(job.url) + 1:]):
+                status = "doublon"
+                return
+            if job.settings.get("plan"):
+                await self.job_loop.stage(self._plan_job, job, info_file)
+            job.rc = await self._stream_process(job, job.cmd)
+            self._job_line(job, f"Terminé. Code de sortie: {job.rc}")
+            if job.cancelled:
+                status = "arrêté"
+            elif job.rc == 0 and await self.job_loop.stage(self._run_post_stages, job):
+                status = "déplacement" if job.stage_dir else "terminé"
+        except FileNotFoundError:
+            self.log_queue.put(f"[#{job.id}] Erreur: yt-dlp introuvable. Vérifiez la source dans Settings.")
+        except Exception as e:
+            self.log_queue.put(f"[#{job.id}] Erreur: {e}")
+        finally:
+            cookie_file.unlink(missing_ok=True)
+            info_file.unlink(missing_ok=True)
+            self._drop_kept_sources(job)
+            self._to_tk(self._on_worker_done, [(job, status)])
+
+    def _plan_job(self, job, info_file):
+        # Un seul passage d'extraction : -J pour choisir le format, puis
+        # téléchargement depuis ce même info-json (--load-info-json)
+        if job.cancelled:
+            return
+        s = job.settings
+        tail = job.cmd[job.cmd.index(job.url) + 1:]  # arguments additionnels + cookies
+        if info_file.exists():
+            out = info_file.read_text("utf-8")  # déjà extrait par l'estimation du lot
+        else:
+            # --flat-playlist : une playlist (chemin standard de toute façon) n'est
+            # pas extraite entrée par entrée ; sans effet sur une vidéo seule
+            probe = [s["ytdlp"], "-J", "--flat-playlist", "--no-warnings", "--cache-dir", s["cache_dir"]] + tail + [job.url]
+            job.proc = subprocess.Popen(probe, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            out, err = job.proc.communicate()
+            if job.proc.returncode != 0:
+                lines = [l for l in err.splitlines() if l.strip()]
+                self._job_line(job, f"Analyse des formats impossible ({lines[-1] if lines else job.proc.returncode}), chemin standard.")
+                return
+        info = json.loads(out)
+        plan = None if info.get("_type") in ("playlist", "multi_video") else _plan_audio_format(info, s)
+        if plan is None:
+            self._job_line(job, "Plan: pas de format audio exploitable (ou playlist), chemin standard.")
+            return
+        if self._wants_chunked(job, info.get("duration") or 0):
+            # Source longue : encodage parallèle par segments après téléchargement
+            job.local_encode = True
+            plan["path"] = "segments"
+        BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        info_file.write_text(out, "utf-8")
+        job.cmd = _ytdlp_command(s, job.url, job.stage_dir or job.outdir, plan, info_file, job.sections, job.local_encode) + tail
+        job.plan_path = plan["path"]
+        self._to_tk(self._set_job_plan, job)
+        self._job_line(job, f"Plan: {plan['desc']}")
+        self._job_line(job, f"$ {' '.join(shlex.quote(x) for x in job.cmd)}")
+        if s.get("segments") and not job.sections:
+            self._fetch_segmented(job, info, plan, info_file)
+
+    def _fetch_segmented(self, job, info, plan, info_file):
+        # Thread du job : le flux choisi par le plan est téléchargé en N
+        # connexions sous le nom attendu par yt-dlp, qui le trouve déjà
+        # présent et passe directement au post-traitement
+        s = job.settings
+        fmt = next((f for f in info.get("formats") or [] if f.get("format_id") == plan["format_id"]), None)
+        if not fmt or not fmt.get("url") or fmt.get("protocol") not in ("http", "https") or fmt.get("cookies"):
+            self._job_line(job, "Segmenté: flux non progressif ou soumis à cookies, téléchargement par yt-dlp.")
+            return
+        probe = [s["ytdlp"], "--load-info-json", str(info_file), "-f", plan["format_id"], "--simulate", "--no-warnings",
+                 "--print", "filename", "-o", job.cmd[job.cmd.index("-o") + 1]]
+        res = subprocess.run(probe, capture_output=True, text=True)
+        lines = res.stdout.strip().splitlines()
+        if res.returncode != 0 or not lines:
+            self._job_line(job, "Segmenté: nom de fichier indisponible, téléchargement par yt-dlp.")
+            return
+        dest = Path(lines[-1])
+        if dest.exists():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shown = [-1]
+        def progress(done, size):
+            pct = done * 100 // size
+            if pct != shown[0]:
+                shown[0] = pct
+                self._to_tk(self._set_job_status, job, f"segmenté {pct}%")
+        t0 = time.time()
+        try:
+            size = _segmented_download(fmt["url"], dest, fmt.get("http_headers"), s["segments"], progress, lambda: job.cancelled,
+                                       job.egress)
+        except (OSError, RuntimeError, http.client.HTTPException) as e:
+            self._job_line(job, f"Segmenté: échec ({e}), téléchargement par yt-dlp.")
+            return
+        secs = max(time.time() - t0, 1e-3)
+        job.net_bytes += size
+        job.net_secs += secs
+        self._job_line(job, f"Segmenté: {_human_size(size)} en {secs:.1f}s ({_human_size(size / secs)}/s, {s['segments']} connexions)")
+
+    def _set_job_plan(self, job):
+        if self.jobs_tree.exists(str(job.id)):
+            self.jobs_tree.set(str(job.id), "plan", job.plan_path)
+
+    async def _run_group(self, jobs):
+        # Un seul yt-dlp pour N URL (--batch-file) : la sortie est redistribuée
+        # à chaque job, un échec n'affecte que son URL (--ignore-errors).
+        leader = jobs[0]
+        group, jobs = jobs, list(jobs)
+        statuses = {job.id: "erreur" for job in jobs}
+        cookie_file = COOKIES_DIR / "jobs" / f"{leader.id}.txt"
+        batch_file = BATCH_DIR / f"group-{leader.id}.txt"
+        try:
+            cmd = list(leader.cmd)
+            del cmd[cmd.index(leader.url)]
+            if leader.cookie_spec:
+                cmd = await self.job_loop.stage(self._materialize_cookies, cmd, leader.cookie_spec, cookie_file, f"[#{leader.id}]")
+            tail = cmd[leader.cmd.index(leader.url):]  # arguments additionnels + cookies
+            for job in list(jobs):
+                if await self.job_loop.stage(self._check_duplicate, job, tail):
+                    statuses[job.id] = "doublon"
+                    jobs.remove(job)
+            if not jobs:
+                return
+            BATCH_DIR.mkdir(parents=True, exist_ok=True)
+            batch_file.write_text("".join(job.url + "\n" for job in jobs), "utf-8")
+            cmd += ["--batch-file", str(batch_file), "--ignore-errors", "--newline"]
+            ids = ", ".join(f"#{job.id}" for job in jobs)
+            self.log_queue.put(f"\nGroupe {ids} $ {' '.join(shlex.quote(x) for x in cmd)}")
+            rc = await self._stream_group(jobs, cmd)
+            for job in jobs:
+                job.rc = rc
+                if job.cancelled:
+                    statuses[job.id] = "arrêté"
+                elif job.outputs and await self.job_loop.stage(self._run_post_stages, job):
+                    statuses[job.id] = "déplacement" if job.stage_dir else "terminé"
+                self._job_line(job, f"Terminé ({'ok' if job.outputs else 'échec'}). Code de sortie du groupe: {rc}")
+        except FileNotFoundError:
+            self.log_queue.put(f"Groupe #{leader.id}: yt-dlp introuvable. Vérifiez la source dans Settings.")
+        except Exception as e:
+            self.log_queue.put(f"Groupe #{leader.id}: Erreur: {e}")
+        finally:
+            cookie_file.unlink(missing_ok=True)
+            batch_file.unlink(missing_ok=True)
+            for job in group:
+                (BATCH_DIR / f"info-{job.id}.json").unlink(missing_ok=True)
+                self._drop_kept_sources(job)
+            self._to_tk(self._on_worker_done, [(job, statuses[job.id]) for job in group])
+
+    # ---------- Étapes locales après yt-dlp ----------
+    def _run_post_stages(self, job):
+        # Thread du job : False si une étape a échoué (le job passe en erreur)
+        try:
+            if job.local_encode:
+                self._encode_local(job)
+            if job.settings.get("verify") and job.kind == "download" and not job.cancelled and not self._verify_outputs(job):
+                return False
+            if job.settings.get("slice") and job.kind == "download" and not job.cancelled:
+                self._slice_outputs(job)
+        except Exception as e:
+            self._job_line(job, f"Erreur post-traitement: {e}")
+            return False
+        if job.stage_dir:
+            return not job.cancelled  # suite après le déplacement (_move_job)
+        return self._run_index_stages(job)
+
+    def _run_index_stages(self, job):
+        # Étapes qui enregistrent le chemin définitif des sorties
+        try:
+            if job.settings.get("peaks") and np is not None and job.kind == "download" and not job.cancelled:
+                pool = self._encode_pool(job.settings["encoders"])
+                for fut in [pool.submit(_build_peaks, path) for path in job.outputs]:
+                    fut.result()
+            if job.settings.get("library") and job.kind == "download":
+                index = LibraryIndex()
+                for path in job.outputs:
+                    index.set_meta(path, job.meta.get(path) or {})
+                if job.settings.get("dedupe"):
+                    _dedupe_library(job.outdir, index, job.outputs, lambda msg: self._job_line(job, f"Doublon exact: {msg}"))
+            if job.settings.get("fingerprint") and job.kind == "download" and not job.cancelled:
+                pool = self._encode_pool(job.settings["encoders"])
+                for fut in [pool.submit(_fingerprint_file, path) for path in job.outputs]:
+                    res = fut.result()
+                    self.fp_index.add(res["path"], res["codes"], res["head"])
+            if job.settings.get("analyze") and np is not None and job.kind == "download" and not job.cancelled:
+                self._to_tk(self._set_job_status, job, "analyse")
+                self._analyze_paths(job.outputs, job.settings["encoders"],
+                                    lambda path, data: self._job_line(job, f"Analyse: {Path(path).name} — {_analysis_summary(data)}"))
+            return not job.cancelled
+        except Exception as e:
+            self._job_line(job, f"Erreur post-traitement: {e}")
+            return False
+
+    def _verify_outputs(self, job):
+        # Thread du job : False si une sortie reste invalide ; une sortie en
+        # échec est reconvertie depuis sa source (-k), sans nouveau téléchargement
+        s = job.settings
+        self._to_tk(self._set_job_status, job, "vérification")
+        kept = {(str(Path(p).parent), Path(p).stem): p for p in job.sources if p not in job.outputs and Path(p).exists()}
+        single = len(job.sections) <= 1 and not (job.local_encode and s["chapters"])
+        pool = self._encode_pool(s["encoders"])
+
+        def check(paths):
+            decodes = {path: pool.submit(_decode_errors, path) for path in paths} if s.get("verify_decode") else {}
+            found = {path: _verify_output(path, s, _expected_seconds(job.meta.get(path), job.sections) if single else None)
+                     for path in paths}
+            for path, fut in decodes.items():
+                errors = fut.result()
+                if errors:
+                    found[path][1].append(f"décodage: {errors[0]}" + (f" (+{len(errors) - 1})" if len(errors) > 1 else ""))
+            return found
+
+        try:
+            results = check(job.outputs)
+            # Source gardée, ou la sortie elle-même quand yt-dlp ne l'a pas convertie (déjà au format cible)
+            retry = {path: kept.get((str(Path(path).parent), Path(path).stem), path) for path, (_info, problems) in results.items()
+                     if problems and ((str(Path(path).parent), Path(path).stem) in kept or path in job.sources)}
+            if retry:
+                for path in retry:
+                    self._job_line(job, f"Vérification: {Path(path).name}: {'; '.join(results[path][1])} — reconversion depuis la source")
+                self._to_tk(self._set_job_status, job, "reconversion")
+                for fut in [pool.submit(_transcode_file, src, path, s["fmt"], s["sr"], s["bd"], s["ch"], s["q"])
+                            for path, src in retry.items()]:
+                    fut.result()
+                results.update(check(list(retry)))
+            ok = True
+            for path, (info, problems) in results.items():
+                if problems:
+                    ok = False
+                    self._job_line(job, f"Vérification: {Path(path).name} invalide: {'; '.join(problems)}")
+                else:
+                    depth = f"{info['bits']} bits" if info["bits"] else info["codec"]
+                    self._job_line(job, f"Vérification: {Path(path).name} OK ({info['sample_rate']} Hz, {depth}, "
+                                        f"{info['channels']} can., {_format_ts(info['seconds'])})")
+            return ok
+        finally:
+            for src in kept.values():
+                Path(src).unlink(missing_ok=True)
+
+    def _drop_kept_sources(self, job):
+        # Sources gardées par -k : supprimées quelle que soit l'issue du job
+        # (échec, arrêt, erreur avant la vérification), sauf si ce sont des sorties
+        if not job.settings.get("verify") or (job.local_encode and not job.sections):
+            return
+        for src in job.sources:
+            if src not in job.outputs and Path(src).suffix != "." + job.settings["fmt"]:
+                Path(src).unlink(missing_ok=True)
+
+    def _encode_pool(self, workers):
+        # Pool partagé par tous les jobs (spawn : pas de fork d'un processus Tk multi-thread)
+        with self._pool_lock:
+            if self.encode_pool is None or self.encode_pool_size != workers:
+                if self.encode_pool is not None:
+                    self.encode_pool.shutdown(wait=False)
+                self.encode_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                self.encode_pool_size = workers
+            return self.encode_pool
+
+    def _slice_outputs(self, job):
+        if np is None:
+            self._job_line(job, "Découpage automatique ignoré : numpy n'est pas installé.")
+            return
+        self._to_tk(self._set_job_status, job, "découpage")
+        pool = self._encode_pool(job.settings["encoders"])
+        futures = [pool.submit(_slice_audio_file, path, job.settings["slice"]) for path in job.outputs]
+        for fut in futures:
+            res = fut.result()
+            job.extras += res["slices"]
+            self._job_line(job, f"Découpage: {len(res['slices'])} tranche(s) de {Path(res['path']).name} ({res['secs']:.1f}s)")
+
+    def _slice_folder(self):
+        # Dossier entier : un fichier par tâche du pool de processus
+        if np is None:
+            messagebox.showerror(APP_TITLE, "Le découpage automatique nécessite numpy (pip install numpy).")
+            return
+        d = filedialog.askdirectory(initialdir=self.outdir_var.get() or str(Path.home()))
+        if not d:
+            return
+        files = []
+        for root, dirs, names in os.walk(d):
+            dirs[:] = [x for x in dirs if not x.endswith(" slices")]
+            files += [Path(root) / x for x in names if x.lower().endswith(AUDIO_EXTS)]
+        if not files:
+            messagebox.showinfo(APP_TITLE, "Aucun fichier WAV / FLAC / OGG dans ce dossier.")
+            return
+        params = self._slice_params()
+        pool = self._encode_pool(self._encode_workers())
+        self._log(f"Découpage de {len(files)} fichier(s) dans {d}…\n")
+        def worker():
+            t0 = time.time()
+            futures = {pool.submit(_slice_audio_file, str(path), params): path for path in files}
+            count = 0
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                    count += len(res["slices"])
+                    self.log_queue.put(f"Découpage: {len(res['slices'])} tranche(s) de {futures[fut].name} ({res['secs']:.1f}s)")
+                except Exception as e:
+                    self.log_queue.put(f"Découpage de {futures[fut].name} impossible: {e}")
+            self.log_queue.put(f"Découpage terminé : {count} tranche(s) pour {len(files)} fichier(s) en {time.time() - t0:.1f}s.")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _convert_folder(self):
+        # Fichiers locaux (audio / vidéo) convertis avec les réglages audio des
+        # jobs ; l'arborescence est reproduite dans le dossier de sortie
+        outdir = self.outdir_var.get().strip()
+        if not outdir:
+            messagebox.showwarning(APP_TITLE, "Veuillez choisir un dossier de sortie.")
+            return
+        d = filedialog.askdirectory(title="Dossier à convertir", initialdir=str(Path.home()))
+        if not d:
+            return
+        src_root, out_root = Path(d), Path(outdir) / Path(d).name
+        if out_root.resolve() == src_root.resolve():
+            messagebox.showerror(APP_TITLE, "La copie convertie remplacerait le dossier source : choisissez un autre dossier de sortie.")
+            return
+        s = self._job_settings()
+        self._ingest_cancel.clear()
+        self.ingesting += 1
+        self.stop_btn.config(state="normal")
+        self._log(f"Conversion de {src_root} vers {out_root}…\n")
+        threading.Thread(target=self._run_ingest, args=(src_root, out_root, s), daemon=True).start()
+
+    def _run_ingest(self, src_root, out_root, s):
+        try:
+            manifest = _load_ingest_manifest(out_root)
+            todo, fresh, clashes = _ingest_plan(src_root, out_root, s, manifest)
+            for src, other in clashes:
+                self.log_queue.put(f"Conversion: {src} ignoré (même sortie que {other.name})")
+            self.log_queue.put(f"Conversion: {len(todo)} fichier(s) à convertir, {fresh} déjà à jour")
+            if not todo:
+                return
+            out_root.mkdir(parents=True, exist_ok=True)
+            pool = self._encode_pool(s["encoders"])
+            t0 = last = time.time()
+            done = failed = 0
+            audio = 0.0
+            # Au plus un fichier par processus du pool partagé : les tâches des
+            # jobs de téléchargement ne passent pas derrière tout le dossier
+            pending, items = {}, iter(todo)
+            try:
+                while True:
+                    while len(pending) < s["encoders"] and not self._ingest_cancel.is_set():
+                        item = next(items, None)
+                        if item is None:
+                            break
+                        rel, src, dest, sig = item
+                        fut = pool.submit(_ingest_file, str(src), str(dest), s["fmt"], s["sr"], s["bd"], s["ch"], s["q"])
+                        pending[fut] = (rel, src, sig)
+                    if not pending:
+                        break
+                    finished, _rest = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        rel, src, sig = pending.pop(fut)
+                        try:
+                            res = fut.result()
+                        except Exception as e:
+                            failed += 1
+                            err = e.stderr.decode("utf-8", "replace").strip().splitlines() if getattr(e, "stderr", None) else []
+                            self.log_queue.put(f"Conversion de {src} impossible: {err[-1] if err else e}")
+                            continue
+                        done += 1
+                        audio += res["seconds"]
+                        manifest[rel] = sig + [res["size"]]
+                    if time.time() - last >= INGEST_REPORT_S:
+                        last = time.time()
+                        secs = last - t0
+                        self.log_queue.put(f"Conversion: {done + failed}/{len(todo)} ({done / secs:.1f} fichiers/s, "
+                                           f"{audio / 3600 / (secs / 60):.2f} h d'audio/min)")
+            finally:
+                _save_ingest_manifest(out_root, manifest)
+            secs = max(time.time() - t0, 1e-3)
+            stopped = " (arrêtée)" if self._ingest_cancel.is_set() else ""
+            self.log_queue.put(f"Conversion terminée{stopped} : {done} fichier(s) en {secs:.1f}s, {failed} échec(s) — "
+                               f"{done / secs:.2f} fichiers/s, {audio / 3600:.2f} h d'audio, {audio / 3600 / (secs / 60):.2f} h/min")
+        except Exception as e:
+            self.log_queue.put(f"Conversion de {src_root} impossible: {e}")
+        finally:
+            self._to_tk(self._end_ingest)
+
+    def _end_ingest(self):
+        self.ingesting -= 1
+        self._pump_jobs()
+
+    # ---------- Analyse ----------
+    def _analyze_paths(self, paths, workers, report=None):
+        # Thread appelant : fichiers inchangés servis par le cache, les autres
+        # répartis sur le pool ; renvoie [(chemin, résultat)] dans l'ordre
+        cache = AnalysisCache()
+        results, futures = {}, {}
+        pool = None
+        for path in map(str, paths):
+            data = cache.known(path, os.stat(path))
+            if data is not None:
+                results[path] = data
+                continue
+            pool = pool or self._encode_pool(workers)
+            futures[pool.submit(_analyze_audio_file, path, str(cache.path))] = path
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                self.log_queue.put(f"Analyse de {Path(path).name} impossible: {e}")
+                continue
+            cache.store(res)
+            results[path] = res["data"]
+            if report:
+                report(path, res["data"])
+        return [(path, results[path]) for path in map(str, paths) if path in results], len(futures)
+
+    def _analyze_outdir(self):
+        if np is None:
+            messagebox.showerror(APP_TITLE, "L'analyse nécessite numpy (pip install numpy).")
+            return
+        d = Path(self.outdir_var.get() or Path.home())
+        if not d.is_dir():
+            messagebox.showerror(APP_TITLE, f"Dossier de sortie introuvable : {d}")
+            return
+        workers = self._encode_workers()
+        self._log(f"Analyse de {d}…\n")
+        def worker():
+            t0 = time.time()
+            files = []
+            for root, dirs, names in os.walk(d):
+                files += [Path(root) / x for x in sorted(names) if x.lower().endswith(AUDIO_EXTS)]
+            try:
+                results, analyzed = self._analyze_paths(files, workers)
+            except Exception as e:
+                self.log_queue.put(f"Analyse impossible: {e}")
+                return
+            self.log_queue.put(f"Analyse terminée : {len(results)} fichier(s), {analyzed} analysé(s), "
+                               f"{len(results) - analyzed} depuis le cache, en {time.time() - t0:.1f}s.")
+            self._to_tk(self._show_analysis, d, results)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _clear_analysis_cache(self):
+        def worker():
+            try:
+                AnalysisCache().clear()
+                self.log_queue.put("Cache d'analyse vidé.")
+            except sqlite3.Error as e:
+                self.log_queue.put(f"Cache d'analyse non vidé: {e}")
+        self.job_loop.run_blocking(worker)
+
+    def _show_analysis(self, root, results):
+        d = tk.Toplevel(self)
+        d.title(f"Analyse — {root}")
+        d.geometry("900x400")
+        cols = ("file", "loudness", "peak", "tempo", "key", "duration")
+        tree = ttk.Treeview(d, columns=cols, show="headings")
+        for col, title, width in (("file", "Fichier", 380), ("loudness", "LUFS", 80), ("peak", "Crête (dBFS)", 90),
+                                  ("tempo", "BPM", 70), ("key", "Tonalité", 80), ("duration", "Durée", 80)):
+            tree.heading(col, text=title)
+            tree.column(col, width=width, anchor="w" if col == "file" else "e")
+        tree.pack(fill="both", expand=True, padx=8, pady=8)
+        for path, data in results:
+            tree.insert("", "end", values=(
+                os.path.relpath(path, root),
+                "—" if data["loudness"] is None else f"{data['loudness']:.1f}",
+                "—" if data["peak"] is None else f"{data['peak']:.1f}",
+                "—" if data["tempo"] is None else f"{data['tempo']:.1f}",
+                data["key"] or "—",
+                _format_ts(data["duration"]),
+            ))
+
+    # ---------- Doublons ----------
+    def _check_duplicate(self, job, tail):
+        # Thread du job : récupère les FP_PROBE_SECONDS premières secondes de
+        # la source brute et compare leur empreinte à l'index ; True si le job
+        # doit être ignoré (mode "skip"), sinon le doublon est seulement signalé
+        mode = job.settings.get("dup_check", "off")
+        if mode == "off" or job.kind != "download" or job.cancelled:
+            return False
+        s = job.settings
+        self._to_tk(self._set_job_status, job, "empreinte")
+        work = _work_dir(s)
+        work.mkdir(parents=True, exist_ok=True)
+        probe = None
+        try:
+            cmd = [s["ytdlp"], "-f", "bestaudio/best", "--no-playlist", "-I", "1",
+                   *_section_args([(0.0, float(FP_PROBE_SECONDS))]), "--cache-dir", s["cache_dir"], "--no-warnings",
+                   "--print", "after_move:%(filepath)s\t%(playlist_id|)s",
+                   "-o", str(work / f"probe-{job.id}.%(ext)s")] + tail + [job.url]
+            job.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            out, err = job.proc.communicate()
+            lines = [l for l in out.splitlines() if "\t" in l]
+            if job.proc.returncode != 0 or not lines:
+                errs = [l for l in err.splitlines() if l.strip()]
+                self._job_line(job, f"Empreinte: extrait indisponible ({errs[-1] if errs else job.proc.returncode}), vérification ignorée.")
+                return False
+            probe, playlist = lines[-1].split("\t", 1)
+            fp = self._encode_pool(s["encoders"]).submit(_fingerprint_file, probe, FP_PROBE_SECONDS).result()
+            if fp["codes"] is None:
+                self._job_line(job, f"Empreinte: source de moins de {FP_MIN_SECONDS}s, vérification ignorée.")
+                return False
+            found = self.fp_index.match(fp["codes"], fp["head"])
+            if found is None:
+                self._job_line(job, "Empreinte: aucun doublon dans l'index.")
+                return False
+            self._job_line(job, f"Doublon probable de {found[0]} ({found[1]:.0%} de bits différents)")
+            if playlist:
+                self._job_line(job, "Playlist : seule sa première entrée a été comparée, téléchargement maintenu.")
+                return False
+            return mode == "skip"
+        except Exception as e:
+            self._job_line(job, f"Empreinte: vérification impossible: {e}")
+            return False
+        finally:
+            if probe:
+                Path(probe).unlink(missing_ok=True)
+
+    def _fingerprint_library(self):
+        if np is None:
+            messagebox.showerror(APP_TITLE, "Les empreintes audio nécessitent numpy (pip install numpy).")
+            return
+        root = os.path.abspath(self.outdir_var.get().strip() or Path.home())
+        workers = self._encode_workers()
+        def worker():
+            t0 = time.time()
+            _scan_library(root)
+            paths = self.fp_index.missing(root)
+            pool = self._encode_pool(workers)
+            futures = {pool.submit(_fingerprint_file, path): path for path in paths}
+            done = 0
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                except Exception as e:
+                    self.log_queue.put(f"Empreinte de {Path(futures[fut]).name} impossible: {e}")
+                    continue
+                self.fp_index.add(res["path"], res["codes"], res["head"])
+                done += 1
+            self.log_queue.put(f"Empreintes: {done} fichier(s) traités dans {root} en {time.time() - t0:.1f}s.")
+        threading.Thread(target=worker, daemon=True).start()
+
+    # ---------- Bibliothèque ----------
+    def _schedule_library_watch(self):
+        # Saisie du dossier de sortie : on attend la fin de la frappe
+        if self._library_after is not None:
+            self.after_cancel(self._library_after)
+        self._library_after = self.after(1500, self._start_library_watch)
+
+    def _start_library_watch(self):
+        # Réindexation incrémentale du dossier de sortie puis surveillance inotify
+        self._library_after = None
+        if self._library_watcher is not None:
+            self._library_watcher.close()
+            self._library_watcher = None
+        root = os.path.abspath(self.outdir_var.get().strip() or Path.home())
+        if not self.library_var.get() or not os.path.isdir(root):
+            return
+        def worker():
+            t0 = time.time()
+            try:
+                changed, gone, total = _scan_library(root)
+            except Exception as e:
+                self.log_queue.put(f"Bibliothèque: indexation impossible: {e}")
+                return
+            note = "surveillance inotify active"
+            try:
+                watcher = DirWatcher(root, self._library_event)
+            except OSError as e:
+                watcher, note = None, f"surveillance indisponible ({e}), réindexation à l'ouverture de la bibliothèque"
+            self._to_tk(self._set_library_watcher, root, watcher)
+            self.log_queue.put(f"Bibliothèque: {total} fichier(s) dans {root}, {changed} (ré)indexé(s), {gone} retiré(s) "
+                               f"en {time.time() - t0:.1f}s ; {note}.")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _set_library_watcher(self, root, watcher):
+        # Un seul watcher : celui d'un dossier qui n'est plus le dossier de sortie est fermé
+        current = os.path.abspath(self.outdir_var.get().strip() or Path.home())
+        if watcher is None:
+            return
+        if self._library_watcher is not None or root != current or not self.library_var.get():
+            watcher.close()
+            return
+        self._library_watcher = watcher
+
+    def _library_event(self, path, what):
+        # Thread du watcher
+        index = LibraryIndex()
+        if what == "rescan":
+            _scan_library(path, index)
+        elif what == "removed_dir":
+            index.remove([path], prefix=True)
+        elif path.lower().endswith(AUDIO_EXTS):
+            if what == "removed":
+                index.remove([path])
+            elif os.path.isfile(path):
+                index.update_many([(path, os.stat(path))])
+
+    def _compact_outdir(self, auto=False):
+        root = self.outdir_var.get().strip()
+        if self.compacting:
+            if not auto:
+                messagebox.showinfo(APP_TITLE, "Un compactage est déjà en cours.")
+            return
+        if not root or not os.path.isdir(root):
+            if not auto:
+                messagebox.showwarning(APP_TITLE, "Choisissez un dossier de sortie existant.")
+            return
+        def read(var, default, low):
+            try:
+                return max(low, int(var.get()))
+            except (tk.TclError, ValueError):
+                return default
+        days = read(self.compact_days_var, DEFAULT_COMPACT_DAYS, 0)
+        workers = read(self.compact_workers_var, DEFAULT_COMPACT_WORKERS, 1)
+        budget = read(self.compact_mbps_var, DEFAULT_COMPACT_MBPS, 0) * 1_000_000
+        self.compacting = True
+        self._compact_cancel.clear()
+        threading.Thread(target=self._run_compact, args=(root, days, workers, budget, bool(self.library_var.get())),
+                         daemon=True).start()
+
+    def _run_compact(self, root, days, workers, budget, library):
+        # Thread de maintenance : un fichier n'est soumis qu'une fois ses E/S
+        # estimées couvertes par le budget, au plus un fichier par processus
+        try:
+            files = _compact_candidates(root, days)
+            total = sum(size for _path, size in files)
+            self.log_queue.put(f"Compactage: {len(files)} WAV non lus depuis {days} j ({_human_size(total)}) dans {root}")
+            if not files:
+                return
+            index = LibraryIndex() if library else None
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_background_priority)
+            t0 = time.time()
+            charged = saved = 0
+            done = failed = 0
+            pending, todo = set(), iter(files)
+            try:
+                while True:
+                    while len(pending) < workers and not self._compact_cancel.is_set():
+                        item = next(todo, None)
+                        if item is None:
+                            break
+                        charged += item[1] * COMPACT_IO_FACTOR
+                        delay = charged / budget - (time.time() - t0) if budget else 0
+                        if delay > 0 and self._compact_cancel.wait(delay):
+                            break
+                        pending.add(pool.submit(_compact_wav, item[0]))
+                    if not pending:
+                        break
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        try:
+                            res = fut.result()
+                            if index is not None:
+                                index.rename(res["path"], res["dest"])
+                            os.unlink(res["path"])
+                            _peak_path(res["path"]).unlink(missing_ok=True)
+                        except Exception as e:
+                            failed += 1
+                            err = e.stderr.decode("utf-8", "replace").strip().splitlines() if getattr(e, "stderr", None) else []
+                            self.log_queue.put(f"Compactage impossible: {err[-1] if err else e}")
+                            continue
+                        done += 1
+                        saved += res["before"] - res["after"]
+                        self.log_queue.put(f"Compactage: {Path(res['dest']).name} ({_human_size(res['before'])} -> "
+                                           f"{_human_size(res['after'])}, {res['secs']:.1f}s)")
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+            secs = max(time.time() - t0, 1e-3)
+            stopped = " (arrêté)" if self._compact_cancel.is_set() else ""
+            self.log_queue.put(f"Compactage terminé{stopped} : {done} fichier(s), {failed} échec(s), {_human_size(saved)} libérés "
+                               f"en {_format_duration(secs)} ({_human_size(charged / secs)}/s d'E/S estimées)")
+        except Exception as e:
+            self.log_queue.put(f"Compactage de {root} impossible: {e}")
+        finally:
+            self._to_tk(setattr, self, "compacting", False)
+
+    def _compact_tick(self):
+        if self.compact_auto_var.get() and not self.running and not self.pending:
+            self._compact_outdir(auto=True)
+        self.after(COMPACT_INTERVAL_MS, self._compact_tick)
+
+    def _dedupe_outdir(self):
+        root = os.path.abspath(self.outdir_var.get().strip() or Path.home())
+        if not os.path.isdir(root):
+            messagebox.showerror(APP_TITLE, f"Dossier de sortie introuvable : {root}")
+            return
+        self._log(f"Dédoublonnage de {root}…\n")
+        def worker():
+            t0 = time.time()
+            try:
+                index = LibraryIndex()
+                _scan_library(root, index)
+                linked, saved = _dedupe_library(root, index, log=lambda msg: self.log_queue.put(f"Doublon exact: {msg}"))
+            except Exception as e:
+                self.log_queue.put(f"Dédoublonnage impossible: {e}")
+                return
+            self.log_queue.put(f"Dédoublonnage terminé : {linked} fichier(s) remplacé(s) par un lien, "
+                               f"{_human_size(saved)} libérés en {time.time() - t0:.1f}s.")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _clear_library(self):
+        def worker():
+            try:
+                LibraryIndex().clear()
+                self.log_queue.put("Index de la bibliothèque vidé (empreintes audio conservées).")
+            except sqlite3.Error as e:
+                self.log_queue.put(f"Index de la bibliothèque non vidé: {e}")
+        self.job_loop.run_blocking(worker)
 
-        ttk.Label(frm, text="Dossier de sortie:").grid(row=2, column=0, sticky="w")
-        out_ent = ttk.Entry(frm, textvariable=self.outdir_var)
-        out_ent.grid(row=3, column=0, sticky="we", pady=(0,8))
-        ttk.Button(frm, text="Parcourir...", command=self._choose_outdir).grid(row=3, column=1, sticky="e", padx=(8,0))
+    def _show_library(self):
+        d = tk.Toplevel(self)
+        d.title("Bibliothèque")
+        d.geometry("900x500")
+        bar = ttk.Frame(d)
+        bar.pack(fill="x", padx=8, pady=(8,0))
+        query_var = tk.StringVar()
+        count_var = tk.StringVar()
+        ttk.Label(bar, text="Rechercher:").pack(side="left")
+        entry = ttk.Entry(bar, textvariable=query_var)
+        entry.pack(side="left", fill="x", expand=True, padx=(8,8))
+        ttk.Label(bar, textvariable=count_var, foreground="#555").pack(side="left")
+        cols = ("title", "duration", "rate", "bits", "channels", "uploader")
+        tree = ttk.Treeview(d, columns=cols, show="headings")
+        for col, title, width in (("title", "Titre / fichier", 380), ("duration", "Durée", 80), ("rate", "Fréquence", 80),
+                                  ("bits", "Bits", 50), ("channels", "Canaux", 60), ("uploader", "Auteur", 160)):
+            tree.heading(col, text=title)
+            tree.column(col, width=width, anchor="w" if col in ("title", "uploader") else "e")
+        tree.pack(fill="both", expand=True, padx=8, pady=8)
+        paths = {}
+        pending = [None]
 
-        btns = ttk.Frame(main)
-        btns.pack(fill="x", padx=8)
-        self.download_btn = ttk.Button(btns, text="Download", command=self._on_download)
-        self.download_btn.pack(side="left")
-        self.stop_btn = ttk.Button(btns, text="Stop", command=self._on_stop, state="disabled")
-        self.stop_btn.pack(side="left", padx=(8,0))
+        def refresh():
+            pending[0] = None
+            try:
+                rows, total = LibraryIndex().search(query_var.get())
+            except sqlite3.Error as e:
+                count_var.set(f"Erreur: {e}")
+                return
+            tree.delete(*tree.get_children())
+            paths.clear()
+            for path, title, duration, rate, bits, channels, uploader in rows:
+                iid = tree.insert("", "end", values=(
+                    title or Path(path).name,
+                    "" if duration is None else _format_ts(duration),
+                    rate or "", bits or "", channels or "", uploader or "",
+                ))
+                paths[iid] = path
+            count_var.set(f"{len(rows)}{'+' if len(rows) >= LIBRARY_LIMIT else ''} / {total}")
 
-        log_frame = ttk.LabelFrame(main, text="Sortie / Verbose")
-        log_frame.pack(fill="both", expand=True, padx=8, pady=8)
-        self.log_txt = tk.Text(log_frame, height=12, wrap="word")
-        self.log_txt.pack(fill="both", expand=True, side="left")
-        log_scroll = ttk.Scrollbar(log_frame, command=self.log_txt.yview)
-        log_scroll.pack(side="right", fill="y")
-        self.log_txt.configure(yscrollcommand=log_scroll.set)
-        self._log("Prêt.\n")
+        def on_key(*args):
+            if pending[0] is not None:
+                d.after_cancel(pending[0])
+            pending[0] = d.after(120, refresh)
 
-        # -------- SETTINGS TAB --------
-        # Source yt-dlp
-        ybox = ttk.LabelFrame(settings, text="Source yt-dlp")
-        ybox.pack(fill="x", padx=8, pady=8)
+        def open_selected(event=None):
+            sel = tree.selection()
+            if sel and sel[0] in paths:
+                self._open_path(Path(paths[sel[0]]))
 
-        src_row = ttk.Frame(ybox)
-        src_row.pack(fill="x", pady=(2,2))
-        ttk.Radiobutton(src_row, text="System (PATH)", variable=self.ytdlp_source_var, value="system", command=self._update_ytdlp_effective).pack(side="left")
-        ttk.Radiobutton(src_row, text="Local (dossier utilisateur)", variable=self.ytdlp_source_var, value="local", command=self._update_ytdlp_effective).pack(side="left", padx=(12,0))
-        ttk.Radiobutton(src_row, text="Custom", variable=self.ytdlp_source_var, value="custom", command=self._update_ytdlp_effective).pack(side="left", padx=(12,0))
+        def waveform_selected():
+            sel = tree.selection()
+            if sel and sel[0] in paths:
+                self._show_waveform(Path(paths[sel[0]]))
 
-        custom_row = ttk.Frame(ybox)
-        custom_row.pack(fill="x", pady=(2,2))
-        ttk.Label(custom_row, text="Chemin custom:").pack(side="left")
-        ttk.Entry(custom_row, textvariable=self.ytdlp_custom_path_var).pack(side="left", fill="x", expand=True, padx=(8,8))
-        ttk.Button(custom_row, text="Parcourir…", command=self._choose_custom_ytdlp).pack(side="left")
+        query_var.trace_add("write", on_key)
+        tree.bind("<Double-1>", open_selected)
+        btns = ttk.Frame(d)
+        btns.pack(fill="x", padx=8, pady=(0,8))
+        ttk.Button(btns, text="Ouvrir", command=open_selected).pack(side="left")
+        ttk.Button(btns, text="Forme d'onde", command=waveform_selected).pack(side="left", padx=(8,0))
+        if self._library_watcher is None:
+            self._start_library_watch()  # sans inotify : réindexation à chaque ouverture
+        entry.focus_set()
+        refresh()
 
-        eff_row = ttk.Frame(ybox)
-        eff_row.pack(fill="x", pady=(2,2))
-        ttk.Label(eff_row, text="Utilisé:").pack(side="left")
-        self.ytdlp_effective_lab = ttk.Label(eff_row, textvariable=self.ytdlp_effective_var)
-        self.ytdlp_effective_lab.pack(side="left", padx=(8,0))
-        ttk.Button(eff_row, text="Vérifier version", command=self._check_version).pack(side="right")
+    # ---------- Forme d'onde ----------
+    def _on_waveform(self):
+        # Première sortie du job sélectionné, sinon fichier au choix
+        job = None
+        sel = self.jobs_tree.selection()
+        if sel:
+            job = self.jobs.get(int(sel[0]))
+        if job is not None and job.outputs and Path(job.outputs[0]).exists():
+            self._show_waveform(Path(job.outputs[0]), job.url)
+            return
+        path = filedialog.askopenfilename(
+            title="Fichier audio",
+            initialdir=self.outdir_var.get() or str(Path.home()),
+            filetypes=[("Audio", "*.wav *.flac *.ogg"), ("Tous", "*.*")]
+        )
+        if path:
+            self._show_waveform(Path(path), job.url if job else None)
 
-        # Gestion copie locale
-        up_box = ttk.LabelFrame(settings, text="Gestion de la copie locale (dossier utilisateur)")
-        up_box.pack(fill="x", padx=8, pady=8)
-        ttk.Button(up_box, text="Télécharger/Mettre à jour (latest GitHub)", command=self._download_latest_local).pack(side="left")
-        ttk.Button(up_box, text="Télécharger version précise (tag)", command=self._download_tagged_local).pack(side="left", padx=(8,0))
-        ttk.Button(up_box, text="Ouvrir le dossier", command=lambda: self._open_dir(LOCAL_BIN_DIR)).pack(side="left", padx=(8,0))
+    def _show_waveform(self, path, url=None):
+        if np is None:
+            messagebox.showerror(APP_TITLE, "L'affichage de la forme d'onde nécessite numpy (pip install numpy).")
+            return
+        d = tk.Toplevel(self)
+        d.title(f"Forme d'onde — {path.name}")
+        d.geometry("900x300")
+        canvas = tk.Canvas(d, background="#1e1e1e", highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+        bar = ttk.Frame(d)
+        bar.pack(fill="x", padx=8, pady=6)
+        sel_var = tk.StringVar(value="Glisser pour sélectionner une plage")
+        ttk.Label(bar, textvariable=sel_var).pack(side="left")
+        state = {"peaks": None, "view": (0, 0), "sel": None, "anchor": None}
 
-        # Audio
-        audio_box = ttk.LabelFrame(settings, text="Format / Paramètres audio")
-        audio_box.pack(fill="x", padx=8, pady=8)
+        def to_frame(x):
+            a, b = state["view"]
+            return int(a + (b - a) * min(max(x, 0), canvas.winfo_width()) / max(1, canvas.winfo_width()))
 
-        ttk.Label(audio_box, text="Format:").grid(row=0, column=0, sticky="w")
-        fmt_cmb = ttk.Combobox(audio_box, textvariable=self.format_var, values=["wav", "flac", "ogg"], state="readonly", width=8)
-        fmt_cmb.grid(row=0, column=1, sticky="w", padx=(8,16))
-        fmt_cmb.bind("<<ComboboxSelected>>", lambda e: self._update_controls_state())
+        def to_x(frame):
+            a, b = state["view"]
+            return (frame - a) * canvas.winfo_width() / max(1, b - a)
 
-        ttk.Label(audio_box, text="Sample rate:").grid(row=0, column=2, sticky="w")
-        sr_frame = ttk.Frame(audio_box)
-        sr_frame.grid(row=0, column=3, sticky="w", padx=(8,16))
-        ttk.Radiobutton(sr_frame, text="44.1 kHz", variable=self.sr_var, value=44100, command=self._update_controls_state).pack(side="left")
-        ttk.Radiobutton(sr_frame, text="48 kHz", variable=self.sr_var, value=48000, command=self._update_controls_state).pack(side="left")
+        def redraw(event=None):
+            canvas.delete("all")
+            peaks = state["peaks"]
+            w, h = canvas.winfo_width(), canvas.winfo_height()
+            if peaks is None:
+                canvas.create_text(w // 2, h // 2, text="Calcul des pics…", fill="#aaa")
+                return
+            if w < 2 or not peaks["frames"]:
+                return
+            a, b = state["view"]
+            lo, hi = _peak_columns(peaks, a, b, w)
+            mid = h / 2
+            if state["sel"]:
+                x0, x1 = to_x(state["sel"][0]), to_x(state["sel"][1])
+                canvas.create_rectangle(x0, 0, x1, h, fill="#3a4a5a", outline="")
+            for x, (l, u) in enumerate(zip(lo.tolist(), hi.tolist())):
+                canvas.create_line(x, mid - u * mid, x, mid - l * mid + 1, fill="#6fb3ff")
+            canvas.create_line(0, mid, w, mid, fill="#444")
+            sr = peaks["sr"]
+            canvas.create_text(4, 4, anchor="nw", fill="#aaa", text=_format_ts(a / sr))
+            canvas.create_text(w - 4, 4, anchor="ne", fill="#aaa", text=_format_ts(b / sr))
 
-        ttk.Label(audio_box, text="Bit depth:").grid(row=1, column=0, sticky="w", pady=(8,0))
-        bd_frame = ttk.Frame(audio_box)
-        bd_frame.grid(row=1, column=1, sticky="w", padx=(8,16), pady=(8,0))
-        ttk.Radiobutton(bd_frame, text="16", variable=self.bitdepth_var, value=16, command=self._update_controls_state).pack(side="left")
-        ttk.Radiobutton(bd_frame, text="24", variable=self.bitdepth_var, value=24, command=self._update_controls_state).pack(side="left")
+        def show_sel():
+            if state["sel"] and state["peaks"]:
+                sr = state["peaks"]["sr"]
+                a, b = state["sel"]
+                sel_var.set(f"{_format_ts(a / sr)} - {_format_ts(b / sr)} ({(b - a) / sr:.2f}s)")
 
-        ttk.Label(audio_box, text="Canaux:").grid(row=1, column=2, sticky="w", pady=(8,0))
-        ch_frame = ttk.Frame(audio_box)
-        ch_frame.grid(row=1, column=3, sticky="w", padx=(8,16), pady=(8,0))
-        ttk.Radiobutton(ch_frame, text="Mono", variable=self.channels_var, value=1).pack(side="left")
-        ttk.Radiobutton(ch_frame, text="Stéréo", variable=self.channels_var, value=2).pack(side="left")
+        def on_press(event):
+            if state["peaks"]:
+                state["anchor"] = to_frame(event.x)
+                state["sel"] = None
 
-        self.vorbis_frame = ttk.Frame(audio_box)
-        self.vorbis_label = ttk.Label(self.vorbis_frame, text="Qualité Vorbis (q):")
-        self.vorbis_scale = ttk.Scale(self.vorbis_frame, from_=0.0, to=10.0, orient="horizontal", variable=self.vorbis_quality_var)
-        self.vorbis_value = ttk.Label(self.vorbis_frame, textvariable=tk.StringVar(value=str(self.vorbis_quality_var.get())))
-        self.vorbis_quality_var.trace_add("write", lambda *args: self.vorbis_value.config(text=f"{self.vorbis_quality_var.get():.1f}"))
-        self.vorbis_label.pack(side="left")
-        self.vorbis_scale.pack(side="left", fill="x", expand=True, padx=8)
-        self.vorbis_value.pack(side="left")
+        def on_drag(event):
+            if state["anchor"] is not None:
+                f = to_frame(event.x)
+                state["sel"] = (min(state["anchor"], f), max(state["anchor"], f))
+                show_sel()
+                redraw()
 
-        # Arguments additionnels + tip
-        extra_box = ttk.LabelFrame(settings, text="Arguments additionnels (passés à yt-dlp tels quels)")
-        extra_box.pack(fill="x", padx=8, pady=8)
-        ttk.Entry(extra_box, textvariable=self.extra_args_var).pack(fill="x", padx=8, pady=(8,4))
-        ttk.Label(
-            extra_box,
-            text='Astuce : ajoutez "--cookies-from-browser firefox" en cas de problème de login.',
-            foreground="#555"
-        ).pack(fill="x", padx=8, pady=(0,8))
+        def zoom_sel():
+            if state["sel"] and state["sel"][1] > state["sel"][0]:
+                state["view"] = state["sel"]
+                redraw()
 
-        # Aide yt-dlp (-h)
-        help_box = ttk.LabelFrame(settings, text="Aide yt-dlp (-h)")
-        help_box.pack(fill="both", expand=True, padx=8, pady=8)
-        help_btns = ttk.Frame(help_box)
-        help_btns.pack(fill="x")
-        ttk.Button(help_btns, text="Charger l'aide yt-dlp (-h)", command=self._load_ytdlp_help).pack(side="left")
-        ttk.Button(help_btns, text="Effacer", command=self._clear_help).pack(side="left", padx=(8,0))
-        self.help_txt = tk.Text(help_box, wrap="word")
-        self.help_txt.pack(fill="both", expand=True)
-        self.help_txt.insert("1.0", HELP_HINT)
+        def zoom_all():
+            if state["peaks"]:
+                state["view"] = (0, state["peaks"]["frames"])
+                redraw()
 
-        self._update_controls_state()
-        self._update_ytdlp_effective()
+        def use_range():
+            if not state["sel"]:
+                return
+            sr = state["peaks"]["sr"]
+            rng = f"{_format_ts(state['sel'][0] / sr)}-{_format_ts(state['sel'][1] / sr)}"
+            if url:
+                text = self.url_txt.get("1.0", "end-1c")
+                self.url_txt.insert("end-1c", ("\n" if text and not text.endswith("\n") else "") + f"{url} {rng}\n")
+            else:
+                start, end = rng.split("-")
+                self.range_start_var.set(start)
+                self.range_end_var.set(end)
 
-        # -------- ABOUT TAB --------
-        about_inner = ttk.Frame(about)
-        about_inner.pack(fill="both", expand=True)
+        ttk.Button(bar, text="Ajouter la plage à la file" if url else "Utiliser comme plage", command=use_range).pack(side="right")
+        ttk.Button(bar, text="Vue entière", command=zoom_all).pack(side="right", padx=(0,8))
+        ttk.Button(bar, text="Zoom sélection", command=zoom_sel).pack(side="right", padx=(0,8))
+        canvas.bind("<Configure>", redraw)
+        canvas.bind("<ButtonPress-1>", on_press)
+        canvas.bind("<B1-Motion>", on_drag)
+        canvas.bind("<ButtonRelease-1>", lambda e: state.update(anchor=None))
 
-        center = ttk.Frame(about_inner)
-        center.place(relx=0.5, rely=0.5, anchor="center")
+        def loaded(peaks, error=None):
+            if not d.winfo_exists():
+                return
+            if peaks is None:
+                canvas.delete("all")
+                canvas.create_text(10, 10, anchor="nw", fill="#f88", text=f"Forme d'onde indisponible: {error}")
+                return
+            state["peaks"] = peaks
+            state["view"] = (0, peaks["frames"])
+            redraw()
 
-        logo_path = ASSET_GFX_DIR / "netdigger_logo.png"
-        if logo_path.exists():
+        workers = self._encode_workers()  # variable Tk : lue avant le thread
+        def worker():
+            # Pics à jour : lecture directe ; sinon calcul (une fois) dans le pool
             try:
-                self.about_logo = tk.PhotoImage(file=str(logo_path))
-                ttk.Label(center, image=self.about_logo).pack(pady=(0,12))
+                peaks = _load_peaks(path)
+                if peaks is None:
+                    self._encode_pool(workers).submit(_build_peaks, str(path)).result()
+                    peaks = _load_peaks(path)
+                self._to_tk(loaded, peaks, "fichier de pics illisible")
             except Exception as e:
-                ttk.Label(center, text=f"(Logo introuvable ou invalide: {e})").pack(pady=(0,12))
-        else:
-            ttk.Label(center, text="(gfx/netdigger_logo.png manquant)").pack(pady=(0,12))
+                self._to_tk(loaded, None, e)
+        threading.Thread(target=worker, daemon=True).start()
 
-        info_text = (
-            "Netdigger\n"
-            "Version : 0.1.0\n"
-            "Auteur : Captain Cool\n"
-            "Site / Repo : Suspicious Sausage Records\n"
-            "Licence : bootleg tool\n"
-        )
-        ttk.Label(center, text=info_text, justify="center").pack()
+    def _delete_peak_files(self):
+        for path in PEAKS_DIR.glob("*.peaks"):
+            path.unlink(missing_ok=True)
 
-    # ---------- Helpers UI ----------
-    def _choose_outdir(self):
-        d = filedialog.askdirectory(initialdir=self.outdir_var.get() or str(Path.home()))
-        if d:
-            self.outdir_var.set(d)
+    def _wants_chunked(self, job, duration):
+        s = job.settings
+        return (s["fmt"] in ("wav", "flac") and s["encoders"] > 1 and s["chunk_s"] > 0
+                and duration >= s["chunk_s"] and not job.sections and job.kind == "download")
 
-    def _choose_custom_ytdlp(self):
-        path = filedialog.askopenfilename(
-            title="Choisir binaire yt-dlp",
-            filetypes=[("yt-dlp", "yt-dlp*"), ("Tous", "*.*")]
-        )
-        if path:
-            self.ytdlp_custom_path_var.set(path)
-            self._update_ytdlp_effective()
+    def _encode_local(self, job):
+        # Source décodée une seule fois (PCM float au format cible) ; chaque
+        # chapitre est une tâche du pool, et une sortie longue est encodée en
+        # segments parallèles puis assemblée sans trou
+        s = job.settings
+        sr, ch, fmt = s["sr"], s["ch"], s["fmt"]
+        pool = self._encode_pool(s["encoders"])
+        work, outdir = _work_dir(s), Path(job.stage_dir or job.outdir)
+        work.mkdir(parents=True, exist_ok=True)
+        final = []
+        for n, src in enumerate(job.outputs):
+            if job.cancelled:
+                return
+            src = Path(src)
+            pcm = work / f"job-{job.id}-{n}.pcm"
+            self._to_tk(self._set_job_status, job, "décodage")
+            t0 = time.time()
+            try:
+                gain = self._normalize_source(job, src)
+                frames = _decode_to_pcm(src, pcm, sr, ch, gain)
+                segments = _chapter_segments(job.chapters.get(str(src)), frames, sr) if s["chapters"] else []
+                if segments:
+                    dest_dir = outdir / _safe_filename(src.stem)
+                    dest_dir.mkdir(parents=True, exist_ok=True)
+                    tasks = [(dest_dir / f"{idx:02d} - {_safe_filename(title)}.{fmt}",
+                              {"title": title, "track": f"{idx}/{len(segments)}", "album": src.stem}, start, end)
+                             for idx, title, start, end in segments]
+                else:
+                    outdir.mkdir(parents=True, exist_ok=True)
+                    tasks = [(outdir / f"{_safe_filename(src.stem)}.{fmt}", {}, 0, frames)]
+                self._job_line(job, f"Décodé en {time.time() - t0:.1f}s ({frames / sr:.0f}s d'audio), {len(tasks)} fichier(s) à encoder")
+                self._to_tk(self._set_job_status, job, f"encodage 0/{len(tasks)}")
+                units = [self._submit_encode(pool, job, str(pcm), dest, meta, start, end) for dest, meta, start, end in tasks]
+                for done, unit in enumerate(units, 1):
+                    path = self._finish_encode(job, unit)
+                    if path is None:
+                        for other in units:
+                            for fut in other[2]:
+                                fut.cancel()
+                        return
+                    final.append(path)
+                    if str(src) in job.meta:
+                        job.meta[path] = job.meta[str(src)]
+                    self._to_tk(self._set_job_status, job, f"encodage {done}/{len(tasks)}")
+                self._job_line(job, f"{len(tasks)} fichier(s) encodés en {time.time() - t0:.1f}s")
+            finally:
+                pcm.unlink(missing_ok=True)
+                src.unlink(missing_ok=True)
+        job.outputs = final
 
-    def _update_ytdlp_effective(self):
-        self.ytdlp_effective_var.set(self._resolve_ytdlp_path())
+    def _submit_measure(self, job, path):
+        return self._encode_pool(job.settings["encoders"]).submit(_measure_source, str(path), job.settings["ch"], str(ANALYSIS_DB))
 
-    def _resolve_ytdlp_path(self):
-        src = self.ytdlp_source_var.get()
-        if src == "local":
-            return str(LOCAL_YTDLP)
-        elif src == "custom":
-            return self.ytdlp_custom_path_var.get().strip() or "yt-dlp"
+    def _normalize_source(self, job, src):
+        # Gain de normalisation de la source (0 si désactivée) : la mesure vient
+        # du cache ou de la tâche lancée pendant le téléchargement
+        target = job.settings.get("normalize")
+        if target is None:
+            return 0.0
+        self._to_tk(self._set_job_status, job, "mesure")
+        fut = job.measures.pop(str(src), None) or self._submit_measure(job, src)
+        m = fut.result()
+        gain = _normalize_gain(m, target)
+        if m["loudness"] is None:
+            self._job_line(job, "Normalisation: source silencieuse, aucun gain appliqué")
         else:
-            return self._which("yt-dlp") or "yt-dlp"
+            origin = "cache" if m["cached"] else f"mesurée en {m['secs']:.1f}s"
+            self._job_line(job, f"Normalisation: {m['loudness']:.1f} LUFS, crête {m['peak']:.1f} dBFS ({origin}) "
+                                f"-> gain {gain:+.1f} dB")
+        return gain
 
-    def _update_controls_state(self):
-        fmt = self.format_var.get()
-        show_vorbis = (fmt == "ogg")
-        if show_vorbis:
-            self.vorbis_frame.grid(row=2, column=0, columnspan=4, sticky="we", pady=(8,0))
+    def _submit_encode(self, pool, job, pcm, dest, meta, start, end):
+        # -> (dest, meta, futures, segments, t0) ; segments vaut None pour un encodage d'un bloc
+        s = job.settings
+        sr, ch, fmt, bd = s["sr"], s["ch"], s["fmt"], s["bd"]
+        long_enough = s["chunk_s"] > 0 and end - start >= s["chunk_s"] * sr
+        block = ch * bd // 8
+        if fmt not in ("wav", "flac") or s["encoders"] < 2 or not long_enough or (fmt == "wav" and (end - start) * block >= 0xFFFFFF00):
+            return dest, meta, [pool.submit(_encode_pcm_segment, pcm, sr, ch, start, end, str(dest), fmt, bd, s["q"], meta)], None, time.time()
+        t0 = time.time()
+        bounds = _chunk_bounds(start, end, s["encoders"])
+        part = dest.with_name(dest.name + ".part")
+        if fmt == "wav":
+            header = _wav_header(end - start, sr, ch, bd)
+            with open(part, "wb") as f:
+                f.write(header)
+                f.truncate(len(header) + (end - start) * block)
+            futures = [pool.submit(_encode_pcm_chunk, pcm, sr, ch, a, b, str(part), fmt, bd, len(header) + (a - start) * block)
+                       for a, b in bounds]
         else:
-            self.vorbis_frame.grid_forget()
+            futures = [pool.submit(_encode_pcm_chunk, pcm, sr, ch, a, b, str(dest.with_name(f"{dest.name}.{i}.part")), fmt, bd)
+                       for i, (a, b) in enumerate(bounds)]
+        return dest, meta, futures, bounds, t0
 
-    # ---------- Download workflow ----------
-    def _on_download(self):
-        url = self.url_var.get().strip()
-        outdir = self.outdir_var.get().strip()
-        if not url:
-            messagebox.showwarning(APP_TITLE, "Veuillez renseigner une URL.")
-            return
-        if not outdir:
-            messagebox.showwarning(APP_TITLE, "Veuillez choisir un dossier de sortie.")
-            return
-        Path(outdir).mkdir(parents=True, exist_ok=True)
+    def _finish_encode(self, job, unit):
+        # Attend les tâches d'une sortie, assemble les segments ; None si annulé
+        dest, meta, futures, bounds, t0 = unit
+        results = []
+        try:
+            for fut in futures:
+                if job.cancelled:
+                    return None
+                results.append(fut.result())
+            if bounds is None:
+                path, secs = results[0]
+                self._job_line(job, f"Fichier: {path} ({secs:.1f}s)")
+                return path
+            part = dest.with_name(dest.name + ".part")
+            if job.settings["fmt"] == "flac":
+                _join_flac([(r["path"], r["sizes"]) for r in results], part, bounds[-1][1] - bounds[0][0], meta)
+            part.replace(dest)
+            wall = time.time() - t0
+            busy = sum(r["secs"] for r in results)
+            self._job_line(job, f"Fichier: {dest} ({len(bounds)} segments en parallèle, {wall:.1f}s "
+                                f"pour {busy:.1f}s CPU d'encodage, accélération ×{busy / max(wall, 1e-3):.1f})")
+            return str(dest)
+        finally:
+            if bounds is not None:
+                for i in range(len(bounds)):
+                    dest.with_name(f"{dest.name}.{i}.part").unlink(missing_ok=True)
+                dest.with_name(dest.name + ".part").unlink(missing_ok=True)
 
-        cmd = self._build_command(url, outdir)
-        self._log(f"\n$ {' '.join(shlex.quote(x) for x in cmd)}\n")
+    async def _spawn_lines(self, cmd):
+        return await asyncio.create_subprocess_exec(*cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                    start_new_session=os.name != "nt")
 
-        self.download_btn.config(state="disabled")
-        self.stop_btn.config(state="normal")
-        self.proc = None
+    async def _each_line(self, proc, prefix):
+        # Sortie de proc ligne à ligne ; processus arrêté s'il reste muet trop longtemps
+        try:
+            async for line in _read_lines(proc.stdout):
+                yield line
+        except asyncio.TimeoutError:
+            self.log_queue.put(f"{prefix} Aucune sortie depuis {JOB_STALL_TIMEOUT // 60} min, arrêt du processus.")
+            _terminate(proc)
 
-        t = threading.Thread(target=self._run_subprocess, args=(cmd,))
-        t.daemon = True
-        t.start()
+    async def _stream_process(self, job, cmd):
+        if job.cancelled:
+            return -1
+        job.proc = await self._spawn_lines(cmd)
+        async for line in self._each_line(job.proc, f"[#{job.id}]"):
+            self._job_line(job, line.rstrip())
+        return await job.proc.wait()
 
-    def _on_stop(self):
-        if self.proc and self.proc.poll() is None:
-            try:
-                self.proc.terminate()
-            except Exception:
-                pass
+    async def _stream_group(self, jobs, cmd):
+        if all(job.cancelled for job in jobs):
+            return -1
+        proc = await self._spawn_lines(cmd)
+        for job in jobs:
+            job.proc = proc
+        by_url = {job.url: job for job in jobs}
+        waiting = list(jobs)
+        current = None
+        async for raw in self._each_line(proc, f"[groupe #{jobs[0].id}]"):
+            line = raw.rstrip()
+            target = current
+            m = EXTRACTING_RE.match(line)
+            if m:
+                # Début d'une nouvelle entrée du batch (les extractions imbriquées
+                # d'une même entrée restent attribuées à l'entrée courante)
+                job = next((j for j in waiting if _same_url(j.url, m.group(1))), None)
+                if job is not None:
+                    waiting.remove(job)
+                    current = target = job
+                    self._to_tk(self._set_job_status, job, "en cours")
+            elif line.startswith((OUTPUT_MARKER + "\t", CHAPTER_MARKER + "\t", META_MARKER + "\t")):
+                target = by_url.get(line.split("\t", 2)[1], current)
+            if target is None:
+                self.log_queue.put(f"[groupe #{jobs[0].id}] {line}")
+            else:
+                self._job_line(target, line)
+        return await proc.wait()
 
-    def _build_command(self, url, outdir):
-        ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
-        fmt = self.format_var.get()
-        sr = int(self.sr_var.get())
-        bd = int(self.bitdepth_var.get())
-        ch = int(self.channels_var.get())
-        extra = self.extra_args_var.get().strip()
-
-        if bd == 16:
-            sample_fmt = "s16"
-        elif bd == 24:
-            sample_fmt = "s24le"
+    def _job_line(self, job, line):
+        # Appelé par la coroutine du job ou ses étapes bloquantes : log propre au job + statut / progression
+        if line.startswith(OUTPUT_MARKER + "\t"):
+            path = line.split("\t", 2)[2]
+            job.outputs.append(path)
+            if job.pending_chapters is not None:
+                job.chapters[path], job.pending_chapters = job.pending_chapters, None
+            if job.local_encode and job.settings.get("normalize") is not None:
+                # Mesure lancée dès l'arrivée de la source, pendant la suite du téléchargement
+                job.measures[path] = self._submit_measure(job, path)
+            line = f"Fichier: {path}"
+        elif line.startswith(META_MARKER + "\t"):
+            _marker, _url, path, raw = (line.split("\t", 3) + [""])[:4]
+            try:
+                job.meta[path] = json.loads(raw)
+            except ValueError:
+                job.meta[path] = {}
+            line = f"Métadonnées: {job.meta[path].get('title') or '?'}"
+        elif line.startswith(CHAPTER_MARKER + "\t"):
+            raw = line.split("\t", 2)[2]
+            try:
+                job.pending_chapters = json.loads(raw) or []
+            except ValueError:
+                job.pending_chapters = []  # "NA" : pas de chapitres
+            line = f"Chapitres: {len(job.pending_chapters)}"
         else:
-            sample_fmt = "s16"
-
-        ffargs = ["-ar", str(sr), "-ac", str(ch)]
-        if fmt in ("wav", "flac"):
-            ffargs.extend(["-sample_fmt", sample_fmt])
-        if fmt == "ogg":
-            q = max(0.0, min(10.0, float(self.vorbis_quality_var.get())))
-            ffargs.extend(["-q:a", f"{q:.1f}"])
-
-        out_tpl = str(Path(outdir) / "%(title).200B [%(id)s].%(ext)s")
-        cmd = [ytdlp, "-x", "--audio-format", fmt, "--audio-quality", "0",
-               "--postprocessor-args", f"ffmpeg:{' '.join(shlex.quote(a) for a in ffargs)}",
-               "-o", out_tpl, url]
-        if extra:
-            cmd.extend(shlex.split(extra))
-        return cmd
-
-    def _run_subprocess(self, cmd):
-        try:
-            self.proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            assert self.proc.stdout is not None
-            for line in self.proc.stdout:
-                self.log_queue.put(line.rstrip("\n"))
-            rc = self.proc.wait()
-            self.log_queue.put(f"\nTerminé. Code de sortie: {rc}\n")
-        except FileNotFoundError:
-            self.log_queue.put("Erreur: yt-dlp introuvable. Vérifiez la source dans Settings.")
-        except Exception as e:
-            self.log_queue.put(f"Erreur: {e}")
-        finally:
-            self.after(0, self._reset_buttons)
+            m = DOWNLOADED_RE.match(line)
+            if m:
+                size = float(m.group(1)) * SIZE_UNITS.get(m.group(2), 1)
+                speed = float(m.group(3)) * SIZE_UNITS.get(m.group(4), 1)
+                job.net_bytes += int(size)
+                job.net_secs += size / speed if speed else 0.0
+            if THROTTLE_RE.search(line):
+                job.throttled = True
+            m = SOURCE_RE.match(line)
+            if m:
+                job.sources.append(m.group(1) or m.group(2))
+            m = PROGRESS_RE.match(line)
+            if m and int(m.group(1)) != job.progress:
+                job.progress = int(m.group(1))
+                self._to_tk(self._set_job_status, job, f"en cours {job.progress}%")
+        job.log.append(line)
+        self.log_queue.put(f"[#{job.id}] {line}")
 
     def _reset_buttons(self):
-        self.download_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
 
     def _drain_log_queue(self):
@@ -386,24 +5562,145 @@ class NetdiggerApp(tk.Tk):
             pass
         self.after(100, self._drain_log_queue)
 
+    def _to_tk(self, func, *args):
+        # Pont vers le thread Tk, utilisable depuis la boucle des jobs et tout autre thread
+        self._tk_calls.put((func, args))
+
+    def _drain_tk_calls(self):
+        try:
+            while True:
+                func, args = self._tk_calls.get_nowait()
+                try:
+                    func(*args)
+                except Exception:
+                    self.report_callback_exception(*sys.exc_info())
+        except queue.Empty:
+            pass
+        self.after(TK_BRIDGE_MS, self._drain_tk_calls)
+
     def _log(self, text):
         self.log_txt.insert("end", text)
         self.log_txt.see("end")
 
+    # ---------- yt-dlp: cache ----------
+    def _ytdlp_cache_dir(self):
+        # Un dossier par version : jamais de cache partagé entre deux builds
+        version = self.ytdlp_version or "unknown"
+        return YTDLP_CACHE_ROOT / re.sub(r"[^\w.-]", "_", version)
+
+    def _refresh_cache_info(self):
+        cache_dir = self._ytdlp_cache_dir()
+        self.cache_dir_var.set(str(cache_dir))
+        self.cache_size_var.set("calcul…")
+        def worker():
+            size = _human_size(_dir_size(YTDLP_CACHE_ROOT))
+            mine = _human_size(_dir_size(cache_dir))
+            self._to_tk(self.cache_size_var.set, f"{mine} (toutes versions: {size})")
+        self.job_loop.run_blocking(worker)
+
+    def _evict_cache(self, others=False):
+        if self.running or self.warming:
+            messagebox.showwarning(APP_TITLE, "Des téléchargements sont en cours, réessayez une fois la file vide.")
+            return
+        current = self._ytdlp_cache_dir()
+        if others:
+            targets = [p for p in YTDLP_CACHE_ROOT.glob("*") if p.is_dir() and p != current]
+            question = f"Supprimer le cache des autres versions de yt-dlp ({len(targets)} dossier(s)) ?"
+        else:
+            targets = [current] if current.exists() else []
+            question = f"Vider le cache yt-dlp ?\n{current}"
+        if not targets or not messagebox.askyesno(APP_TITLE, question):
+            return
+        for path in targets:
+            shutil.rmtree(path, ignore_errors=True)
+        self._refresh_cache_info()
+
+    def _query_ytdlp_version(self, ytdlp):
+        try:
+            return subprocess.check_output([ytdlp, "--version"], stderr=subprocess.STDOUT, text=True).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # ---------- yt-dlp: cookies ----------
+    def _cookie_ttl(self):
+        try:
+            return max(1, int(self.cookie_ttl_var.get())) * 60
+        except (tk.TclError, ValueError):
+            return DEFAULT_COOKIE_TTL_MIN * 60
+
+    def _with_cached_cookies(self, cmd, cookie_file):
+        # --cookies-from-browser -> --cookies <copie de l'export partagé>
+        if not self.cookie_cache_var.get():
+            return cmd, None
+        cmd, spec = _split_cookies_from_browser(cmd)
+        if spec:
+            cmd = cmd + ["--cookies", str(cookie_file)]
+        return cmd, spec
+
+    def _materialize_cookies(self, cmd, spec, cookie_file, prefix):
+        # Appelé depuis le thread du job : exporte si l'export est périmé
+        ytdlp = cmd[0]
+        try:
+            self.cookie_cache.copy_to(ytdlp, spec, self._cookie_ttl_s, cookie_file)
+            return cmd
+        except Exception as e:
+            self.log_queue.put(f"{prefix} Export des cookies impossible ({e}), lecture directe du navigateur.")
+            i = cmd.index("--cookies")
+            return cmd[:i] + ["--cookies-from-browser", spec] + cmd[i + 2:]
+
+    def _cookie_tick(self):
+        # Rafraîchit en arrière-plan les exports utilisés récemment avant expiration
+        ttl = self._cookie_ttl_s
+        ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
+        now = time.time()
+        status = []
+        for spec, used in list(self.cookie_cache.last_used.items()):
+            age = self.cookie_cache.age(spec)
+            if age is not None:
+                status.append(f"{spec}: {int(age // 60)} min")
+            if now - used < 2 * ttl and (age is None or age > 0.8 * ttl):
+                self.job_loop.run_blocking(self._export_cookies_bg, ytdlp, spec)
+        self.cookie_status_var.set(", ".join(status))
+        self.after(60000, self._cookie_tick)
+
+    def _export_cookies_bg(self, ytdlp, spec):
+        try:
+            self.cookie_cache.export(ytdlp, spec)
+            self.log_queue.put(f"Cookies {spec} rafraîchis.")
+        except Exception as e:
+            self.log_queue.put(f"Rafraîchissement des cookies {spec} impossible: {e}")
+
+    def _refresh_cookies_now(self):
+        _cmd, spec = _split_cookies_from_browser(shlex.split(self.extra_args_var.get().strip()))
+        if not spec:
+            messagebox.showinfo(APP_TITLE, "Aucun --cookies-from-browser dans les arguments additionnels.")
+            return
+        self.cookie_cache.last_used[spec] = time.time()
+        ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
+        self.job_loop.run_blocking(self._export_cookies_bg, ytdlp, spec)
+
+    def _delete_cookie_exports(self):
+        for path in COOKIES_DIR.glob("*.txt"):
+            path.unlink(missing_ok=True)
+        self.cookie_cache.last_used.clear()
+        self.cookie_status_var.set("")
+
     # ---------- yt-dlp: help / version ----------
     def _load_ytdlp_help(self):
         self.help_txt.delete("1.0", "end")
         self.help_txt.insert("1.0", "Chargement de l'aide...\n")
         ytdlp = self.ytdlp_effective_var.get() or "yt-dlp"
-        def worker():
+        async def load():
             try:
-                out = subprocess.check_output([ytdlp, "-h"], stderr=subprocess.STDOUT, text=True)
+                proc = await self._spawn_lines([ytdlp, "-h"])
+                out = "\n".join([line async for line in _read_lines(proc.stdout)])
+                await proc.wait()
             except FileNotFoundError:
                 out = "Erreur: yt-dlp introuvable. Choisissez la source ou téléchargez une copie locale."
-            except subprocess.CalledProcessError as e:
-                out = e.output or str(e)
-            self.help_txt.after(0, lambda: self._set_help(out))
-        threading.Thread(target=worker, daemon=True).start()
+            except (OSError, asyncio.TimeoutError) as e:
+                out = str(e)
+            self._to_tk(self._set_help, out)
+        self.job_loop.submit(load())
 
     def _set_help(self, text):
         self.help_txt.delete("1.0", "end")
@@ -425,7 +5722,7 @@ class NetdiggerApp(tk.Tk):
 
     # ---------- Local downloader ----------
     def _download_latest_local(self):
-        self._download_local_from_url(GITHUB_LATEST_URL, label="latest")
+        self.job_loop.run_blocking(self._download_local_from_url, GITHUB_LATEST_URL, "latest")
 
     def _download_tagged_local(self):
         d = tk.Toplevel(self)
@@ -445,7 +5742,7 @@ class NetdiggerApp(tk.Tk):
                 return
             url = GITHUB_TAG_URL_TPL.format(tag=tag)
             status.config(text="Téléchargement…")
-            threading.Thread(target=lambda: self._download_local_from_url(url, label=tag, status_label=status), daemon=True).start()
+            self.job_loop.run_blocking(self._download_local_from_url, url, tag, status)
 
         ttk.Button(d, text="Télécharger", command=run).pack(pady=(0,12))
         ttk.Button(d, text="Fermer", command=d.destroy).pack(pady=(0,12))
@@ -468,23 +5765,25 @@ class NetdiggerApp(tk.Tk):
             tmp_path.replace(final_path)
 
             msg = f"Copie locale mise à jour ({label}).\n{final_path}"
-            self._toast(msg)
+            self._to_tk(self._toast, msg)
             if status_label:
-                status_label.after(0, lambda: status_label.config(text=msg))
+                self._to_tk(status_label.config, {"text": msg})
 
-            if self.ytdlp_source_var.get() == "local":
-                self._update_ytdlp_effective()
+            def apply():
+                if self.ytdlp_source_var.get() == "local":
+                    self._update_ytdlp_effective()
+            self._to_tk(apply)
 
         except (URLError, HTTPError) as e:
             msg = f"Erreur réseau: {e}"
-            self._toast(msg)
+            self._to_tk(self._toast, msg)
             if status_label:
-                status_label.after(0, lambda: status_label.config(text=msg))
+                self._to_tk(status_label.config, {"text": msg})
         except Exception as e:
             msg = f"Erreur: {e}"
-            self._toast(msg)
+            self._to_tk(self._toast, msg)
             if status_label:
-                status_label.after(0, lambda: status_label.config(text=msg))
+                self._to_tk(status_label.config, {"text": msg})
 
     def _toast(self, text):
         self._log(text + "\n")
@@ -495,6 +5794,15 @@ class NetdiggerApp(tk.Tk):
         from shutil import which
         return which(cmd)
 
+    @staticmethod
+    def _open_path(path: Path):
+        if sys.platform.startswith("linux"):
+            subprocess.Popen(["xdg-open", str(path)])
+        elif sys.platform == "darwin":
+            subprocess.Popen(["open", str(path)])
+        elif os.name == "nt":
+            os.startfile(str(path))  # type: ignore[attr-defined]
+
     @staticmethod
     def _open_dir(path: Path):
         path.mkdir(parents=True, exist_ok=True)
@@ -505,7 +5813,198 @@ class NetdiggerApp(tk.Tk):
         elif os.name == "nt":
             os.startfile(str(path))  # type: ignore[attr-defined]
 
+class QueueWorker:
+    # Worker sans interface de la file partagée : mêmes étapes qu'un job de
+    # l'interface (méthodes reprises de NetdiggerApp, jobs sur sa propre
+    # JobLoop), after() et _to_tk() exécutent tout de suite dans l'appelant
+    _run_job = NetdiggerApp._run_job
+    _plan_job = NetdiggerApp._plan_job
+    _fetch_segmented = NetdiggerApp._fetch_segmented
+    _check_duplicate = NetdiggerApp._check_duplicate
+    _run_post_stages = NetdiggerApp._run_post_stages
+    _run_index_stages = NetdiggerApp._run_index_stages
+    _verify_outputs = NetdiggerApp._verify_outputs
+    _drop_kept_sources = NetdiggerApp._drop_kept_sources
+    _encode_pool = NetdiggerApp._encode_pool
+    _slice_outputs = NetdiggerApp._slice_outputs
+    _analyze_paths = NetdiggerApp._analyze_paths
+    _wants_chunked = NetdiggerApp._wants_chunked
+    _encode_local = NetdiggerApp._encode_local
+    _submit_measure = NetdiggerApp._submit_measure
+    _normalize_source = NetdiggerApp._normalize_source
+    _submit_encode = NetdiggerApp._submit_encode
+    _finish_encode = NetdiggerApp._finish_encode
+    _spawn_lines = NetdiggerApp._spawn_lines
+    _each_line = NetdiggerApp._each_line
+    _stream_process = NetdiggerApp._stream_process
+    _job_line = NetdiggerApp._job_line
+    _move_job = NetdiggerApp._move_job
+
+    def __init__(self, path, name=None, jobs=DEFAULT_MAX_JOBS, outdir="", ytdlp="", scratch="", encoders=DEFAULT_ENCODE_WORKERS):
+        self.queue = SharedQueue(path)
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.slots = max(1, jobs)
+        self.outdir = outdir
+        self.ytdlp = ytdlp or (str(LOCAL_YTDLP) if LOCAL_YTDLP.exists() else shutil.which("yt-dlp") or "yt-dlp")
+        version = NetdiggerApp._query_ytdlp_version(self, self.ytdlp) or "unknown"
+        self.cache_dir = str(YTDLP_CACHE_ROOT / re.sub(r"[^\w.-]", "_", version))
+        self.scratch = scratch
+        self.encoders = max(1, encoders)
+        self.log_queue = queue.Queue()
+        self.active = {}
+        self.stop_event = threading.Event()
+        self.encode_pool = None
+        self.encode_pool_size = 0
+        self._pool_lock = threading.Lock()
+        self.fp_index = FingerprintIndex()
+        self.job_loop = JobLoop()
+        self.job_loop.size_stages(self.slots)
+
+    def after(self, _ms, func, *args):
+        func(*args)
+
+    def _to_tk(self, func, *args):
+        func(*args)
+
+    def _set_job_status(self, job, status):
+        job.status = status
+
+    def _set_job_plan(self, job):
+        pass
+
+    def _on_worker_done(self, results):
+        # Appelé sur la boucle des jobs : le déplacement (copie, empreinte,
+        # index) est fait par _run_shared, dans le thread du slot
+        for job, status in results:
+            job.status = status
+
+    def _on_moved(self, job, status):
+        job.status = status
+
+    def _drain_log_queue(self):
+        while True:
+            print(self.log_queue.get(), flush=True)
+
+    def _job_from_row(self, row):
+        # Réglages de l'interface qui a soumis le job, chemins et ressources de cette machine
+        s = json.loads(row["settings"])
+        s.update(ytdlp=self.ytdlp, cache_dir=self.cache_dir, scratch=self.scratch, encoders=self.encoders)
+        if np is None:
+            s.update(normalize=None, fingerprint=False, dup_check="off")
+        outdir = self.outdir or row["outdir"]
+        job = Job(QUEUE_JOB_BASE + row["id"], row["url"], outdir, sections=json.loads(row["sections"]), settings=s)
+        job.local_encode = (s["chapters"] or s["normalize"] is not None) and not job.sections
+        job.stage_dir = _stage_dir(s, outdir)
+        job.cmd = _ytdlp_command(s, job.url, job.stage_dir or outdir, sections=job.sections, local=job.local_encode) + s["extra"]
+        return job
+
+    def _cancel(self, job):
+        job.cancelled = True
+        _terminate(job.proc)
+
+    def _run_shared(self, row):
+        job = self._job_from_row(row)
+        self.active[job.id] = job
+        self.log_queue.put(f"[#{job.id}] File #{row['id']}: {job.url} -> {job.outdir}")
+        self.log_queue.put(f"[#{job.id}] $ {' '.join(shlex.quote(x) for x in job.cmd)}")
+        done, lost = threading.Event(), threading.Event()
+        def beat():
+            # Renouvelle le bail ; annulation demandée ou bail perdu : le job s'arrête
+            while not done.wait(QUEUE_HEARTBEAT):
+                try:
+                    cancel = self.queue.heartbeat(row["id"], self.name, job.status)
+                except sqlite3.Error as e:
+                    self.log_queue.put(f"[#{job.id}] Bail non renouvelé: {e}")
+                    continue
+                if cancel is None:
+                    lost.set()
+                if cancel is not False and not job.cancelled:
+                    self.log_queue.put(f"[#{job.id}] {'Bail perdu' if cancel is None else 'Annulé depuis la file'}, arrêt du job.")
+                    self._cancel(job)
+        threading.Thread(target=beat, daemon=True).start()
+        try:
+            job.status = "en cours"
+            Path(job.outdir).mkdir(parents=True, exist_ok=True)
+            self.job_loop.submit(self._run_job(job)).result()
+            if job.status == "déplacement":
+                self._move_job(job)
+        except OSError as e:
+            self.log_queue.put(f"[#{job.id}] Erreur: {e}")
+            job.status = "erreur"
+        finally:
+            done.set()
+            self.active.pop(job.id, None)
+        if lost.is_set():
+            self.log_queue.put(f"[#{job.id}] Bail perdu : résultat ignoré, le job a été repris ailleurs.")
+        elif self.stop_event.is_set() and job.status == "arrêté":
+            self.queue.release(row["id"], self.name)
+            self.log_queue.put(f"[#{job.id}] Rendu à la file.")
+        elif not self.queue.finish(row["id"], self.name, job.status, job.outputs, job.log):
+            self.log_queue.put(f"[#{job.id}] Bail expiré avant la fin : résultat ignoré.")
+        else:
+            self.log_queue.put(f"[#{job.id}] File #{row['id']}: {job.status}")
+
+    def _slot(self):
+        while not self.stop_event.is_set():
+            try:
+                row = self.queue.lease(self.name)
+            except sqlite3.Error as e:
+                self.log_queue.put(f"File partagée inaccessible: {e}")
+                row = None
+            if row is None:
+                self.stop_event.wait(QUEUE_POLL)
+                continue
+            try:
+                self._run_shared(row)
+            except Exception as e:
+                self.log_queue.put(f"File #{row['id']}: Erreur: {e}")
+
+    def run(self):
+        def stop(_signum, _frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, stop)
+        threading.Thread(target=self._drain_log_queue, daemon=True).start()
+        self.log_queue.put(f"Worker {self.name} : file {self.queue.path}, {self.slots} job(s) simultané(s), yt-dlp {self.ytdlp}")
+        slots = [threading.Thread(target=self._slot, daemon=True) for _ in range(self.slots)]
+        for t in slots:
+            t.start()
+        try:
+            while True:
+                try:
+                    self.queue.seen(self.name, len(self.active))
+                except sqlite3.Error as e:
+                    self.log_queue.put(f"File partagée inaccessible: {e}")
+                time.sleep(QUEUE_HEARTBEAT)
+        except KeyboardInterrupt:
+            self.log_queue.put("Arrêt : jobs en cours rendus à la file.")
+            self.stop_event.set()
+            for job in list(self.active.values()):
+                self._cancel(job)
+            for t in slots:
+                t.join()
+        finally:
+            try:
+                self.queue.seen(self.name, -1)
+            except sqlite3.Error:
+                pass
+            if self.encode_pool is not None:
+                self.encode_pool.shutdown(wait=False, cancel_futures=True)
+            time.sleep(0.2)  # dernières lignes du log
+
 def main():
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(prog="netdigger", description="Sans option : interface graphique.")
+    parser.add_argument("--worker", metavar="FICHIER", help="worker sans interface de la file partagée (base SQLite sur un partage commun)")
+    parser.add_argument("--name", help="nom du worker dans la file (défaut : machine-pid)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_MAX_JOBS, help="jobs simultanés")
+    parser.add_argument("--outdir", default="", help="dossier de sortie de cette machine (remplace celui des jobs soumis)")
+    parser.add_argument("--ytdlp", default="", help="binaire yt-dlp (défaut : local, sinon celui du PATH)")
+    parser.add_argument("--scratch", default="", help="dossier de travail local (sorties déplacées ensuite)")
+    parser.add_argument("--encoders", type=int, default=DEFAULT_ENCODE_WORKERS, help="processus d'encodage")
+    args = parser.parse_args()
+    if args.worker:
+        QueueWorker(args.worker, args.name, args.jobs, args.outdir, args.ytdlp, args.scratch, args.encoders).run()
+        return
     app = NetdiggerApp()
     app.mainloop()
 